@@ -0,0 +1,50 @@
+"""
+Pre-aggregated chart data for the Plotly dashboards.
+
+A chart is described by a ChartSpec: the frame it reads, the dimensions it
+groups by, what it measures and optional row filters. chart_data() reduces
+the frame to one row per group, so a figure serializes a few dozen points
+instead of every row. Specs are hashable; callers memoize the result per
+spec and data version (see cached_chart_data in the dashboards).
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+ChartSpec = namedtuple("ChartSpec", ["source", "dims", "measure", "where", "order"],
+                       defaults=("count", (), "keys"))
+ChartSpec.__doc__ = """What one chart plots.
+
+source: name of the frame the spec reads (part of the memo key only)
+dims: tuple of columns to group by; rows with a missing dimension are dropped
+measure: "count" for rows per group ("count" column), or ("rate", col) for
+    the non-null count ("total"), sum ("hits") and percentage ("rate") of a
+    0/1 column per group
+where: tuple of (column, value) row filters; a tuple value keeps any of its values
+order: "keys" to sort by the dimensions, "count" for the largest groups first
+"""
+
+
+def measure_columns(measure):
+    return ["count"] if measure == "count" else ["total", "hits", "rate"]
+
+
+def chart_data(df, spec):
+    """Compact frame of a spec: the dims columns plus the measure columns, one row per group"""
+    dims = list(spec.dims)
+    columns = dims + measure_columns(spec.measure)
+    if df is None or df.empty or not set(dims).issubset(df.columns):
+        return pd.DataFrame(columns=columns)
+    for column, value in spec.where:
+        df = df[df[column].isin(value) if isinstance(value, tuple) else df[column] == value]
+    grouped = df.groupby(dims, observed=True, sort=True)
+    if spec.measure == "count":
+        result = grouped.size().reset_index(name="count")
+    else:
+        _, column = spec.measure
+        result = grouped[column].agg(total="count", hits="sum").reset_index()
+        result["rate"] = result["hits"] / result["total"].where(result["total"] > 0) * 100
+    if spec.order == "count":
+        result = result.sort_values(measure_columns(spec.measure)[0], ascending=False, kind="stable")
+    return result.reset_index(drop=True)[columns]
@@ -0,0 +1,139 @@
+"""
+Bounded MySQL connection pool shared by the GTS dashboards.
+
+Each dashboard builds one pool per process (under st.cache_resource) and
+passes in its own get_db_connection, so the connection settings stay with
+the dashboard and the pooling logic lives here once.
+"""
+
+import time
+from threading import Condition
+
+POOL_SIZE = 5
+POOL_MAX_LIFETIME = 1800      # seconds before a pooled connection is recycled
+POOL_CHECKOUT_TIMEOUT = 10    # seconds to wait for a free pooled connection
+POOL_PING_AFTER = 30          # idle seconds before a connection is pinged on checkout
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections shared by the loaders and admin tools.
+
+    New connections come from connect(), which returns a connection or None.
+    Idle connections are health-checked before reuse, recycled after
+    POOL_MAX_LIFETIME seconds, and checkout waits at most
+    POOL_CHECKOUT_TIMEOUT seconds for a free slot.
+    """
+    def __init__(self, connect, size=POOL_SIZE, max_lifetime=POOL_MAX_LIFETIME,
+                 checkout_timeout=POOL_CHECKOUT_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.connect = connect
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self.cond = Condition()
+        self.idle = []
+        self.opened = 0
+        self.in_use = 0
+        self.born = {}
+        self.last_used = {}
+        self.stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "timeouts": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def checkout(self):
+        """Return a healthy connection, or None if none is free before the timeout."""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            conn, created = None, False
+            with self.cond:
+                while not self.idle and self.opened >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        return None
+                    self.cond.wait(remaining)
+                if self.idle:
+                    conn = self.idle.pop()
+                else:
+                    self.opened += 1
+                self.in_use += 1
+            if conn is None:
+                conn = self.connect()
+                if conn is None:
+                    self._release_slot()
+                    return None
+                self.born[id(conn)] = time.monotonic()
+                created = True
+            elif not self._healthy(conn):
+                self._close(conn)
+                continue
+            waited = time.monotonic() - started
+            with self.cond:
+                self.stats["checkouts"] += 1
+                self.stats["created"] += int(created)
+                self.stats["wait_total"] += waited
+                self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+            return conn
+
+    def checkin(self, conn, discard=False):
+        """Return a connection to the pool; broken or expired ones are closed."""
+        if discard or self._expired(conn):
+            self._close(conn)
+            return
+        self.last_used[id(conn)] = time.monotonic()
+        with self.cond:
+            self.idle.append(conn)
+            self.in_use -= 1
+            self.cond.notify()
+
+    def metrics(self):
+        with self.cond:
+            checkouts = self.stats["checkouts"]
+            return {
+                "size": self.size,
+                "open": self.opened,
+                "in_use": self.in_use,
+                "idle": len(self.idle),
+                "checkouts": checkouts,
+                "created": self.stats["created"],
+                "recycled": self.stats["recycled"],
+                "timeouts": self.stats["timeouts"],
+                "avg_wait_ms": round(self.stats["wait_total"] / checkouts * 1000, 2) if checkouts else 0.0,
+                "max_wait_ms": round(self.stats["wait_max"] * 1000, 2),
+            }
+
+    def _expired(self, conn):
+        return time.monotonic() - self.born.get(id(conn), 0) >= self.max_lifetime
+
+    def _healthy(self, conn):
+        if self._expired(conn):
+            return False
+        # only ping connections that sat idle long enough to have timed out
+        if time.monotonic() - self.last_used.get(id(conn), 0) < self.ping_after:
+            return True
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        self.born.pop(id(conn), None)
+        self.last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._release_slot(recycled=True)
+
+    def _release_slot(self, recycled=False):
+        with self.cond:
+            self.stats["recycled"] += int(recycled)
+            self.opened -= 1
+            self.in_use -= 1
+            self.cond.notify()
@@ -6,6 +6,8 @@ import mysql.connector
 import time
 from threading import Thread, Event
 from queue import Queue
+from connection_pool import ConnectionPool
+from tracing import render_trace_panel, span, traced, traced_run
 
 # =============================
 # CONFIG
@@ -39,6 +41,13 @@ def get_db_connection():
             time.sleep(1)
     return None
 
+# =============================
+# CONNECTION POOL
+# =============================
+@st.cache_resource
+def get_connection_pool():
+    return ConnectionPool(get_db_connection)
+
 # =============================
 # DB WATCHER
 # =============================
@@ -111,31 +120,39 @@ class DatabaseWatcher:
         if self.conn and self.conn.is_connected():
             self.conn.close()
 
+# One watcher thread per process instead of one per session
+@st.cache_resource
+def get_database_watcher():
+    return DatabaseWatcher()
+
 # =============================
 # RUN QUERY
 # =============================
 def run_query(query):
-    conn, cursor = None, None
+    pool = get_connection_pool()
+    conn = pool.checkout()
+    if conn is None:
+        return []
+    cursor, broken = None, False
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return []
         cursor = conn.cursor(dictionary=True, buffered=True)
         cursor.execute(query)
         results = cursor.fetchall()
         return results if results else []
     except mysql.connector.Error as e:
+        # connection-level failures must not go back into the pool
+        broken = isinstance(e, (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError))
         st.error(f"Database query error: {str(e)}")
         return []
     finally:
         if cursor:
             cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
+        pool.checkin(conn, discard=broken)
 
 # =============================
 # LOAD DATA (with column renames)
 # =============================
+@traced
 def load_users_data():
     df = pd.DataFrame(run_query(
         "SELECT id as user_id, email, name, role, created_at, updated_at FROM users WHERE role!='admin'"
@@ -144,6 +161,7 @@ def load_users_data():
         df.rename(columns={"created_at": "user_created_at", "updated_at": "user_updated_at"}, inplace=True)
     return df
 
+@traced
 def load_profiles_data():
     df = pd.DataFrame(run_query(
         "SELECT id as profile_id, user_id, civil_status, sex, birthday, region_of_origin, province, created_at, updated_at FROM graduate_profiles"
@@ -152,6 +170,7 @@ def load_profiles_data():
         df.rename(columns={"created_at": "profile_created_at", "updated_at": "profile_updated_at"}, inplace=True)
     return df
 
+@traced
 def load_employment_data():
     df = pd.DataFrame(run_query(
         "SELECT id as employment_id, user_id, is_employed, employment_status, present_occupation, job_level_first, job_level_current, initial_gross_monthly_earning, curriculum_relevant, created_at, updated_at FROM employment_data"
@@ -160,6 +179,7 @@ def load_employment_data():
         df.rename(columns={"created_at": "employment_created_at", "updated_at": "employment_updated_at"}, inplace=True)
     return df
 
+@traced
 def load_education_data():
     df = pd.DataFrame(run_query(
         "SELECT id as education_id, user_id, degree, specialization, year_graduated, created_at, updated_at FROM educational_background"
@@ -168,6 +188,7 @@ def load_education_data():
         df.rename(columns={"created_at": "education_created_at", "updated_at": "education_updated_at"}, inplace=True)
     return df
 
+@traced
 def load_survey_data():
     df = pd.DataFrame(run_query(
         "SELECT id as survey_id, user_id, is_completed, completed_at, created_at, updated_at FROM survey_responses"
@@ -176,18 +197,21 @@ def load_survey_data():
         df.rename(columns={"created_at": "survey_created_at", "updated_at": "survey_updated_at"}, inplace=True)
     return df
 
+@traced
 def load_activity_data():
     df = pd.DataFrame(run_query("SELECT * FROM activity_logs"))
     if not df.empty and "created_at" in df.columns:
         df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
     return df
 
+@traced
 def load_unemployment_reasons_data():
     return pd.DataFrame(run_query("SELECT * FROM unemployment_reasons"))
 
 # =============================
 # MERGE DATA
 # =============================
+@traced
 def merge_data(users, profiles, employment, education, survey):
     try:
         return users.merge(profiles, on="user_id", how="left") \
@@ -205,6 +229,7 @@ def clean_export(df):
     drop_cols = [c for c in df.columns if c.endswith("_id") or c.endswith("_created_at") or c.endswith("_updated_at")]
     return df.drop(columns=drop_cols, errors="ignore")
 
+@traced
 def export_download(df, label="data_export"):
     if df.empty:
         return
@@ -217,6 +242,7 @@ def export_download(df, label="data_export"):
         key=f"download_{label}"
     )
 
+@traced
 def comparison_chart(df, metric, title):
     if "degree" not in df or metric not in df:
         return
@@ -232,7 +258,7 @@ def comparison_chart(df, metric, title):
 def init_app():
     st.set_page_config(page_title="Alumify Dashboard", page_icon="📊", layout="wide")
     if "db_watcher" not in st.session_state:
-        st.session_state.db_watcher = DatabaseWatcher()
+        st.session_state.db_watcher = get_database_watcher()
     if "db_connection_error" not in st.session_state:
         st.session_state.db_connection_error = False
 
@@ -289,7 +315,7 @@ def main_dashboard():
         # Tabs
         tab1, tab2, tab3 = st.tabs(["Demographics", "Employment", "Engagement"])
 
-        with tab1:
+        with tab1, span("tab Demographics"):
             st.subheader("👥 Demographics")
             if "sex" in df:
                 st.plotly_chart(px.pie(df, names="sex", hole=0.4, title="Gender Distribution"), use_container_width=True)
@@ -298,7 +324,7 @@ def main_dashboard():
                 st.plotly_chart(px.bar(df["civil_status"].value_counts(), title="Civil Status"), use_container_width=True)
                 export_download(df[["name", "email", "degree", "civil_status"]], "civil_status")
 
-        with tab2:
+        with tab2, span("tab Employment"):
             st.subheader("💼 Employment")
             if "is_employed" in df:
                 st.plotly_chart(px.pie(df, names="is_employed", hole=0.4, title="Employment Status"), use_container_width=True)
@@ -314,7 +340,7 @@ def main_dashboard():
                 st.plotly_chart(px.box(df, x="degree", y="initial_gross_monthly_earning",
                                        title="Salary Distribution per Program"), use_container_width=True)
 
-        with tab3:
+        with tab3, span("tab Engagement"):
             st.subheader("📱 Engagement")
             if activities.empty:
                 st.warning("No activity data")
@@ -331,4 +357,7 @@ def run_app():
         st.rerun()
 
 if __name__ == "__main__":
-    run_app()
+    # Stage timings per run; the panel is only shown with ?trace=<ALUMIFY_TRACE_KEY>
+    with traced_run("dashboard_copy"):
+        run_app()
+        render_trace_panel()
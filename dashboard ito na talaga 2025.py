@@ -4,10 +4,16 @@ import pandas as pd
 import plotly.express as px
 import mysql.connector
 import time
-from threading import Thread, Event
-from queue import Queue
+from threading import Thread, Event, Lock, current_thread
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import re
+from chart_data import ChartSpec, chart_data, measure_columns
+from filter_index import UserIdIndex
+from salary_bands import salary_band, salary_band_column
+from streaming_export import lazy_download_button, streamed_download_button
+from connection_pool import ConnectionPool
+from tracing import count_rows, render_trace_panel, span, traced, traced_run
 
 # =============================
 # CONFIG
@@ -15,6 +21,8 @@ import re
 REFRESH_INTERVAL = 5
 DATABASE_CHECK_INTERVAL = 2
 MAX_RETRIES = 3
+LOAD_CONCURRENCY = 4          # tables loaded in parallel (keep <= connection_pool.POOL_SIZE)
+TABLE_CACHE_TTL = 600         # safety net; tables normally reload when their version changes
 
 # =============================
 # DB CONNECTION
@@ -50,83 +58,127 @@ def get_db_connection():
             time.sleep(1)
     return None
 
+# =============================
+# CONNECTION POOL
+# =============================
+@st.cache_resource
+def get_connection_pool():
+    return ConnectionPool(get_db_connection)
+
 # =============================
 # DB WATCHER
 # =============================
+# Tables whose changes the watcher reports, with the column the fallback poll reads
+WATCHED_TABLES = {
+    "users": "updated_at",
+    "activity_logs": "created_at",
+    "employment_data": "updated_at",
+    "educational_background": "updated_at",
+    "survey_responses": "updated_at",
+    "graduate_profiles": "updated_at",
+    "course_reasons": "created_at",
+    "unemployment_reasons": "created_at",
+    "useful_competencies": "created_at",
+    "curriculum_suggestions": "created_at",
+}
+CHANGE_HISTORY = 256          # change events kept for sessions catching up
+
+# Fallback when table_versions is not installed: still a single round trip per poll.
+# COUNT(*) catches deletes, which MAX() alone misses.
+FALLBACK_VERSION_QUERY = " UNION ALL ".join(
+    f"SELECT '{table}', MAX({column}), COUNT(*) FROM {table}" for table, column in WATCHED_TABLES.items()
+)
+
 class DatabaseWatcher:
-    def __init__(self):
+    """
+    Process-wide change feed shared by every session.
+    One thread polls the trigger-maintained table_versions table (database/alumify_schema.sql)
+    with a single query per interval, whatever the number of tables or open sessions.
+    Each change gets a sequence number and the set of tables that changed; sessions
+    keep the last sequence they saw and call changes_since().
+    """
+    def __init__(self, interval=DATABASE_CHECK_INTERVAL):
         self.conn = None
-        self.last_update_times = {}
+        self.interval = interval
+        self.polled_versions = None   # raw versions read by the last poll (see _diff)
+        self.use_versions_table = True
+        self.sequence = 0
+        self.history = deque(maxlen=CHANGE_HISTORY)
+        # sequence at which each table last changed; used as its cache version
+        self.table_versions = {table: 0 for table in WATCHED_TABLES}
+        self.lock = Lock()
         self.stop_event = Event()
-        self.change_queue = Queue()
-        self.watch_thread = None
-        self._initialize()
-
-    def _initialize(self):
-        self.conn = get_db_connection()
-        if self.conn is None:
-            return
-        self.watch_thread = Thread(target=self._watch_changes, daemon=True)
+        self.watch_thread = Thread(target=self._watch_changes, name="db-watcher", daemon=True)
         self.watch_thread.start()
 
     def _watch_changes(self):
-        tables = [
-            'users', 'activity_logs', 'employment_data',
-            'educational_background', 'survey_responses',
-            'graduate_profiles', 'course_reasons',
-            'unemployment_reasons', 'useful_competencies',
-            'curriculum_suggestions'
-        ]
         while not self.stop_event.is_set():
             try:
                 if not self.conn or not getattr(self.conn, "is_connected", lambda: False)():
                     self.conn = get_db_connection()
                     if not self.conn:
-                        time.sleep(5)
+                        self.stop_event.wait(5)
                         continue
-                if self._check_tables(tables):
-                    try:
-                        self.change_queue.put(True)
-                    except Exception:
-                        pass
-                time.sleep(DATABASE_CHECK_INTERVAL)
+                changed = self._diff(self._read_versions())
+                if changed:
+                    self._publish(changed)
+                self.stop_event.wait(self.interval)
             except Exception:
-                time.sleep(5)
+                self.stop_event.wait(5)
 
-    def _check_tables(self, tables):
-        changes_detected = False
-        cursor = None
+    def _read_versions(self):
+        cursor = self.conn.cursor(buffered=True)
         try:
-            cursor = self.conn.cursor(dictionary=True, buffered=True)
-            for table in tables:
+            if self.use_versions_table:
                 try:
-                    cursor.execute(f"SELECT MAX(updated_at) as last_update FROM {table}")
-                    result = cursor.fetchone()
-                    current_last_update = result['last_update'] if result else None
-                    if table not in self.last_update_times:
-                        self.last_update_times[table] = current_last_update
-                    elif current_last_update != self.last_update_times[table]:
-                        self.last_update_times[table] = current_last_update
-                        changes_detected = True
-                except mysql.connector.Error:
-                    # table might not have updated_at; attempt alternative
-                    try:
-                        cursor.execute(f"SELECT MAX(created_at) as last_update FROM {table}")
-                        result = cursor.fetchone()
-                        current_last_update = result['last_update'] if result else None
-                        if table not in self.last_update_times:
-                            self.last_update_times[table] = current_last_update
-                        elif current_last_update != self.last_update_times[table]:
-                            self.last_update_times[table] = current_last_update
-                            changes_detected = True
-                    except Exception:
-                        continue
-            return changes_detected
-        except Exception:
-            return False
+                    cursor.execute("SELECT table_name, version FROM table_versions")
+                    return {name: version for name, version in cursor.fetchall() if name in WATCHED_TABLES}
+                except mysql.connector.errors.ProgrammingError:
+                    # table_versions missing: switch to the aggregate fallback for good
+                    self.use_versions_table = False
+            cursor.execute(FALLBACK_VERSION_QUERY)
+            return {name: (last, count) for name, last, count in cursor.fetchall()}
         finally:
-            if cursor:
-                cursor.close()
+            cursor.close()
+
+    def _diff(self, versions):
+        """Tables whose version moved since the last poll (the first poll is the baseline)."""
+        previous, self.polled_versions = self.polled_versions, versions
+        if previous is None:
+            return set()
+        return {table for table, version in versions.items() if previous.get(table) != version}
+
+    def _publish(self, tables):
+        with self.lock:
+            self.sequence += 1
+            self.history.append((self.sequence, frozenset(tables)))
+            for table in tables:
+                self.table_versions[table] = self.sequence
+
+    def mark_changed(self, tables=None):
+        """Force a new version for some tables (all by default), e.g. on manual refresh."""
+        self._publish(set(tables or WATCHED_TABLES))
+
+    def versions(self):
+        """Current version of every watched table."""
+        with self.lock:
+            return dict(self.table_versions)
+
+    def changes_since(self, seen):
+        """
+        Return (current sequence, tables changed after sequence `seen`).
+        Sessions too far behind the retained history get every table.
+        """
+        with self.lock:
+            if seen >= self.sequence:
+                return self.sequence, set()
+            if not self.history or self.history[0][0] > seen + 1:
+                return self.sequence, set(WATCHED_TABLES)
+            tables = set()
+            for sequence, changed in self.history:
+                if sequence > seen:
+                    tables |= changed
+            return self.sequence, tables
 
     def stop(self):
         self.stop_event.set()
@@ -138,15 +190,20 @@ class DatabaseWatcher:
             except Exception:
                 pass
 
+@st.cache_resource
+def get_database_watcher():
+    return DatabaseWatcher()
+
 # =============================
 # RUN QUERY
 # =============================
 def run_query(query):
-    conn, cursor = None, None
+    pool = get_connection_pool()
+    conn = pool.checkout()
+    if conn is None:
+        return []
+    cursor, broken = None, False
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return []
         cursor = conn.cursor(dictionary=True, buffered=True)
         cursor.execute(query)
         if cursor.with_rows:
@@ -156,6 +213,8 @@ def run_query(query):
             conn.commit()
             return []
     except mysql.connector.Error as e:
+        # connection-level failures must not go back into the pool
+        broken = isinstance(e, (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError))
         try:
             st.error(f"Database query error: {str(e)}")
         except Exception:
@@ -167,59 +226,178 @@ def run_query(query):
                 cursor.close()
             except Exception:
                 pass
-        if conn and getattr(conn, "is_connected", lambda: False)():
-            try:
-                conn.close()
-            except Exception:
-                pass
+        pool.checkin(conn, discard=broken)
 
 # =============================
 # LOAD DATA
 # =============================
-@st.cache_data(ttl=30)
-def load_users_data():
-    return pd.DataFrame(run_query("SELECT id as user_id, email, name, role, created_at, updated_at FROM users WHERE role!='admin'"))
-
-@st.cache_data(ttl=30)
-def load_profiles_data():
-    return pd.DataFrame(run_query("SELECT * FROM graduate_profiles"))
-
-@st.cache_data(ttl=30)
-def load_employment_data():
-    return pd.DataFrame(run_query("SELECT * FROM employment_data"))
-
-@st.cache_data(ttl=30)
-def load_education_data():
-    return pd.DataFrame(run_query("SELECT * FROM educational_background"))
-
-@st.cache_data(ttl=30)
-def load_survey_data():
-    return pd.DataFrame(run_query("SELECT * FROM survey_responses"))
-
-@st.cache_data(ttl=30)
-def load_activity_data():
-    return pd.DataFrame(run_query("SELECT * FROM activity_logs"))
+# Column manifest: only what the GTS tabs chart or export. Wide TEXT columns
+# (addresses, honors, activity descriptions, user agents) are never pulled.
+TABLE_COLUMNS = {
+    "graduate_profiles": ["user_id", "civil_status", "sex", "birthday", "province"],
+    "employment_data": ["user_id", "is_employed", "employment_status", "present_occupation",
+                        "business_line", "place_of_work", "job_level_first", "job_level_current",
+                        "initial_gross_monthly_earning", "curriculum_relevant"],
+    "educational_background": ["user_id", "degree", "year_graduated"],
+    "survey_responses": ["user_id", "is_completed", "completed_at"],
+    "activity_logs": ["user_id", "activity_type", "created_at"],
+    "course_reasons": ["user_id", "reason_type", "level"],
+    "useful_competencies": ["user_id", "competency"],
+    "curriculum_suggestions": ["user_id", "suggestion"],
+    "unemployment_reasons": ["user_id", "reason"],
+}
+
+def select_columns(table):
+    return f"SELECT {', '.join(TABLE_COLUMNS[table])} FROM {table}"
+
+def query_frame(query):
+    """
+    Rows of a query as a frame stamped with a fresh load id. The id travels with the
+    cached copies of the frame, so it only changes when the table was read again.
+    """
+    df = pd.DataFrame(run_query(query))
+    df.attrs["load_id"] = time.time_ns()
+    return df
 
-@st.cache_data(ttl=30)
-def load_course_reasons():
-    return pd.DataFrame(run_query("SELECT * FROM course_reasons"))
+def load_generation(tables):
+    """Load ids of the loaded frames: identifies one load, whatever the versions say."""
+    return tuple((name, None if df is None else df.attrs.get("load_id")) for name, df in sorted(tables.items()))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_users_data(version=None):
+    return query_frame("SELECT id as user_id, email, name, role, created_at, updated_at FROM users WHERE role!='admin'")
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_profiles_data(version=None):
+    return query_frame(select_columns("graduate_profiles"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_employment_data(version=None):
+    return query_frame(select_columns("employment_data"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_education_data(version=None):
+    return query_frame(select_columns("educational_background"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_survey_data(version=None):
+    return query_frame(select_columns("survey_responses"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_activity_data(version=None):
+    return query_frame(select_columns("activity_logs"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_course_reasons(version=None):
+    return query_frame(select_columns("course_reasons"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_competencies(version=None):
+    return query_frame(select_columns("useful_competencies"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_suggestions(version=None):
+    return query_frame(select_columns("curriculum_suggestions"))
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=2)
+def load_unemployment_reasons(version=None):
+    return query_frame(select_columns("unemployment_reasons"))
+
+# Loader name -> database table whose version keys its cache
+TABLE_SOURCES = {
+    "users": "users",
+    "profiles": "graduate_profiles",
+    "employment": "employment_data",
+    "education": "educational_background",
+    "surveys": "survey_responses",
+    "activities": "activity_logs",
+    "course_reasons": "course_reasons",
+    "competencies": "useful_competencies",
+    "suggestions": "curriculum_suggestions",
+    "unemployment": "unemployment_reasons",
+}
+
+def loader_versions(table_versions):
+    """
+    Cache key of each loader: its table's version plus the users version.
+    Deleting a user cascades to the child tables without firing their triggers,
+    so a users change also reloads them.
+    """
+    users_version = table_versions.get("users", 0)
+    return {
+        name: (table_versions.get(table, 0), users_version)
+        for name, table in TABLE_SOURCES.items()
+    }
+
+TABLE_LOADERS = {
+    "users": load_users_data,
+    "profiles": load_profiles_data,
+    "employment": load_employment_data,
+    "education": load_education_data,
+    "surveys": load_survey_data,
+    "activities": load_activity_data,
+    "course_reasons": load_course_reasons,
+    "competencies": load_competencies,
+    "suggestions": load_suggestions,
+    "unemployment": load_unemployment_reasons,
+}
+
+@traced
+def load_all_tables(versions=None, concurrency=LOAD_CONCURRENCY):
+    """
+    Run the load_* functions concurrently, each keyed by its version in `versions`
+    (see loader_versions); only loaders whose version changed miss the cache.
+    Returns (frames by name, seconds per table, total wall seconds).
+    """
+    versions = versions or {}
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+        attach_ctx = lambda: add_script_run_ctx(current_thread(), ctx)
+    except Exception:
+        attach_ctx = None
 
-@st.cache_data(ttl=30)
-def load_competencies():
-    return pd.DataFrame(run_query("SELECT * FROM useful_competencies"))
+    def timed(loader, version):
+        started = time.perf_counter()
+        df = loader(version)
+        return df, time.perf_counter() - started
 
-@st.cache_data(ttl=30)
-def load_suggestions():
-    return pd.DataFrame(run_query("SELECT * FROM curriculum_suggestions"))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), initializer=attach_ctx) as executor:
+        futures = {name: executor.submit(timed, loader, versions.get(name)) for name, loader in TABLE_LOADERS.items()}
+        results = {name: f.result() for name, f in futures.items()}
+    frames = {name: r[0] for name, r in results.items()}
+    timings = {name: r[1] for name, r in results.items()}
+    return frames, timings, time.perf_counter() - started
 
-@st.cache_data(ttl=30)
-def load_unemployment_reasons():
-    return pd.DataFrame(run_query("SELECT * FROM unemployment_reasons"))
+# =============================
+# FILTER INDEX
+# =============================
+# Sidebar filters indexed as user-id masks: filter -> (TABLE_LOADERS name, column)
+FILTER_FIELDS = {
+    "year": ("education", "year_graduated"),
+    "program": ("education", "degree"),
+    "sex": ("profiles", "sex"),
+    "employment": ("employment", "is_employed"),
+}
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_user_index(generation, _tables):
+    """
+    Build the UserIdIndex once per load (see load_generation): any reloaded frame,
+    even with unchanged versions and row counts, gets a new index. Sessions share it read-only.
+    """
+    return UserIdIndex(_tables, FILTER_FIELDS)
 
 # =============================
 # UTIL FUNCTIONS
 # =============================
-def export_download(df, label="data_export"):
+def export_download(df, label="data_export", state=None):
+    """
+    CSV download for a frame. With state (table versions, filter selection, ...)
+    the file is only written when requested and shared by sessions on the same
+    state; without it the frame is written right away (one-off results).
+    """
     if df is None:
         return
     try:
@@ -227,42 +405,59 @@ def export_download(df, label="data_export"):
             return
     except Exception:
         return
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label=f"⬇️ Download {label}.csv",
-        data=csv,
-        file_name=f"{label}.csv",
-        mime="text/csv",
-        key=f"download_{label}_{int(time.time())}"
+    if state is None:
+        streamed_download_button(f"⬇️ Download {label}.csv", df, "csv", f"{label}.csv", key=f"download_{label}")
+        return
+    lazy_download_button(
+        f"⬇️ Download {label}.csv",
+        (label, state),
+        lambda: df,
+        "csv",
+        f"{label}.csv",
+        max_age=TABLE_CACHE_TTL,
+        key=f"download_{label}"
     )
 
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=16, show_spinner=False)
+def build_merged_core(versions, selection, _education, _profiles, _employment):
+    """
+    Education + profiles + employment joined on user_id for one filter selection.
+    Keyed by the versions of those three tables and the selection (the frames are
+    not hashed), so a change to any other table reuses the cached merge.
+    """
+    merged_core = pd.DataFrame() if _education is None or _education.empty else _education.copy()
+    if not merged_core.empty and _profiles is not None and not _profiles.empty:
+        if "user_id" in merged_core.columns and "user_id" in _profiles.columns:
+            merged_core = merged_core.merge(_profiles, on="user_id", how="left", suffixes=("", "_profile"))
+    if not merged_core.empty and _employment is not None and not _employment.empty:
+        if "user_id" in merged_core.columns and "user_id" in _employment.columns:
+            merged_core = merged_core.merge(_employment, on="user_id", how="left", suffixes=("", "_employment"))
+
+    # ensure degree exists in merged_core if available from education
+    if merged_core is not None and not merged_core.empty and "degree" not in merged_core.columns:
+        if _education is not None and "degree" in _education.columns:
+            try:
+                # map by user_id
+                lookup = _education.set_index("user_id")["degree"].to_dict()
+                merged_core["degree"] = merged_core["user_id"].map(lookup)
+            except Exception:
+                pass
+    return merged_core
+
 def salary_to_numeric(s):
+    """Estimated amount of one salary label (parsed once per distinct label, see salary_bands.py)"""
     if pd.isna(s):
         return np.nan
-    s = str(s)
-    nums = re.findall(r'\d+(?:,\d{3})*', s)
-    nums = [int(n.replace(',', '')) for n in nums]
-    if len(nums) == 0:
-        return np.nan
-    low_s = s.lower()
-    # heuristics for ranges like "P5,000.00 to less than P10,000.00"
-    if 'below' in low_s or 'less than' in low_s:
-        return nums[0] * 0.8
-    if 'and above' in low_s or 'above' in low_s or 'and over' in low_s:
-        return nums[0] * 1.2
-    if len(nums) == 1:
-        return float(nums[0])
-    # assume first & last are range bounds
-    return float((nums[0] + nums[-1]) / 2)
-
-def pair_counts(df, cols):
-    if df is None or df.empty:
-        return pd.DataFrame(columns=cols + ['count'])
+    return salary_band(str(s)).estimate
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=512, show_spinner=False)
+def cached_chart_data(state, spec, _df):
+    """Aggregated frame of a ChartSpec (see chart_data.py), shared by every chart and session
+    showing the same table versions, filter selection and view mode (state)"""
     try:
-        gp = df.groupby(cols).size().reset_index(name='count')
-        return gp
+        return chart_data(_df, spec)
     except Exception:
-        return pd.DataFrame(columns=cols + ['count'])
+        return pd.DataFrame(columns=list(spec.dims) + measure_columns(spec.measure))
 
 def build_filter_summary(prog_compare, selected_years, selected_sex):
     parts = []
@@ -274,16 +469,64 @@ def build_filter_summary(prog_compare, selected_years, selected_sex):
         parts.append("Sex: " + ", ".join(selected_sex))
     return " | ".join(parts) if parts else "No filters applied (showing all data)"
 
+def ident_label_codes(df, parts_cols, fallback_cols):
+    """
+    ident_label of every row as (codes, labels): labels[codes[i]] is row i's label.
+    Each part column is factorized once and its codes are combined into one
+    group key per row, so a label is built once per distinct combination.
+    Rows without any usable part fall back to the first non-null of fallback_cols, then "All".
+    """
+    n = len(df)
+    key = np.zeros(n, dtype=np.int64)
+    parts = []
+    for col in parts_cols:
+        codes, uniques = pd.factorize(df[col])
+        texts = [str(u).strip() for u in uniques]
+        # blank values are skipped like missing ones (code -1 reads the trailing True)
+        blank = np.array([t == "" or t.lower() in ["nan", "none", "null"] for t in texts] + [True])
+        codes = np.where(blank[codes], -1, codes)
+        key = key * (len(uniques) + 1) + (codes + 1)
+        parts.append((codes, texts))
+
+    group_codes, _ = pd.factorize(key)
+    _, first_rows = np.unique(group_codes, return_index=True)
+    labels = []
+    for row in first_rows:
+        pieces = [texts[codes[row]] for codes, texts in parts if codes[row] >= 0]
+        labels.append(" — ".join(pieces) if pieces else None)
+
+    # Fallbacks: degree -> year -> sex -> All
+    unlabelled = np.array([label is None for label in labels])
+    rows = np.flatnonzero(unlabelled[group_codes])
+    if rows.size:
+        fallback = pd.Series(np.nan, index=range(rows.size), dtype=object)
+        for col in fallback_cols:
+            values = df[col].iloc[rows].astype(object).reset_index(drop=True)
+            fallback = fallback.fillna(values.map(str, na_action="ignore").replace({"nan": np.nan}))
+        fallback_codes, fallback_labels = pd.factorize(fallback.fillna("All"))
+        group_codes = group_codes.copy()
+        group_codes[rows] = len(labels) + fallback_codes
+        labels.extend(fallback_labels)
+    return group_codes, labels
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, max_entries=64, show_spinner=False)
+def cached_ident_label_codes(key, parts_cols, fallback_cols, _df):
+    """ident_label_codes once per key: (frame, data version, filter selection); only codes are stored."""
+    return ident_label_codes(_df, parts_cols, fallback_cols)
+
 def build_ident_label(df,
                       include_degree=True,
                       include_year=True,
                       include_sex=True,
                       degree_col="degree",
                       year_col="year_graduated",
-                      sex_col="sex"):
+                      sex_col="sex",
+                      cache_key=None):
     """
     Create ident_label column that combines selected fields.
     Skips missing parts. If nothing present, returns 'All'.
+    With cache_key (frame name, data version, filter selection) the labels are
+    reused across reruns until the data or the included fields change.
     """
     if df is None or df.empty:
         return df
@@ -301,33 +544,12 @@ def build_ident_label(df,
         df["ident_label"] = "All"
         return df
 
-    def make_label(row):
-        pieces = []
-        for c in parts_cols:
-            val = row.get(c)
-            if pd.isna(val):
-                continue
-            s = str(val).strip()
-            if s == "" or s.lower() in ["nan", "none", "null"]:
-                continue
-            pieces.append(s)
-        if pieces:
-            return " — ".join(pieces)
-        return np.nan
-
-    df["ident_label"] = df.apply(make_label, axis=1)
-
-    # Fallbacks: degree -> year -> sex -> All
-    fallback_series = pd.Series(np.nan, index=df.index)
-    if degree_col in df.columns:
-        fallback_series = fallback_series.fillna(df[degree_col].astype(str).replace({"nan": np.nan}))
-    if year_col in df.columns:
-        fallback_series = fallback_series.fillna(df[year_col].astype(str).replace({"nan": np.nan}))
-    if sex_col in df.columns:
-        fallback_series = fallback_series.fillna(df[sex_col].astype(str).replace({"nan": np.nan}))
-
-    df["ident_label"] = df["ident_label"].fillna(fallback_series)
-    df["ident_label"] = df["ident_label"].fillna("All")
+    fallback_cols = [c for c in (degree_col, year_col, sex_col) if c in df.columns]
+    if cache_key is None:
+        codes, labels = ident_label_codes(df, parts_cols, fallback_cols)
+    else:
+        codes, labels = cached_ident_label_codes(cache_key, tuple(parts_cols), tuple(fallback_cols), df)
+    df["ident_label"] = np.asarray(labels, dtype=object)[codes]
     return df
 
 add_ident_label = build_ident_label
@@ -337,11 +559,14 @@ add_ident_label = build_ident_label
 # =============================
 def init_app():
     st.set_page_config(page_title="Alumify GTS Dashboard", page_icon="📊", layout="wide")
-    if "db_watcher" not in st.session_state:
+    if "table_versions" not in st.session_state:
         try:
-            st.session_state.db_watcher = DatabaseWatcher()
+            watcher = get_database_watcher()
+            st.session_state.db_change_seq = watcher.sequence
+            st.session_state.table_versions = watcher.versions()
         except Exception:
-            pass
+            st.session_state.db_change_seq = 0
+            st.session_state.table_versions = {}
     if "db_connection_error" not in st.session_state:
         st.session_state.db_connection_error = False
     if "auto_refresh" not in st.session_state:
@@ -357,30 +582,33 @@ def main_dashboard():
     # ----------------------------
     # Load data
     # ----------------------------
-    users = load_users_data()
-    profiles = load_profiles_data()
-    employment = load_employment_data()
-    education = load_education_data()
-    surveys = load_survey_data()
-    activities = load_activity_data()
-    course_reasons = load_course_reasons()
-    competencies = load_competencies()
-    suggestions = load_suggestions()
-    unemployment = load_unemployment_reasons()
-
-    # If DB watcher detected changes and auto-refresh enabled, rerun
+    # With auto-refresh on, move to the latest table versions the watcher has
+    # seen; only the changed tables (and what depends on them) are reloaded.
+    # With it off, the session keeps the versions it already shows.
+    changed_tables = set()
     try:
-        watcher = st.session_state.get("db_watcher", None)
-        if watcher and st.session_state.get("auto_refresh", True):
-            if not watcher.change_queue.empty():
-                try:
-                    while not watcher.change_queue.empty():
-                        watcher.change_queue.get_nowait()
-                except Exception:
-                    pass
-                st.experimental_rerun()
+        if st.session_state.get("auto_refresh", True):
+            watcher = get_database_watcher()
+            seq, changed_tables = watcher.changes_since(st.session_state.get("db_change_seq", 0))
+            st.session_state.db_change_seq = seq
+            st.session_state.table_versions = watcher.versions()
     except Exception:
         pass
+    table_versions = st.session_state.get("table_versions", {})
+    versions = loader_versions(table_versions)
+    tables, load_timings, load_wall_time = load_all_tables(versions)
+    users = tables["users"]
+    profiles = tables["profiles"]
+    employment = tables["employment"]
+    education = tables["education"]
+    surveys = tables["surveys"]
+    activities = tables["activities"]
+    course_reasons = tables["course_reasons"]
+    competencies = tables["competencies"]
+    suggestions = tables["suggestions"]
+    unemployment = tables["unemployment"]
+    if changed_tables:
+        st.sidebar.caption("Reloaded after database change: " + ", ".join(sorted(changed_tables)))
 
     # basic existence check
     if (users is None or (hasattr(users, "empty") and users.empty)) and (education is None or (hasattr(education, "empty") and education.empty)):
@@ -434,94 +662,51 @@ def main_dashboard():
                         st.info("Query executed. No rows returned or non-SELECT executed.")
                 except Exception as e:
                     st.error(f"Error running query: {e}")
+        st.markdown("---")
+        st.write("Connection pool (use wait times and timeouts to size POOL_SIZE):")
+        st.json(get_connection_pool().metrics())
+        st.write(f"Load timings: {load_wall_time:.2f}s wall, {sum(load_timings.values()):.2f}s summed over tables "
+                 f"(LOAD_CONCURRENCY={LOAD_CONCURRENCY})")
+        st.dataframe(pd.DataFrame(sorted(load_timings.items(), key=lambda kv: kv[1], reverse=True),
+                                  columns=["table", "seconds"]).round(3))
 
     # ----------------------------
-    # Filtering core: get filtered user ids (intersection)
+    # Filtering core: boolean masks over user ids (see filter_index.py)
     # ----------------------------
-    def get_filtered_user_ids():
-        """
-        Return:
-          - None -> no filters applied (don't filter)
-          - set() -> filters applied but no matches
-          - set of user_ids -> intersection of applied filters
-        """
-        sets = []
-
-        # Education-based filters (years / programs)
-        if (selected_years and len(selected_years) > 0) or (prog_compare and len(prog_compare) > 0):
-            if education is None or education.empty or "user_id" not in education.columns:
-                # user asked to filter by year/program but we don't have education table -> no matches
-                return set()
-            edu = education.copy()
-            if selected_years:
-                edu = edu[edu["year_graduated"].astype(str).isin(selected_years)]
-            if prog_compare:
-                edu = edu[edu["degree"].astype(str).isin(prog_compare)]
-            if edu.empty:
-                return set()
-            sets.append(set(edu["user_id"].unique()))
-
-        # Sex filter (profiles)
-        if selected_sex and len(selected_sex) > 0:
-            if profiles is None or profiles.empty or "user_id" not in profiles.columns:
-                return set()
-            prof = profiles.copy()
-            prof = prof[prof["sex"].astype(str).isin(selected_sex)]
-            if prof.empty:
-                return set()
-            sets.append(set(prof["user_id"].unique()))
-
-        if not sets:
-            return None  # no filters applied
-
-        # intersection
-        ids = sets[0]
-        for s in sets[1:]:
-            ids = ids & s
-        return ids
-
-    def filter_dataframe(df, user_id_col="user_id"):
-        """Apply the computed filtered user ids to any dataframe (if filters active)."""
-        if df is None or df.empty or user_id_col not in df.columns:
-            return df
-        ids = get_filtered_user_ids()
-        if ids is None:
-            return df.copy()
-        if not ids:
-            # return empty df with same columns
-            return df.iloc[0:0].copy()
-        return df[df[user_id_col].isin(ids)].copy()
+    user_index = get_user_index(load_generation(tables), tables)
+    # None -> no filters applied; otherwise the AND of the selected filters
+    selected_mask = user_index.mask({"year": selected_years, "program": prog_compare, "sex": selected_sex})
+
+    def filter_dataframe(name):
+        """Gather the rows of a loaded table whose user is in the selected mask."""
+        return user_index.take(name, tables[name], selected_mask)
 
     # Apply filters to all data sources
-    users_filtered = filter_dataframe(users)
-    profiles_filtered = filter_dataframe(profiles)
-    employment_filtered = filter_dataframe(employment)
-    education_filtered = filter_dataframe(education)
-    surveys_filtered = filter_dataframe(surveys)
-    activities_filtered = filter_dataframe(activities)
-    course_reasons_filtered = filter_dataframe(course_reasons)
-    competencies_filtered = filter_dataframe(competencies)
-    suggestions_filtered = filter_dataframe(suggestions)
-    unemployment_filtered = filter_dataframe(unemployment)
+    with span("filter tables", count_rows(tables)):
+        users_filtered = filter_dataframe("users")
+        profiles_filtered = filter_dataframe("profiles")
+        employment_filtered = filter_dataframe("employment")
+        education_filtered = filter_dataframe("education")
+        surveys_filtered = filter_dataframe("surveys")
+        activities_filtered = filter_dataframe("activities")
+        course_reasons_filtered = filter_dataframe("course_reasons")
+        competencies_filtered = filter_dataframe("competencies")
+        suggestions_filtered = filter_dataframe("suggestions")
+        unemployment_filtered = filter_dataframe("unemployment")
 
     # Merge core: education + profiles + employment for demographic merged_core
-    merged_core = pd.DataFrame() if education_filtered is None or education_filtered.empty else education_filtered.copy()
-    if not merged_core.empty and profiles_filtered is not None and not profiles_filtered.empty:
-        if "user_id" in merged_core.columns and "user_id" in profiles_filtered.columns:
-            merged_core = merged_core.merge(profiles_filtered, on="user_id", how="left", suffixes=("", "_profile"))
-    if not merged_core.empty and employment_filtered is not None and not employment_filtered.empty:
-        if "user_id" in merged_core.columns and "user_id" in employment_filtered.columns:
-            merged_core = merged_core.merge(employment_filtered, on="user_id", how="left", suffixes=("", "_employment"))
-
-    # ensure degree exists in merged_core if available from education_filtered
-    if merged_core is not None and not merged_core.empty and "degree" not in merged_core.columns:
-        if education_filtered is not None and "degree" in education_filtered.columns:
-            try:
-                # map by user_id
-                lookup = education_filtered.set_index("user_id")["degree"].to_dict()
-                merged_core["degree"] = merged_core["user_id"].map(lookup)
-            except Exception:
-                pass
+    # (cached per version of those three tables and the filter selection)
+    merged_versions = tuple(versions[name] for name in ("education", "profiles", "employment"))
+    selection = (tuple(selected_years), tuple(prog_compare), tuple(selected_sex))
+    with span("build_merged_core") as merge_span:
+        merged_core = build_merged_core(merged_versions, selection, education_filtered, profiles_filtered, employment_filtered)
+        merge_span.rows_out = count_rows(merged_core)
+    # Exports below are keyed by this state and only written on request
+    export_state = (tuple(sorted(table_versions.items())), selection, view_mode)
+
+    def chart(df, source, *dims, **spec):
+        """Aggregated frame for one chart; memoized per source frame and state, so figures only get the groups"""
+        return cached_chart_data(export_state, ChartSpec(source, dims, **spec), df)
 
     # Comparison mode logic: treat as comparison active if user selected programs OR years (user-requested behavior)
     comparison_mode = True if (prog_compare and len(prog_compare) >= 1) or (selected_years and len(selected_years) >= 1) else False
@@ -543,23 +728,22 @@ def main_dashboard():
     include_sex = bool(selected_sex) or ("sex" in profiles_filtered.columns if profiles_filtered is not None else False)
 
     # If Separated view, create ident_label columns in relevant dataframes
+    # (labels cached per frame, table versions, filter selection and included fields)
     if view_mode == "Separated":
-        if merged_core is not None and not merged_core.empty:
-            merged_core = build_ident_label(merged_core, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if education_filtered is not None and not education_filtered.empty:
-            education_filtered = build_ident_label(education_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if employment_filtered is not None and not employment_filtered.empty:
-            employment_filtered = build_ident_label(employment_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if surveys_filtered is not None and not surveys_filtered.empty:
-            surveys_filtered = build_ident_label(surveys_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if activities_filtered is not None and not activities_filtered.empty:
-            activities_filtered = build_ident_label(activities_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if competencies_filtered is not None and not competencies_filtered.empty:
-            competencies_filtered = build_ident_label(competencies_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if suggestions_filtered is not None and not suggestions_filtered.empty:
-            suggestions_filtered = build_ident_label(suggestions_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
-        if unemployment_filtered is not None and not unemployment_filtered.empty:
-            unemployment_filtered = build_ident_label(unemployment_filtered, include_degree=include_degree, include_year=include_year, include_sex=include_sex)
+        def with_ident_label(name, df, version):
+            if df is None or df.empty:
+                return df
+            return build_ident_label(df, include_degree=include_degree, include_year=include_year, include_sex=include_sex,
+                                     cache_key=(name, version, selection))
+
+        merged_core = with_ident_label("merged_core", merged_core, merged_versions)
+        education_filtered = with_ident_label("education", education_filtered, versions["education"])
+        employment_filtered = with_ident_label("employment", employment_filtered, versions["employment"])
+        surveys_filtered = with_ident_label("surveys", surveys_filtered, versions["surveys"])
+        activities_filtered = with_ident_label("activities", activities_filtered, versions["activities"])
+        competencies_filtered = with_ident_label("competencies", competencies_filtered, versions["competencies"])
+        suggestions_filtered = with_ident_label("suggestions", suggestions_filtered, versions["suggestions"])
+        unemployment_filtered = with_ident_label("unemployment", unemployment_filtered, versions["unemployment"])
 
     # Active filter summary
     filter_summary = build_filter_summary(prog_compare, selected_years, selected_sex)
@@ -581,7 +765,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 1 — Demographics
     # -----------------------------
-    with tab1:
+    with tab1, span("tab Demographics"):
         st.subheader("👥 Demographics (GTS)")
         if merged_core is None or merged_core.empty:
             st.info("No demographic data for selected filters.")
@@ -591,62 +775,63 @@ def main_dashboard():
             # Gender distribution
             if "sex" in df.columns and not df["sex"].dropna().empty:
                 if view_mode == "Grouped" and comparison_mode and "degree" in df.columns:
-                    gp = pair_counts(df, ["degree", "sex"])
+                    gp = chart(df, "merged_core", "degree", "sex")
                     if not gp.empty:
                         fig = px.bar(gp, x="degree", y="count", color="sex", barmode="group", title="Gender Distribution per Program")
                         st.plotly_chart(fig, use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in df.columns:
-                    gp = df.groupby(["ident_label", "sex"]).size().reset_index(name="count")
+                    gp = chart(df, "merged_core", "ident_label", "sex")
                     fig = px.bar(gp, x="ident_label", y="count", color="sex", barmode="group", title="Gender by Ident Label")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    fig = px.pie(df.dropna(subset=["sex"]), names="sex", hole=0.4, title="Gender Distribution")
+                    fig = px.pie(chart(df, "merged_core", "sex"), names="sex", values="count", hole=0.4, title="Gender Distribution")
                     st.plotly_chart(fig, use_container_width=True)
 
             # Civil status
             if "civil_status" in df.columns and not df["civil_status"].dropna().empty:
                 if view_mode == "Grouped" and comparison_mode and "degree" in df.columns:
-                    gp = pair_counts(df, ["degree", "civil_status"])
+                    gp = chart(df, "merged_core", "degree", "civil_status")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="civil_status", barmode="group", title="Civil Status per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in df.columns:
-                    gp = df.groupby(["ident_label", "civil_status"]).size().reset_index(name="count")
+                    gp = chart(df, "merged_core", "ident_label", "civil_status")
                     fig = px.bar(gp, x="ident_label", y="count", color="civil_status", barmode="stack", title="Civil Status (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    counts = df["civil_status"].value_counts().reset_index()
-                    counts.columns = ["civil_status", "count"]
+                    counts = chart(df, "merged_core", "civil_status", order="count")
                     st.plotly_chart(px.bar(counts, x="civil_status", y="count", title="Civil Status"), use_container_width=True)
 
             # Age distribution
             if "birthday" in df.columns and not df["birthday"].dropna().empty:
                 df["birthday"] = pd.to_datetime(df["birthday"], errors="coerce")
-                df["age"] = df["birthday"].apply(lambda x: (pd.Timestamp.now().year - x.year) if pd.notnull(x) else None)
+                df["age"] = pd.Timestamp.now().year - df["birthday"].dt.year
+                # Histograms are binned from per-age counts (histfunc="sum") instead of one point per alumnus
                 if view_mode == "Grouped" and comparison_mode and "degree" in df.columns:
-                    sub = df.dropna(subset=["age"])
+                    sub = chart(df, "merged_core", "age", "degree")
                     if not sub.empty:
-                        st.plotly_chart(px.histogram(sub, x="age", color="degree", barmode="group", nbins=12, title="Age Distribution per Program"), use_container_width=True)
+                        fig = px.histogram(sub, x="age", y="count", histfunc="sum", color="degree", barmode="group", nbins=12, title="Age Distribution per Program")
+                        st.plotly_chart(fig.update_yaxes(title_text="count"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in df.columns:
-                    sub = df.dropna(subset=["age"])
-                    fig = px.histogram(sub, x="age", color="ident_label", barmode="overlay", nbins=12, title="Age Distribution (by ident_label)")
-                    st.plotly_chart(fig, use_container_width=True)
+                    sub = chart(df, "merged_core", "age", "ident_label")
+                    fig = px.histogram(sub, x="age", y="count", histfunc="sum", color="ident_label", barmode="overlay", nbins=12, title="Age Distribution (by ident_label)")
+                    st.plotly_chart(fig.update_yaxes(title_text="count"), use_container_width=True)
                 else:
-                    sub = df.dropna(subset=["age"])
+                    sub = chart(df, "merged_core", "age")
                     if not sub.empty:
-                        st.plotly_chart(px.histogram(sub, x="age", nbins=12, title="Age Distribution"), use_container_width=True)
+                        fig = px.histogram(sub, x="age", y="count", histfunc="sum", nbins=12, title="Age Distribution")
+                        st.plotly_chart(fig.update_yaxes(title_text="count"), use_container_width=True)
 
             # Province
             if "province" in df.columns and not df["province"].dropna().empty:
-                gp = df["province"].value_counts().reset_index()
-                gp.columns = ["province", "count"]
+                gp = chart(df, "merged_core", "province", order="count")
                 st.plotly_chart(px.bar(gp, x="province", y="count", title="Graduates by Province"), use_container_width=True)
 
-            export_download(df, "demographics_data")
+            export_download(df, "demographics_data", export_state)
 
     # -----------------------------
     # Tab 2 — Education
     # -----------------------------
-    with tab2:
+    with tab2, span("tab Education"):
         st.subheader("🎓 Education (GTS)")
         if education_filtered is None or education_filtered.empty:
             st.info("No education records for selected filters.")
@@ -655,8 +840,7 @@ def main_dashboard():
 
             # show counts per program
             if "degree" in edu_df.columns:
-                deg_counts = edu_df["degree"].value_counts().reset_index()
-                deg_counts.columns = ["degree", "count"]
+                deg_counts = chart(edu_df, "education", "degree", order="count")
                 st.plotly_chart(px.bar(deg_counts, x="degree", y="count", title="Graduates per Program"), use_container_width=True)
 
             # Graduates per year (with identification)
@@ -666,71 +850,62 @@ def main_dashboard():
                 # Both program compare and years selected
                 if prog_compare and selected_years:
                     if view_mode == "Grouped":
-                        gp = edu_df.groupby(["year_graduated", "degree"]).size().reset_index(name="count")
+                        gp = chart(edu_df, "education", "year_graduated", "degree")
                         if not gp.empty:
                             fig = px.line(gp, x="year_graduated", y="count", color="degree", markers=True, title="Graduates per Year (per Program)")
                             st.plotly_chart(fig, use_container_width=True)
                     else:  # Separated: group by ident_label if available
                         if "ident_label" in edu_df.columns:
-                            gp = edu_df.groupby(["year_graduated", "ident_label"]).size().reset_index(name="count")
+                            gp = chart(edu_df, "education", "year_graduated", "ident_label")
                             fig = px.bar(gp, x="year_graduated", y="count", color="ident_label", barmode="group", title="Graduates per Year (by ident_label)")
                             st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                         else:
                             # show each selected program separately across years
                             for prog in prog_compare:
-                                sub = edu_df[edu_df["degree"] == prog]
-                                if sub.empty:
+                                counts = chart(edu_df, "education", "year_graduated", where=(("degree", prog),))
+                                if counts.empty:
                                     continue
-                                counts = sub["year_graduated"].value_counts().sort_index().reset_index()
-                                counts.columns = ["year_graduated", "count"]
                                 st.plotly_chart(px.bar(counts, x="year_graduated", y="count", title=f"Graduates of {prog} per Year"), use_container_width=True)
 
                 elif selected_years and not prog_compare:
                     # Selected years but no specific programs selected -> show degrees in those years
                     if view_mode == "Grouped":
-                        gp = edu_df[edu_df["year_graduated"].isin(selected_years)]
-                        gp = gp.groupby(["year_graduated", "degree"]).size().reset_index(name="count")
+                        gp = chart(edu_df, "education", "year_graduated", "degree", where=(("year_graduated", tuple(selected_years)),))
                         if not gp.empty:
                             fig = px.bar(gp, x="degree", y="count", color="year_graduated", barmode="group", title="Graduates by Degree for Selected Years")
                             st.plotly_chart(fig, use_container_width=True)
                     else:
                         if "ident_label" in edu_df.columns:
-                            sub = edu_df[edu_df["year_graduated"].isin(selected_years)]
-                            gp = sub.groupby(["degree", "ident_label"]).size().reset_index(name="count")
+                            gp = chart(edu_df, "education", "degree", "ident_label", where=(("year_graduated", tuple(selected_years)),))
                             fig = px.bar(gp, x="degree", y="count", color="ident_label", barmode="group", title="Graduates (colored by ident_label)")
                             st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                         else:
                             for yr in selected_years:
-                                sub = edu_df[edu_df["year_graduated"] == yr]
-                                if sub.empty:
+                                counts = chart(edu_df, "education", "degree", where=(("year_graduated", yr),), order="count")
+                                if counts.empty:
                                     continue
-                                counts = sub["degree"].value_counts().reset_index()
-                                counts.columns = ["degree", "count"]
                                 st.plotly_chart(px.bar(counts, x="degree", y="count", title=f"Graduates in {yr}"), use_container_width=True)
 
                 elif prog_compare and not selected_years:
                     # Programs selected, but no years -> show program distribution across all years
                     if view_mode == "Grouped":
-                        gp = edu_df.groupby(["year_graduated", "degree"]).size().reset_index(name="count")
+                        gp = chart(edu_df, "education", "year_graduated", "degree")
                         if not gp.empty:
                             fig = px.line(gp, x="year_graduated", y="count", color="degree", markers=True, title="Graduates per Year (per Program)")
                             st.plotly_chart(fig, use_container_width=True)
                     else:
                         for prog in prog_compare:
-                            sub = edu_df[edu_df["degree"] == prog]
-                            if sub.empty:
+                            counts = chart(edu_df, "education", "year_graduated", where=(("degree", prog),))
+                            if counts.empty:
                                 continue
-                            if "ident_label" in sub.columns:
-                                gp = sub.groupby(["year_graduated", "ident_label"]).size().reset_index(name="count")
+                            if "ident_label" in edu_df.columns:
+                                gp = chart(edu_df, "education", "year_graduated", "ident_label", where=(("degree", prog),))
                                 fig = px.bar(gp, x="year_graduated", y="count", color="ident_label", title=f"Graduates of {prog} (by ident_label)")
                                 st.plotly_chart(fig, use_container_width=True)
                             else:
-                                counts = sub["year_graduated"].value_counts().sort_index().reset_index()
-                                counts.columns = ["year_graduated", "count"]
                                 st.plotly_chart(px.bar(counts, x="year_graduated", y="count", title=f"Graduates of {prog} per Year"), use_container_width=True)
                 else:
-                    gp = edu_df["year_graduated"].value_counts().sort_index().reset_index()
-                    gp.columns = ["year_graduated", "count"]
+                    gp = chart(edu_df, "education", "year_graduated")
                     st.plotly_chart(px.bar(gp, x="year_graduated", y="count", title="Graduates per Year"), use_container_width=True)
 
             # Reasons for taking the course
@@ -750,24 +925,23 @@ def main_dashboard():
                         # fallback minimal merge
                         cr = cr.merge(edu_df[["user_id"]].drop_duplicates(), on="user_id", how="left")
                 if view_mode == "Grouped" and comparison_mode and "degree" in cr.columns:
-                    gp = pair_counts(cr, ["degree", "reason_type"])
+                    gp = chart(cr, "course_reasons", "degree", "reason_type")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="reason_type", barmode="group", title="Reasons for Taking Course per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in cr.columns:
-                    gp = cr.groupby(["ident_label", "reason_type"]).size().reset_index(name="count")
+                    gp = chart(cr, "course_reasons", "ident_label", "reason_type")
                     fig = px.bar(gp, x="ident_label", y="count", color="reason_type", barmode="stack", title="Reasons for Taking Course (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    counts = cr["reason_type"].value_counts().reset_index()
-                    counts.columns = ["reason_type", "count"]
+                    counts = chart(cr, "course_reasons", "reason_type", order="count")
                     st.plotly_chart(px.bar(counts, x="reason_type", y="count", title="Reasons for Taking Course"), use_container_width=True)
 
-            export_download(edu_df, "education_data")
+            export_download(edu_df, "education_data", export_state)
 
     # -----------------------------
     # Tab 3 — Employment
     # -----------------------------
-    with tab3:
+    with tab3, span("tab Employment"):
         st.subheader("💼 Employment (GTS)")
         if (employment_filtered is None or employment_filtered.empty) and (merged_core is None or merged_core.empty):
             st.info("No employment data for selected filters.")
@@ -798,65 +972,62 @@ def main_dashboard():
             # Employment status
             if "is_employed" in emp.columns and not emp["is_employed"].dropna().empty:
                 if view_mode == "Grouped" and comparison_mode and "degree" in emp.columns:
-                    gp = pair_counts(emp, ["degree", "is_employed"])
+                    gp = chart(emp, "employment", "degree", "is_employed")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="is_employed", barmode="group", title="Employment Status per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in emp.columns:
-                    gp = emp.groupby(["ident_label", "is_employed"]).size().reset_index(name="count")
+                    gp = chart(emp, "employment", "ident_label", "is_employed")
                     fig = px.bar(gp, x="ident_label", y="count", color="is_employed", barmode="group", title="Employment Status (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    st.plotly_chart(px.pie(emp.dropna(subset=["is_employed"]), names="is_employed", hole=0.4, title="Employment Status"), use_container_width=True)
+                    st.plotly_chart(px.pie(chart(emp, "employment", "is_employed"), names="is_employed", values="count", hole=0.4, title="Employment Status"), use_container_width=True)
 
             # Employment type
             if "employment_status" in emp.columns and not emp["employment_status"].dropna().empty:
                 if view_mode == "Grouped" and comparison_mode and "degree" in emp.columns:
-                    gp = pair_counts(emp, ["degree", "employment_status"])
+                    gp = chart(emp, "employment", "degree", "employment_status")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="employment_status", barmode="group", title="Employment Type per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in emp.columns:
-                    gp = emp.groupby(["ident_label", "employment_status"]).size().reset_index(name="count")
+                    gp = chart(emp, "employment", "ident_label", "employment_status")
                     fig = px.bar(gp, x="ident_label", y="count", color="employment_status", barmode="stack", title="Employment Type (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    counts = emp["employment_status"].value_counts().reset_index()
-                    counts.columns = ["employment_status", "count"]
+                    counts = chart(emp, "employment", "employment_status", order="count")
                     st.plotly_chart(px.bar(counts, x="employment_status", y="count", title="Employment Type"), use_container_width=True)
 
             # Place of work: ensure alignment
             if "place_of_work" in emp.columns and not emp["place_of_work"].dropna().empty:
                 if view_mode == "Grouped" and comparison_mode and "degree" in emp.columns:
-                    gp = pair_counts(emp, ["degree", "place_of_work"])
+                    gp = chart(emp, "employment", "degree", "place_of_work")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="place_of_work", barmode="group", title="Place of Work (Local vs Abroad) per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in emp.columns:
-                    gp = emp.groupby(["ident_label", "place_of_work"]).size().reset_index(name="count")
+                    gp = chart(emp, "employment", "ident_label", "place_of_work")
                     fig = px.bar(gp, x="ident_label", y="count", color="place_of_work", barmode="stack", title="Place of Work (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    counts = emp["place_of_work"].value_counts().reset_index()
-                    counts.columns = ["place_of_work", "count"]
+                    counts = chart(emp, "employment", "place_of_work", order="count")
                     st.plotly_chart(px.bar(counts, x="place_of_work", y="count", title="Place of Work"), use_container_width=True)
 
             # Industry distribution
             if "business_line" in emp.columns and not emp["business_line"].dropna().empty:
                 emp_lines = emp.dropna(subset=["business_line"]).copy()
                 if view_mode == "Grouped" and comparison_mode and "degree" in emp_lines.columns:
-                    emp_pair = emp_lines.groupby(["degree", "business_line"]).size().reset_index(name="count")
+                    emp_pair = chart(emp_lines, "employment", "degree", "business_line")
                     if not emp_pair.empty:
                         st.plotly_chart(px.treemap(emp_pair, path=["degree", "business_line"], values="count", title="Industry Distribution per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in emp_lines.columns:
-                    gp = emp_lines.groupby(["ident_label", "business_line"]).size().reset_index(name="count")
+                    gp = chart(emp_lines, "employment", "ident_label", "business_line")
                     fig = px.bar(gp, x="ident_label", y="count", color="business_line", barmode="stack", title="Industry Distribution (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    emp_pair = emp_lines["business_line"].value_counts().reset_index()
-                    emp_pair.columns = ["business_line", "count"]
+                    emp_pair = chart(emp_lines, "employment", "business_line", order="count")
                     st.plotly_chart(px.bar(emp_pair, x="business_line", y="count", title="Industry Distribution"), use_container_width=True)
 
             # Salary distribution
             if "initial_gross_monthly_earning" in emp.columns and not emp["initial_gross_monthly_earning"].dropna().empty:
-                emp["salary_numeric"] = emp["initial_gross_monthly_earning"].apply(salary_to_numeric)
+                emp["salary_numeric"] = salary_band_column(emp["initial_gross_monthly_earning"], "estimate")
                 if view_mode == "Grouped" and comparison_mode and "degree" in emp.columns and emp["salary_numeric"].notna().any():
                     st.plotly_chart(px.box(emp.dropna(subset=["salary_numeric"]), x="degree", y="salary_numeric", title="Estimated Salary Distribution per Program (median of range)"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in emp.columns and emp["salary_numeric"].notna().any():
@@ -865,15 +1036,15 @@ def main_dashboard():
                 elif emp["salary_numeric"].notna().any():
                     st.plotly_chart(px.box(emp.dropna(subset=["salary_numeric"]), y="salary_numeric", title="Estimated Salary Distribution (median of range)"), use_container_width=True)
 
-                counts = emp["initial_gross_monthly_earning"].value_counts().reset_index()
-                counts.columns = ["salary_range", "count"]
+                counts = chart(emp, "employment", "initial_gross_monthly_earning", order="count")
+                counts = counts.rename(columns={"initial_gross_monthly_earning": "salary_range"})
                 st.plotly_chart(px.bar(counts, x="salary_range", y="count", title="Salary Ranges"), use_container_width=True)
 
             # Curriculum relevance vs Employment Type (heatmap)
             if "curriculum_relevant" in emp.columns and "employment_status" in emp.columns:
-                heat = emp.dropna(subset=["curriculum_relevant", "employment_status"])
+                heat = chart(emp, "employment", "curriculum_relevant", "employment_status")
                 if not heat.empty:
-                    heatmap = pd.crosstab(heat["curriculum_relevant"], heat["employment_status"])
+                    heatmap = heat.pivot(index="curriculum_relevant", columns="employment_status", values="count").fillna(0).astype(int)
                     try:
                         st.plotly_chart(px.imshow(heatmap.values,
                                                   x=heatmap.columns.tolist(),
@@ -887,12 +1058,11 @@ def main_dashboard():
             for col in ["job_level_first", "job_level_current"]:
                 if col in emp.columns and not emp[col].dropna().empty:
                     if view_mode == "Separated" and "ident_label" in emp.columns:
-                        gp = emp.groupby(["ident_label", col]).size().reset_index(name="count")
+                        gp = chart(emp, "employment", "ident_label", col)
                         fig = px.bar(gp, x="ident_label", y="count", color=col, barmode="stack", title=f"{col.replace('_',' ').title()} Distribution (by ident_label)")
                         st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                     else:
-                        counts = emp[col].value_counts().reset_index()
-                        counts.columns = [col, "count"]
+                        counts = chart(emp, "employment", col, order="count")
                         st.plotly_chart(px.bar(counts, x=col, y="count", title=f"{col.replace('_',' ').title()} Distribution"), use_container_width=True)
 
             # Unemployment reasons
@@ -911,24 +1081,23 @@ def main_dashboard():
                         pass
 
                 if view_mode == "Grouped" and comparison_mode and "degree" in un.columns:
-                    gp = pair_counts(un, ["degree", "reason"])
+                    gp = chart(un, "unemployment", "degree", "reason")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="reason", barmode="group", title="Unemployment Reasons per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in un.columns:
-                    gp = un.groupby(["ident_label", "reason"]).size().reset_index(name="count")
+                    gp = chart(un, "unemployment", "ident_label", "reason")
                     fig = px.bar(gp, x="ident_label", y="count", color="reason", barmode="stack", title="Unemployment Reasons (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
-                    counts = un["reason"].value_counts().reset_index()
-                    counts.columns = ["reason", "count"]
+                    counts = chart(un, "unemployment", "reason", order="count")
                     st.plotly_chart(px.bar(counts, x="reason", y="count", title="Unemployment Reasons"), use_container_width=True)
 
-            export_download(emp, "employment_data")
+            export_download(emp, "employment_data", export_state)
 
     # -----------------------------
     # Tab 4 — Engagement
     # -----------------------------
-    with tab4:
+    with tab4, span("tab Engagement"):
         st.subheader("📱 Engagement (GTS)")
         # Surveys
         if surveys_filtered is not None and not surveys_filtered.empty:
@@ -947,13 +1116,11 @@ def main_dashboard():
 
             if "is_completed" in s.columns:
                 if view_mode == "Grouped" and comparison_mode and "degree" in s.columns:
-                    gp = s.groupby("degree").agg(total=("is_completed", "count"), completed=("is_completed", "sum")).reset_index()
-                    gp["pct_completed"] = (gp["completed"] / gp["total"]) * 100
+                    gp = chart(s, "surveys", "degree", measure=("rate", "is_completed")).rename(columns={"rate": "pct_completed"})
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="pct_completed", text=gp["pct_completed"].round(1), title="Survey Completion Rate per Program"), use_container_width=True)
                 elif view_mode == "Separated" and "ident_label" in s.columns:
-                    gp = s.groupby(["ident_label"]).agg(total=("is_completed", "count"), completed=("is_completed", "sum")).reset_index()
-                    gp["pct_completed"] = (gp["completed"] / gp["total"]) * 100
+                    gp = chart(s, "surveys", "ident_label", measure=("rate", "is_completed")).rename(columns={"rate": "pct_completed"})
                     fig = px.bar(gp, x="ident_label", y="pct_completed", text=gp["pct_completed"].round(1), title="Survey Completion (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 else:
@@ -980,41 +1147,40 @@ def main_dashboard():
 
             if view_mode == "Grouped" and comparison_mode and "degree" in a.columns:
                 if "activity_type" in a.columns and not a["activity_type"].dropna().empty:
-                    gp = pair_counts(a, ["degree", "activity_type"])
+                    gp = chart(a, "activities", "degree", "activity_type")
                     if not gp.empty:
                         st.plotly_chart(px.bar(gp, x="degree", y="count", color="activity_type", barmode="group", title="Activity Types per Program"), use_container_width=True)
                 if "created_at" in a.columns:
                     a["date"] = a["created_at"].dt.date
-                    gp2 = a.groupby(["degree", "date"]).size().reset_index(name="count")
+                    gp2 = chart(a, "activities", "degree", "date")
                     if not gp2.empty:
                         st.plotly_chart(px.line(gp2, x="date", y="count", color="degree", title="Activity Timeline per Program"), use_container_width=True)
             elif view_mode == "Separated" and "ident_label" in a.columns:
                 if "activity_type" in a.columns and not a["activity_type"].dropna().empty:
-                    gp = a.groupby(["ident_label", "activity_type"]).size().reset_index(name="count")
+                    gp = chart(a, "activities", "ident_label", "activity_type")
                     fig = px.bar(gp, x="ident_label", y="count", color="activity_type", barmode="stack", title="Activity Types (by ident_label)")
                     st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
                 if "created_at" in a.columns:
                     a["date"] = a["created_at"].dt.date
-                    gp2 = a.groupby(["ident_label", "date"]).size().reset_index(name="count")
+                    gp2 = chart(a, "activities", "ident_label", "date")
                     if not gp2.empty:
                         st.plotly_chart(px.line(gp2, x="date", y="count", color="ident_label", title="Activity Timeline (by ident_label)"), use_container_width=True)
             else:
                 if "activity_type" in a.columns and not a["activity_type"].dropna().empty:
-                    counts = a["activity_type"].value_counts().reset_index()
-                    counts.columns = ["activity_type", "count"]
+                    counts = chart(a, "activities", "activity_type", order="count")
                     st.plotly_chart(px.bar(counts, x="activity_type", y="count", title="Activity Types"), use_container_width=True)
                 if "created_at" in a.columns:
                     a["date"] = a["created_at"].dt.date
-                    gp2 = a.groupby("date").size().reset_index(name="count")
+                    gp2 = chart(a, "activities", "date")
                     if not gp2.empty:
                         st.plotly_chart(px.line(gp2, x="date", y="count", title="System Activity Over Time"), use_container_width=True)
 
-        export_download(activities_filtered, "activities_data")
+        export_download(activities_filtered, "activities_data", export_state)
 
     # -----------------------------
     # Tab 5 — Competencies & Curriculum
     # -----------------------------
-    with tab5:
+    with tab5, span("tab Competencies & Curriculum"):
         st.subheader("🛠️ Competencies & Curriculum Feedback")
         if competencies_filtered is None or competencies_filtered.empty:
             st.info("No competencies data for selected filters.")
@@ -1033,16 +1199,15 @@ def main_dashboard():
                     pass
 
             if view_mode == "Grouped" and comparison_mode and "degree" in comp.columns and "competency" in comp.columns:
-                gp = pair_counts(comp, ["degree", "competency"])
+                gp = chart(comp, "competencies", "degree", "competency")
                 if not gp.empty:
                     st.plotly_chart(px.bar(gp, x="degree", y="count", color="competency", barmode="group", title="Useful Competencies per Program"), use_container_width=True)
             elif view_mode == "Separated" and "ident_label" in comp.columns and "competency" in comp.columns:
-                gp = comp.groupby(["ident_label", "competency"]).size().reset_index(name="count")
+                gp = chart(comp, "competencies", "ident_label", "competency")
                 fig = px.bar(gp, x="ident_label", y="count", color="competency", barmode="stack", title="Useful Competencies (by ident_label)")
                 st.plotly_chart(fig.update_xaxes(tickangle=45), use_container_width=True)
             elif "competency" in comp.columns:
-                counts = comp["competency"].value_counts().reset_index()
-                counts.columns = ["competency", "count"]
+                counts = chart(comp, "competencies", "competency", order="count")
                 st.plotly_chart(px.bar(counts, x="competency", y="count", title="Useful Competencies"), use_container_width=True)
 
         # Suggestions
@@ -1076,7 +1241,7 @@ def main_dashboard():
                 st.write("**Curriculum Suggestions**")
                 st.dataframe(s[["user_id", "suggestion"]])
 
-        export_download(competencies_filtered, "competencies_data")
+        export_download(competencies_filtered, "competencies_data", export_state)
 
 # =============================
 # RUN APP
@@ -1084,12 +1249,18 @@ def main_dashboard():
 def run_app():
     main_dashboard()
     if st.sidebar.button("🔄 Manual Refresh"):
-        # clear cached queries so new data is fetched
+        # bump every table version so the next run reloads all tables
         try:
-            # clear cached run_query results by time-shortening the cache decorator TTLs is best, but we can also call st.experimental_rerun()
+            watcher = get_database_watcher()
+            watcher.mark_changed()
+            # also applies when auto-refresh is off
+            st.session_state.table_versions = watcher.versions()
             st.experimental_rerun()
         except Exception:
             pass
 
 if __name__ == "__main__":
-    run_app()
+    # Stage timings per run; the panel is only shown with ?trace=<ALUMIFY_TRACE_KEY>
+    with traced_run("dashboard_2025"):
+        run_app()
+        render_trace_panel()
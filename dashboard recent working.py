@@ -7,7 +7,9 @@ import time
 from threading import Thread, Event
 from queue import Queue
 import numpy as np
-import re
+from salary_bands import salary_band, salary_band_column
+from connection_pool import ConnectionPool
+from tracing import render_trace_panel, span, traced, traced_run
 
 # =============================
 # CONFIG
@@ -50,6 +52,13 @@ def get_db_connection():
             time.sleep(1)
     return None
 
+# =============================
+# CONNECTION POOL
+# =============================
+@st.cache_resource
+def get_connection_pool():
+    return ConnectionPool(get_db_connection)
+
 # =============================
 # DB WATCHER
 # =============================
@@ -124,20 +133,28 @@ class DatabaseWatcher:
             except Exception:
                 pass
 
+# One watcher thread per process instead of one per session
+@st.cache_resource
+def get_database_watcher():
+    return DatabaseWatcher()
+
 # =============================
 # RUN QUERY
 # =============================
 def run_query(query):
-    conn, cursor = None, None
+    pool = get_connection_pool()
+    conn = pool.checkout()
+    if conn is None:
+        return []
+    cursor, broken = None, False
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return []
         cursor = conn.cursor(dictionary=True, buffered=True)
         cursor.execute(query)
         results = cursor.fetchall()
         return results if results else []
     except mysql.connector.Error as e:
+        # connection-level failures must not go back into the pool
+        broken = isinstance(e, (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError))
         try:
             st.error(f"Database query error: {str(e)}")
         except Exception:
@@ -149,48 +166,55 @@ def run_query(query):
                 cursor.close()
             except Exception:
                 pass
-        if conn and getattr(conn, "is_connected", lambda: False)():
-            try:
-                conn.close()
-            except Exception:
-                pass
+        pool.checkin(conn, discard=broken)
 
 # =============================
 # LOAD DATA
 # =============================
+@traced
 def load_users_data():
     return pd.DataFrame(run_query("SELECT id as user_id, email, name, role, created_at, updated_at FROM users WHERE role!='admin'"))
 
+@traced
 def load_profiles_data():
     return pd.DataFrame(run_query("SELECT * FROM graduate_profiles"))
 
+@traced
 def load_employment_data():
     return pd.DataFrame(run_query("SELECT * FROM employment_data"))
 
+@traced
 def load_education_data():
     return pd.DataFrame(run_query("SELECT * FROM educational_background"))
 
+@traced
 def load_survey_data():
     return pd.DataFrame(run_query("SELECT * FROM survey_responses"))
 
+@traced
 def load_activity_data():
     return pd.DataFrame(run_query("SELECT * FROM activity_logs"))
 
+@traced
 def load_course_reasons():
     return pd.DataFrame(run_query("SELECT * FROM course_reasons"))
 
+@traced
 def load_competencies():
     return pd.DataFrame(run_query("SELECT * FROM useful_competencies"))
 
+@traced
 def load_suggestions():
     return pd.DataFrame(run_query("SELECT * FROM curriculum_suggestions"))
 
+@traced
 def load_unemployment_reasons():
     return pd.DataFrame(run_query("SELECT * FROM unemployment_reasons"))
 
 # =============================
 # UTILS
 # =============================
+@traced
 def export_download(df, label="data_export"):
     if df is None:
         return
@@ -209,21 +233,10 @@ def export_download(df, label="data_export"):
     )
 
 def salary_to_numeric(s):
+    """Estimated amount of one salary label (parsed once per distinct label, see salary_bands.py)"""
     if pd.isna(s):
         return np.nan
-    s = str(s)
-    nums = re.findall(r'\d+(?:,\d{3})*', s)
-    nums = [int(n.replace(',', '')) for n in nums]
-    if len(nums) == 0:
-        return np.nan
-    low_s = s.lower()
-    if 'below' in low_s:
-        return nums[0] * 0.8
-    if 'and above' in low_s or 'above' in low_s:
-        return nums[0] * 1.2
-    if len(nums) == 1:
-        return float(nums[0])
-    return float((nums[0] + nums[-1]) / 2)
+    return salary_band(str(s)).estimate
 
 def pair_counts(df, cols):
     if df is None or df.empty:
@@ -241,7 +254,7 @@ def init_app():
     st.set_page_config(page_title="Alumify GTS Dashboard", page_icon="📊", layout="wide")
     if "db_watcher" not in st.session_state:
         try:
-            st.session_state.db_watcher = DatabaseWatcher()
+            st.session_state.db_watcher = get_database_watcher()
         except Exception:
             pass
     if "db_connection_error" not in st.session_state:
@@ -348,7 +361,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 1 — Demographics
     # -----------------------------
-    with tab1:
+    with tab1, span("tab Demographics"):
         st.subheader("👥 Demographics (GTS)")
         if merged_core is None or merged_core.empty:
             st.info("Walang demographic data para sa selected filters.")
@@ -396,7 +409,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 2 — Education
     # -----------------------------
-    with tab2:
+    with tab2, span("tab Education"):
         st.subheader("🎓 Education (GTS)")
         if education is None or education.empty:
             st.info("Walang education records sa mga napiling filters.")
@@ -438,7 +451,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 3 — Employment
     # -----------------------------
-    with tab3:
+    with tab3, span("tab Employment"):
         st.subheader("💼 Employment (GTS)")
         if (employment is None or employment.empty) and (merged_core is None or merged_core.empty):
             st.info("Walang employment data para sa napiling filters.")
@@ -492,7 +505,7 @@ def main_dashboard():
 
             # Salary distribution
             if "initial_gross_monthly_earning" in emp.columns and not emp["initial_gross_monthly_earning"].dropna().empty:
-                emp["salary_numeric"] = emp["initial_gross_monthly_earning"].apply(salary_to_numeric)
+                emp["salary_numeric"] = salary_band_column(emp["initial_gross_monthly_earning"], "estimate")
                 if comparison_mode and "degree" in emp.columns and emp["salary_numeric"].notna().any():
                     st.plotly_chart(px.box(emp.dropna(subset=["salary_numeric"]), x="degree", y="salary_numeric", title="Estimated Salary Distribution per Program (median of range)"), use_container_width=True)
                 elif emp["salary_numeric"].notna().any():
@@ -522,7 +535,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 4 — Engagement
     # -----------------------------
-    with tab4:
+    with tab4, span("tab Engagement"):
         st.subheader("📱 Engagement (GTS)")
         # Surveys
         if surveys is not None and not surveys.empty:
@@ -574,7 +587,7 @@ def main_dashboard():
     # -----------------------------
     # Tab 5 — Competencies & Curriculum
     # -----------------------------
-    with tab5:
+    with tab5, span("tab Competencies & Curriculum"):
         st.subheader("🛠️ Competencies & Curriculum Feedback")
         if competencies is None or competencies.empty:
             st.info("Walang competencies data para sa napiling filters.")
@@ -615,4 +628,7 @@ def run_app():
         st.rerun()
 
 if __name__ == "__main__":
-    run_app()
+    # Stage timings per run; the panel is only shown with ?trace=<ALUMIFY_TRACE_KEY>
+    with traced_run("dashboard_recent_working"):
+        run_app()
+        render_trace_panel()
@@ -4,12 +4,144 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime
+from datetime import datetime, timedelta
 import mysql.connector
 import warnings
-import io
+import time
+import threading
+from streaming_export import lazy_download_button
+from tracing import render_trace_panel, span, traced, traced_run
 warnings.filterwarnings('ignore')
 
+# Tables mirrored into the dashboard. Each entry names the attribute holding the
+# frame, the high-water-mark column used to fetch only new or changed rows on
+# refresh (updated_at for mutable tables, id for append-only ones) and the column
+# manifest: only the columns the Executive Overview and Data Explorer render.
+SYNC_TABLES = {
+    'users': {
+        'attr': 'users_df', 'watermark': 'updated_at', 'where': "role != 'admin'",
+        'columns': ['id', 'name', 'email', 'updated_at'],
+    },
+    'activity_logs': {
+        'attr': 'activity_df', 'watermark': 'id',
+        'columns': ['id', 'user_id', 'activity_type', 'created_at'],
+    },
+    'educational_background': {
+        'attr': 'education_df', 'watermark': 'updated_at',
+        'columns': ['id', 'user_id', 'degree', 'year_graduated', 'updated_at'],
+    },
+    'employment_data': {
+        'attr': 'employment_df', 'watermark': 'updated_at',
+        'columns': ['id', 'user_id', 'is_employed', 'employment_status', 'present_occupation',
+                    'business_line', 'place_of_work', 'updated_at'],
+    },
+    'graduate_profiles': {
+        'attr': 'profiles_df', 'watermark': 'updated_at',
+        'columns': ['id', 'user_id', 'sex', 'civil_status', 'updated_at'],
+    },
+    'survey_responses': {
+        'attr': 'survey_df', 'watermark': 'updated_at',
+        'columns': ['id', 'user_id', 'is_completed', 'completed_at', 'updated_at'],
+    },
+    'course_reasons': {
+        'attr': 'course_reasons_df', 'watermark': 'id',
+        'columns': ['id', 'user_id', 'reason_type', 'level'],
+    },
+    'unemployment_reasons': {
+        'attr': 'unemployment_df', 'watermark': 'id',
+        'columns': ['id', 'user_id', 'reason'],
+    },
+    'useful_competencies': {
+        'attr': 'competencies_df', 'watermark': 'id',
+        'columns': ['id', 'user_id', 'competency'],
+    },
+}
+
+# Wide or sensitive columns left out of the manifests above. They are fetched
+# per alumnus only when a record is opened in the Data Explorer.
+DETAIL_COLUMNS = {
+    'graduate_profiles': ['permanent_address', 'telephone', 'mobile_number', 'birthday',
+                          'region_of_origin', 'province'],
+    'educational_background': ['specialization', 'college_university', 'honors_awards'],
+    'employment_data': ['job_level_first', 'job_level_current', 'initial_gross_monthly_earning',
+                        'curriculum_relevant'],
+    'activity_logs': ['activity_type', 'description', 'created_at'],
+}
+
+# Seconds between id-set reconciliations that drop rows deleted in the database
+RECONCILE_INTERVAL = 300
+
+# Seconds since the last sync before a reader triggers a delta sync
+SNAPSHOT_MAX_AGE = 10
+
+# Read Data Explorer pages from the alumni_overview view (database/alumify_schema.sql);
+# off, or when the view is missing, pages are sliced from merged_df. Nothing else reads the view
+EXPLORER_FROM_VIEW = True
+
+# merged_df is joined from the synced frames with the same projection as alumni_overview:
+# users (id, name, email) plus these columns of each table, matched on user_id
+MERGED_SOURCES = {
+    'graduate_profiles': ['sex', 'civil_status'],
+    'educational_background': ['degree', 'year_graduated'],
+    'employment_data': ['is_employed', 'employment_status', 'present_occupation', 'business_line',
+                        'place_of_work'],
+    'survey_responses': ['is_completed', 'completed_at'],
+}
+# Tables merged_df is built from; a sync that changed none of them keeps the current merge
+MERGED_TABLES = {'users'} | set(MERGED_SOURCES)
+
+# Per-group KPI counts maintained in the database (alumni_kpi_summary in database/alumify_schema.sql);
+# the KPI header falls back to the frames when the table is missing
+KPI_SUMMARY_QUERY = (
+    "SELECT degree, year_graduated, sex, is_employed, alumni, surveys_completed "
+    "FROM alumni_kpi_summary"
+)
+# Tables the summary is grouped from; refresh_alumni_kpi_summary() only runs when one of them changed
+KPI_SOURCE_TABLES = {'users', 'graduate_profiles', 'educational_background', 'employment_data', 'survey_responses'}
+
+# "Time Period" filter -> days back from now (None = all time)
+TIME_PERIOD_DAYS = {"All Time": None, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365}
+
+# Data Explorer page sizes and sort options: label -> (alumni_overview column, descending).
+# The sort columns are indexed (database/alumify_schema.sql), so pages are read with
+# keyset pagination over (column, id) instead of OFFSET scans over the filtered set
+EXPLORER_PAGE_SIZES = [10, 25, 50, 100]
+EXPLORER_SORTS = {
+    "Name": ("name", False),
+    "Graduation Year": ("year_graduated", True),
+    "Employment Status": ("is_employed", False),
+}
+EXPLORER_COLUMNS = ['id', 'name', 'email', 'degree', 'year_graduated', 'sex', 'is_employed',
+                    'present_occupation', 'business_line', 'place_of_work', 'is_completed']
+
+# Aggregates memoized per snapshot (filter state x group keys) before the oldest is evicted
+AGGREGATE_CACHE_SIZE = 256
+
+# ENUM columns from database/alumify_schema.sql in declaration order. They are
+# loaded as pandas categoricals so filters, value_counts and groupby work on
+# integer codes instead of repeated strings.
+ENUM_CATEGORIES = {
+    'is_employed': ['Yes', 'No', 'Never Employed'],
+    'employment_status': ['Regular or Permanent', 'Contractual', 'Temporary', 'Self-employed', 'Casual'],
+    'place_of_work': ['Local', 'Abroad'],
+    'sex': ['Male', 'Female'],
+    'civil_status': ['Single', 'Married', 'Separated', 'Widow or Widower', 'Single Parent'],
+    'activity_type': ['registration', 'login', 'survey_completed', 'profile_updated',
+                      'survey_started', 'survey_updated', 'password_changed'],
+    'level': ['Undergraduate', 'Graduate'],
+}
+
+# Low-cardinality free-text columns, categorised by their observed values
+CATEGORY_COLUMNS = ['degree', 'business_line']
+
+# Compact nullable integer types for keys, years and boolean flags
+NUMERIC_DTYPES = {
+    'id': 'Int32',
+    'user_id': 'Int32',
+    'year_graduated': 'Int16',
+    'is_completed': 'Int8',
+}
+
 # Page configuration
 st.set_page_config(
     page_title="Alumify Analytics Dashboard",
@@ -207,8 +339,134 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def apply_column_types(df):
+    """Convert the known columns of a loaded frame to compact dtypes in place"""
+    for col, categories in ENUM_CATEGORIES.items():
+        if col in df.columns:
+            # Keep values outside the declared ENUM rather than turning them into NaN
+            extra = sorted(set(df[col].dropna()) - set(categories))
+            df[col] = pd.Categorical(df[col], categories=categories + extra)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category').cat.remove_unused_categories()
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df
+
+def filter_state_key(filters):
+    """Hashable key of the filters that apply_enhanced_filters uses"""
+    return (
+        tuple(sorted(filters['programs'])),
+        tuple(filters['year_range']),
+        filters['gender'],
+        filters['employment_status'],
+    )
+
+def filter_frame(df, filters):
+    """Rows of a frame with degree / year_graduated / sex / is_employed columns matching the filters"""
+    # Apply program filter
+    if 'All Programs' not in filters['programs'] and filters['programs']:
+        df = df[df['degree'].isin(filters['programs'])]
+    
+    # Apply year range filter - FIXED: Ensure integer comparison
+    df = df[
+        (df['year_graduated'] >= filters['year_range'][0]) & 
+        (df['year_graduated'] <= filters['year_range'][1])
+    ]
+    
+    # Apply gender filter
+    if filters['gender'] != 'All':
+        df = df[df['sex'] == filters['gender']]
+    
+    # Apply employment status filter
+    if filters['employment_status'] != 'All':
+        df = df[df['is_employed'] == filters['employment_status']]
+    
+    return df
+
+def filter_conditions(filters):
+    """SQL conditions and params matching filter_frame, for queries on alumni_overview"""
+    conditions, params = [], []
+    if 'All Programs' not in filters['programs'] and filters['programs']:
+        conditions.append(f"degree IN ({', '.join(['%s'] * len(filters['programs']))})")
+        params.extend(filters['programs'])
+    conditions.append("year_graduated BETWEEN %s AND %s")
+    params.extend(int(year) for year in filters['year_range'])
+    if filters['gender'] != 'All':
+        conditions.append("sex = %s")
+        params.append(filters['gender'])
+    if filters['employment_status'] != 'All':
+        conditions.append("is_employed = %s")
+        params.append(filters['employment_status'])
+    return conditions, params
+
+def sort_value(column, value):
+    """Sort key of a value as MySQL orders the column: ENUMs by declaration index, None for NULL"""
+    if pd.isna(value):
+        return None
+    if column in ENUM_CATEGORIES:
+        return ENUM_CATEGORIES[column].index(value) + 1
+    return int(value) if isinstance(value, (int, np.integer)) else value
+
+def keyset_condition(column, descending, cursor):
+    """SQL condition and params for the rows after cursor = (sort value, id) in ORDER BY column, id.
+    
+    MySQL sorts NULLs first ascending and last descending; ENUM columns compare by index.
+    """
+    value, last_id = cursor
+    if descending:
+        if value is None:
+            return f"({column} IS NULL AND id < %s)", [last_id]
+        return f"({column} < %s OR ({column} = %s AND id < %s) OR {column} IS NULL)", [value, value, last_id]
+    if value is None:
+        return f"(({column} IS NULL AND id > %s) OR {column} IS NOT NULL)", [last_id]
+    return f"({column} > %s OR ({column} = %s AND id > %s))", [value, value, last_id]
+
+def explorer_order(df, sort_by):
+    """Row positions of df in Data Explorer order (the same order as the keyset pages)"""
+    column, descending = EXPLORER_SORTS[sort_by]
+    keys = df[[column, 'id']].reset_index(drop=True)
+    keys = keys.sort_values(
+        [column, 'id'], ascending=not descending, na_position='last' if descending else 'first', kind='stable'
+    )
+    return keys.index.to_numpy()
+
+def summary_kpis(summary, filters):
+    """Header KPIs summed from the alumni_kpi_summary rows, whatever the number of alumni"""
+    rows = filter_frame(summary, filters)
+    filtered_alumni = int(rows['alumni'].sum())
+    employed = int(rows.loc[rows['is_employed'].eq('Yes').fillna(False), 'alumni'].sum())
+    return {
+        'total_alumni': int(summary['alumni'].sum()),
+        'filtered_alumni': filtered_alumni,
+        'employed': employed,
+        'employment_rate': employed / filtered_alumni * 100 if filtered_alumni else 0,
+        'completed_surveys': int(summary['surveys_completed'].sum()),
+    }
+
+def employment_rate_by(df, keys=()):
+    """Employed count, total and employment rate per group in one vectorized pass.
+    
+    keys are any merged_df columns (degree, year_graduated, sex, place_of_work, ...);
+    with no keys a single overall row is returned.
+    """
+    employed = df['is_employed'].eq('Yes').fillna(False).astype(int)
+    keys = list(keys)
+    if keys:
+        result = employed.groupby([df[k] for k in keys], observed=True).agg(['sum', 'size'])
+        result = result.rename(columns={'sum': 'employed', 'size': 'total'}).reset_index()
+    else:
+        result = pd.DataFrame({'employed': [int(employed.sum())], 'total': [len(df)]})
+    total = result['total'].where(result['total'] > 0)
+    result['employment_rate'] = (result['employed'] / total * 100).fillna(0)
+    return result
+
 class AlumifyDashboard:
     def __init__(self):
+        self.watermarks = {}
+        self.last_reconciled = 0.0
+        self.kpi_summary = None
         self.connection = self.create_connection()
         if self.connection:
             self.load_data()
@@ -235,76 +493,343 @@ class AlumifyDashboard:
         """Refresh all data from database"""
         if self.connection:
             try:
-                self.load_data()
+                self.load_data(reconcile=True)
                 return True
             except Exception as e:
                 st.error(f"Error refreshing data: {e}")
                 return False
         return False
     
-    def load_data(self):
-        """Load all data from database"""
+    @traced
+    def load_data(self, full=False, reconcile=False):
+        """Load all data from database, fetching only changed rows after the first load.
+        
+        Returns True when any frame changed.
+        """
         with st.spinner('Loading live data from database...'):
-            # Load users data - EXCLUDE ADMIN from the start
-            self.users_df = pd.read_sql("SELECT * FROM users WHERE role != 'admin'", self.connection)
-            
-            # Load activity logs
-            self.activity_df = pd.read_sql("SELECT * FROM activity_logs", self.connection)
-            
-            # Load educational background
-            self.education_df = pd.read_sql("SELECT * FROM educational_background", self.connection)
-            
-            # Load employment data
-            self.employment_df = pd.read_sql("SELECT * FROM employment_data", self.connection)
-            
-            # Load graduate profiles
-            self.profiles_df = pd.read_sql("SELECT * FROM graduate_profiles", self.connection)
-            
-            # Load survey responses
-            self.survey_df = pd.read_sql("SELECT * FROM survey_responses", self.connection)
-            
-            # Load course reasons
-            self.course_reasons_df = pd.read_sql("SELECT * FROM course_reasons", self.connection)
-            
-            # Load unemployment reasons
-            self.unemployment_df = pd.read_sql("SELECT * FROM unemployment_reasons", self.connection)
-            
-            # Load useful competencies
-            self.competencies_df = pd.read_sql("SELECT * FROM useful_competencies", self.connection)
+            if full or not self.watermarks:
+                # Initial load - users query EXCLUDES ADMIN from the start
+                for table, spec in SYNC_TABLES.items():
+                    df = apply_column_types(pd.read_sql(self.build_sync_query(table), self.connection))
+                    setattr(self, spec['attr'], df)
+                    self.watermarks[table] = self.current_watermark(df, spec['watermark'])
+                self.last_reconciled = time.time()
+                changed_tables = set(SYNC_TABLES)
+            else:
+                self.connection.ping(reconnect=True)
+                changed_tables = {table for table in SYNC_TABLES if self.sync_table(table)}
+                if reconcile or time.time() - self.last_reconciled >= RECONCILE_INTERVAL:
+                    changed_tables |= self.reconcile_deletes()
             
-            # Create merged dataset for comprehensive analysis
-            self.create_merged_data()
-    
-    def create_merged_data(self):
-        """Create comprehensive merged dataset"""
-        # Merge users with profiles
-        merged = self.users_df.merge(
-            self.profiles_df, left_on='id', right_on='user_id', how='left', suffixes=('', '_profile')
-        )
+            # Rejoin the merged dataset from the synced frames when one of its tables changed
+            if changed_tables & MERGED_TABLES:
+                self.create_merged_data()
+            # A scheduled event also rebuilds the summary; refresh it now so the KPIs match the
+            # frames, but only when one of its source tables moved (not on every activity insert)
+            summary_changed = self.load_kpi_summary(refresh=bool(changed_tables & KPI_SOURCE_TABLES))
+            return bool(changed_tables) or summary_changed
+    
+    def build_sync_query(self, table, condition=None, columns=None):
+        """Build the SELECT used to sync a table, keeping its base filter and column manifest"""
+        spec = SYNC_TABLES[table]
+        clauses = [c for c in (spec.get('where'), condition) if c]
+        columns = columns or ', '.join(spec['columns'])
+        query = f"SELECT {columns} FROM {table}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return query
+    
+    @staticmethod
+    def current_watermark(df, column):
+        """Return the high-water mark of a loaded frame, or None when empty"""
+        if df.empty or column not in df.columns:
+            return None
+        mark = df[column].max()
+        if pd.isna(mark):
+            return None
+        return int(mark) if column == 'id' else pd.Timestamp(mark).to_pydatetime()
+    
+    def sync_table(self, table):
+        """Fetch rows past the table's high-water mark and upsert them by primary key"""
+        spec = SYNC_TABLES[table]
+        mark = self.watermarks.get(table)
+        if mark is None:
+            delta = pd.read_sql(self.build_sync_query(table), self.connection)
+        else:
+            # Timestamps have one-second resolution, so re-read the boundary second
+            op = '>=' if spec['watermark'] == 'updated_at' else '>'
+            delta = pd.read_sql(
+                self.build_sync_query(table, f"{spec['watermark']} {op} %s"),
+                self.connection,
+                params=(mark,)
+            )
+        if delta.empty:
+            return False
         
-        # Merge with education
-        merged = merged.merge(
-            self.education_df, left_on='id', right_on='user_id', how='left', suffixes=('', '_edu')
-        )
+        current = getattr(self, spec['attr'])
+        if current.empty:
+            updated = delta
+        else:
+            updated = pd.concat(
+                [current[~current['id'].isin(delta['id'])], delta], ignore_index=True
+            )
+        # concat falls back to object columns when category sets differ
+        updated = apply_column_types(updated)
+        setattr(self, spec['attr'], updated)
+        self.watermarks[table] = self.current_watermark(updated, spec['watermark'])
+        return True
+    
+    def reconcile_deletes(self):
+        """Drop rows whose ids no longer exist in the database; returns the tables that lost rows"""
+        changed = set()
+        for table, spec in SYNC_TABLES.items():
+            current = getattr(self, spec['attr'])
+            if current.empty:
+                continue
+            live_ids = pd.read_sql(self.build_sync_query(table, columns='id'), self.connection)['id']
+            keep = current['id'].isin(live_ids)
+            if not keep.all():
+                setattr(self, spec['attr'], current[keep].reset_index(drop=True))
+                changed.add(table)
+        self.last_reconciled = time.time()
+        return changed
+    
+    def fetch_details(self, user_id):
+        """Fetch the DETAIL_COLUMNS of one alumnus, keyed by table"""
+        self.connection.ping(reconnect=True)
+        details = {}
+        for table, columns in DETAIL_COLUMNS.items():
+            query = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = %s"
+            if table == 'activity_logs':
+                query += " ORDER BY created_at DESC LIMIT 10"
+            details[table] = pd.read_sql(query, self.connection, params=(int(user_id),))
+        return details
+    
+    def load_kpi_summary(self, refresh=False):
+        """Read alumni_kpi_summary (None if it is unavailable); returns True when it changed.
         
-        # Merge with employment
-        merged = merged.merge(
-            self.employment_df, left_on='id', right_on='user_id', how='left', suffixes=('', '_emp')
-        )
+        With refresh, refresh_alumni_kpi_summary() runs first; it only regroups when a
+        source table changed since the last build.
+        """
+        try:
+            if refresh:
+                cursor = self.connection.cursor()
+                try:
+                    cursor.callproc('refresh_alumni_kpi_summary')
+                finally:
+                    cursor.close()
+            summary = apply_column_types(pd.read_sql(KPI_SUMMARY_QUERY, self.connection))
+        except Exception:
+            summary = None
+        if summary is None or self.kpi_summary is None:
+            changed = summary is not self.kpi_summary
+        else:
+            changed = not summary.equals(self.kpi_summary)
+        self.kpi_summary = summary
+        return changed
+    
+    def count_activities(self, days=None):
+        """Activities of the last `days` days (all when None) summed from activity_rollup, or None if unavailable"""
+        query = "SELECT COALESCE(SUM(activities), 0) AS activities FROM activity_rollup"
+        params = None
+        if days:
+            # The period bound is pushed down to the rollup's (activity_hour, ...) primary key
+            query += " WHERE activity_hour >= %s"
+            params = (datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=days),)
+        try:
+            self.connection.ping(reconnect=True)
+            return int(pd.read_sql(query, self.connection, params=params)['activities'].iloc[0])
+        except Exception:
+            return None
+    
+    @traced
+    def fetch_explorer_page(self, filters, sort_by, page_size, cursor=None):
+        """Read one Data Explorer page from alumni_overview, or None if the view is unavailable.
         
-        # Merge with survey responses
-        merged = merged.merge(
-            self.survey_df, left_on='id', right_on='user_id', how='left', suffixes=('', '_survey')
+        The filters, ORDER BY and the keyset cursor (sort value and id of the previous
+        page's last row) are pushed down; one row past the page tells whether more follow.
+        """
+        column, descending = EXPLORER_SORTS[sort_by]
+        conditions, params = filter_conditions(filters)
+        if cursor is not None:
+            condition, cursor_params = keyset_condition(column, descending, cursor)
+            conditions.append(condition)
+            params.extend(cursor_params)
+        direction = "DESC" if descending else "ASC"
+        query = (
+            f"SELECT {', '.join(EXPLORER_COLUMNS)} FROM alumni_overview "
+            f"WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {column} {direction}, id {direction} LIMIT %s"
         )
+        try:
+            self.connection.ping(reconnect=True)
+            return apply_column_types(pd.read_sql(query, self.connection, params=tuple(params) + (page_size + 1,)))
+        except Exception:
+            return None
+    
+    @traced
+    def create_merged_data(self):
+        """Join the synced frames into merged_df: one row per alumnus, the alumni_overview columns"""
+        merged = self.users_df[['id', 'name', 'email']]
+        for table, columns in MERGED_SOURCES.items():
+            frame = getattr(self, SYNC_TABLES[table]['attr'])
+            merged = merged.merge(
+                frame[['user_id'] + columns].rename(columns={'user_id': 'id'}), on='id', how='left'
+            )
+        # Left joins widen integer columns to float; restore the compact types
+        self.merged_df = apply_column_types(merged)
+
+class DashboardSnapshot:
+    """Immutable, versioned view of the dashboard frames.
+    
+    Snapshots are shared by every session, so readers must treat the frames as
+    read-only and derive new frames instead of modifying them in place.
+    """
+    def __init__(self, version, frames, merged_df):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'loaded_at', datetime.now())
+        object.__setattr__(self, 'merged_df', merged_df)
+        object.__setattr__(self, 'aggregates', {})
+        object.__setattr__(self, 'aggregate_lock', threading.Lock())
+        for attr, df in frames.items():
+            object.__setattr__(self, attr, df)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("DashboardSnapshot is read-only")
+    
+    def kpis(self, filtered_df, filters):
+        """Header KPIs for a filter state: summed from kpi_summary when loaded, else counted on the frames"""
+        if self.kpi_summary is not None:
+            return summary_kpis(self.kpi_summary, filters)
+        overall = self.employment_rates(filtered_df, filters).iloc[0]
+        return {
+            'total_alumni': len(self.users_df),  # Already excludes admin
+            'filtered_alumni': len(filtered_df),
+            'employed': int(overall['employed']),
+            'employment_rate': overall['employment_rate'],
+            'completed_surveys': int(self.survey_df['is_completed'].eq(1).sum()),
+        }
+    
+    def employment_rates(self, filtered_df, filters, keys=()):
+        """Return employment_rate_by for the filtered frame, computed once per filter state.
         
-        # Fix decimal years by converting to integers where appropriate
-        if 'year_graduated' in merged.columns:
-            merged['year_graduated'] = merged['year_graduated'].fillna(0).astype(int)
-            # Replace 0 with NaN to maintain data integrity
-            merged['year_graduated'] = merged['year_graduated'].replace(0, np.nan)
+        The result is shared by every caller with the same filters; treat it as read-only.
+        """
+        cache_key = (filter_state_key(filters), tuple(keys))
+        with self.aggregate_lock:
+            result = self.aggregates.get(cache_key)
+        if result is None:
+            result = employment_rate_by(filtered_df, keys)
+            with self.aggregate_lock:
+                if len(self.aggregates) >= AGGREGATE_CACHE_SIZE:
+                    self.aggregates.pop(next(iter(self.aggregates)))
+                self.aggregates[cache_key] = result
+        return result
+
+    def explorer_order(self, filtered_df, filters, sort_by):
+        """Return explorer_order for the filtered frame, sorted once per filter state and sort option"""
+        cache_key = (filter_state_key(filters), 'explorer', sort_by)
+        with self.aggregate_lock:
+            result = self.aggregates.get(cache_key)
+        if result is None:
+            result = explorer_order(filtered_df, sort_by)
+            with self.aggregate_lock:
+                if len(self.aggregates) >= AGGREGATE_CACHE_SIZE:
+                    self.aggregates.pop(next(iter(self.aggregates)))
+                self.aggregates[cache_key] = result
+        return result
+
+class AlumifyDataStore:
+    """Process-wide store that publishes dashboard snapshots to all sessions.
+    
+    One loader (a single AlumifyDashboard and its connection) syncs the data.
+    Each change publishes a new snapshot; readers pin the snapshot current at
+    the start of their run, so memory does not grow with connected sessions.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loader = AlumifyDashboard()
+        self.synced_at = time.time()
+        self.snapshot = None
+        self.publish()
+    
+    def publish(self):
+        """Publish the loader's current frames as a new snapshot version"""
+        frames = {spec['attr']: getattr(self.loader, spec['attr']) for spec in SYNC_TABLES.values()}
+        frames['kpi_summary'] = self.loader.kpi_summary
+        version = self.snapshot.version + 1 if self.snapshot else 1
+        self.snapshot = DashboardSnapshot(version, frames, self.loader.merged_df)
+    
+    def refresh(self, reconcile=False, wait=True):
+        """Sync the loader and publish a snapshot if anything changed.
         
-        self.merged_df = merged
+        Only one refresh runs at a time; with wait=False a concurrent call
+        returns immediately and the caller keeps the current snapshot.
+        """
+        if not self.lock.acquire(blocking=wait):
+            return False
+        try:
+            if self.loader.load_data(reconcile=reconcile):
+                self.publish()
+            self.synced_at = time.time()
+            return True
+        except Exception as e:
+            st.error(f"Error refreshing data: {e}")
+            return False
+        finally:
+            self.lock.release()
+    
+    def fetch_details(self, user_id):
+        """Fetch one alumnus' detail columns through the shared loader connection"""
+        with self.lock:
+            return self.loader.fetch_details(user_id)
+    
+    def count_activities(self, days=None):
+        """Count activities from the rollup through the shared loader connection"""
+        with self.lock:
+            return self.loader.count_activities(days)
+    
+    def fetch_explorer_page(self, filters, sort_by, page_size, cursor=None):
+        """Read a Data Explorer page through the shared loader connection"""
+        with self.lock:
+            return self.loader.fetch_explorer_page(filters, sort_by, page_size, cursor)
+    
+    def pin(self):
+        """Return the snapshot a reader should use for the whole run"""
+        if time.time() - self.synced_at >= SNAPSHOT_MAX_AGE:
+            self.refresh(wait=False)
+        return self.snapshot
 
+@st.cache_resource
+def get_data_store():
+    """Return the data store shared by every session in this process"""
+    return AlumifyDataStore()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_record_details(user_id, version):
+    """Lazily load the wide fields of one alumnus (cached per snapshot version)"""
+    return get_data_store().fetch_details(user_id)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_activity_count(days, version):
+    """Activities in the time period from activity_rollup (cached per snapshot version); None if unavailable"""
+    return get_data_store().count_activities(days)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_explorer_page(filters_key, sort_by, page_size, cursor, version, _filters):
+    """One keyset page of alumni_overview (cached per filter state, cursor and snapshot version); None if unavailable"""
+    return get_data_store().fetch_explorer_page(_filters, sort_by, page_size, cursor)
+
+def count_period_activities(dashboard, time_period):
+    """Activities in the selected time period: rollup rows when installed, else the loaded activity frame"""
+    days = TIME_PERIOD_DAYS.get(time_period)
+    count = load_activity_count(days, dashboard.version)
+    if count is None:
+        created = dashboard.activity_df['created_at']
+        count = len(created) if days is None else int((created >= datetime.now() - timedelta(days=days)).sum())
+    return count
+
+@traced
 def create_enhanced_filters(dashboard):
     """Create enhanced filters with clear visual hierarchy"""
     st.sidebar.markdown("### Dashboard Controls")
@@ -313,10 +838,13 @@ def create_enhanced_filters(dashboard):
     col1, col2 = st.sidebar.columns([3, 1])
     with col1:
         if st.button("Refresh Live Data", use_container_width=True):
-            if dashboard.refresh_data():
-                st.sidebar.success("Data refreshed!")
+            if get_data_store().refresh(reconcile=True):
+                st.session_state.data_refreshed = True
+                st.rerun()
             else:
                 st.sidebar.error("Refresh failed")
+    if st.session_state.pop('data_refreshed', False):
+        st.sidebar.success("Data refreshed!")
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("### Display Filters")
@@ -374,38 +902,22 @@ def create_enhanced_filters(dashboard):
         'employment_status': selected_employment
     }
 
+@traced
 def apply_enhanced_filters(dashboard, filters):
     """Apply enhanced filters with better logic"""
-    filtered_df = dashboard.merged_df.copy()
-    
-    # Apply program filter
-    if 'All Programs' not in filters['programs'] and filters['programs']:
-        filtered_df = filtered_df[filtered_df['degree'].isin(filters['programs'])]
-    
-    # Apply year range filter - FIXED: Ensure integer comparison
-    filtered_df = filtered_df[
-        (filtered_df['year_graduated'] >= filters['year_range'][0]) & 
-        (filtered_df['year_graduated'] <= filters['year_range'][1])
-    ]
-    
-    # Apply gender filter
-    if filters['gender'] != 'All':
-        filtered_df = filtered_df[filtered_df['sex'] == filters['gender']]
-    
-    # Apply employment status filter
-    if filters['employment_status'] != 'All':
-        filtered_df = filtered_df[filtered_df['is_employed'] == filters['employment_status']]
-    
-    return filtered_df
+    # Every filter returns a new frame, so the shared snapshot is never copied
+    return filter_frame(dashboard.merged_df, filters)
 
+@traced
 def generate_ai_narrative(dashboard, filtered_df, filters):
     """Generate AI-assisted narrative text based on current filters and data"""
     
     # Calculate key metrics for narrative - FIXED: Use actual total alumni count (excluding admin)
-    total_alumni = len(dashboard.users_df)  # Already excludes admin
-    filtered_alumni = len(filtered_df)
-    employed_count = len(filtered_df[filtered_df['is_employed'] == 'Yes'])
-    employment_rate = (employed_count / filtered_alumni) * 100 if filtered_alumni > 0 else 0
+    kpis = dashboard.kpis(filtered_df, filters)
+    total_alumni = kpis['total_alumni']
+    filtered_alumni = kpis['filtered_alumni']
+    employed_count = kpis['employed']
+    employment_rate = kpis['employment_rate']
     
     # Program-specific metrics
     if 'All Programs' not in filters['programs'] and filters['programs']:
@@ -435,21 +947,24 @@ def generate_ai_narrative(dashboard, filtered_df, filters):
     
     return "\n".join(narrative_parts)
 
-def create_strategic_kpi_metrics(dashboard, filtered_df):
+@traced
+def create_strategic_kpi_metrics(dashboard, filtered_df, filters):
     """Create KPI metrics following strategic design principles"""
     st.markdown('<div class="main-header">Alumify Strategic Dashboard</div>', unsafe_allow_html=True)
     
     # Calculate strategic metrics - FIXED: Use correct counts (excluding admin)
-    total_alumni = len(dashboard.users_df)  # Already excludes admin
-    filtered_alumni = len(filtered_df)
-    employed_count = len(filtered_df[filtered_df['is_employed'] == 'Yes'])
-    employment_rate = (employed_count / filtered_alumni) * 100 if filtered_alumni > 0 else 0
+    # (summed from the alumni_kpi_summary rows when available, see DashboardSnapshot.kpis)
+    kpis = dashboard.kpis(filtered_df, filters)
+    total_alumni = kpis['total_alumni']
+    filtered_alumni = kpis['filtered_alumni']
+    employed_count = kpis['employed']
+    employment_rate = kpis['employment_rate']
     
     # FIXED: Survey completion based on actual survey responses (excluding admin)
-    completed_surveys = len(dashboard.survey_df[dashboard.survey_df['is_completed'] == 1])
+    completed_surveys = kpis['completed_surveys']
     survey_completion_rate = (completed_surveys / total_alumni) * 100 if total_alumni > 0 else 0
     
-    recent_activity = len(dashboard.activity_df)
+    recent_activity = count_period_activities(dashboard, filters['time_period'])
     
     # Program diversity
     program_diversity = filtered_df['degree'].nunique()
@@ -489,10 +1004,11 @@ def create_strategic_kpi_metrics(dashboard, filtered_df):
         <div class="metric-card">
             <div class="metric-label">ACTIVITIES</div>
             <div class="metric-value">{recent_activity}</div>
-            <div class="metric-delta">Total Engagements</div>
+            <div class="metric-delta">{'Total Engagements' if filters['time_period'] == 'All Time' else filters['time_period']}</div>
         </div>
         """, unsafe_allow_html=True)
 
+@traced
 def create_plotly_enhanced_visualizations(dashboard, filtered_df, filters):
     """Create enhanced Plotly visualizations with better storytelling and strategic insights"""
     
@@ -506,6 +1022,8 @@ def create_plotly_enhanced_visualizations(dashboard, filtered_df, filters):
         st.markdown('<div class="subsection-header">Employment Distribution</div>', unsafe_allow_html=True)
         if not filtered_df.empty and 'is_employed' in filtered_df.columns:
             employment_data = filtered_df['is_employed'].value_counts()
+            # Categorical counts include ENUM values with no rows
+            employment_data = employment_data[employment_data > 0]
             
             fig = px.pie(
                 values=employment_data.values,
@@ -558,13 +1076,11 @@ def create_plotly_enhanced_visualizations(dashboard, filtered_df, filters):
     with col2:
         st.markdown('<div class="subsection-header">Program Performance</div>', unsafe_allow_html=True)
         if not filtered_df.empty and 'degree' in filtered_df.columns:
-            program_performance = filtered_df.groupby('degree').apply(
-                lambda x: (x['is_employed'] == 'Yes').sum() / len(x) * 100 if len(x) > 0 else 0
-            ).reset_index(name='employment_rate')
+            program_performance = dashboard.employment_rates(filtered_df, filters, ['degree'])
             
             if len(program_performance) > 0:
-                # Round employment rates to whole numbers
-                program_performance['employment_rate'] = program_performance['employment_rate'].round(0)
+                # Round employment rates to whole numbers (on a copy; the aggregate is shared)
+                program_performance = program_performance[['degree', 'employment_rate']].round({'employment_rate': 0})
                 
                 fig = px.bar(
                     program_performance.sort_values('employment_rate', ascending=True).tail(8),
@@ -647,7 +1163,8 @@ def create_plotly_enhanced_visualizations(dashboard, filtered_df, filters):
     with col4:
         st.markdown('<div class="subsection-header">Industry Placement</div>', unsafe_allow_html=True)
         if not filtered_df.empty and 'business_line' in filtered_df.columns:
-            industries = filtered_df['business_line'].value_counts().head(6)
+            industries = filtered_df['business_line'].value_counts()
+            industries = industries[industries > 0].head(6)
             
             if len(industries) > 0:
                 # Remove decimals from industry counts - convert to integers
@@ -689,14 +1206,14 @@ def create_plotly_enhanced_visualizations(dashboard, filtered_df, filters):
                 </div>
                 """, unsafe_allow_html=True)
 
-def create_actionable_insights(dashboard, filtered_df):
+@traced
+def create_actionable_insights(dashboard, filtered_df, filters):
     """Create actionable insights section"""
     st.markdown('<div class="section-header">Strategic Insights & Recommendations</div>', unsafe_allow_html=True)
     
     # Calculate insights
     total_alumni = len(dashboard.users_df)
-    filtered_alumni = len(filtered_df)
-    employed_rate = (len(filtered_df[filtered_df['is_employed'] == 'Yes']) / filtered_alumni) * 100 if filtered_alumni > 0 else 0
+    employed_rate = dashboard.employment_rates(filtered_df, filters).iloc[0]['employment_rate']
     
     # FIXED: Use actual survey completion data
     completed_surveys = len(dashboard.survey_df[dashboard.survey_df['is_completed'] == 1])
@@ -750,9 +1267,9 @@ def create_actionable_insights(dashboard, filtered_df):
         st.markdown('<div class="subsection-header">Program Analysis</div>', unsafe_allow_html=True)
         
         # Top programs by employment
-        program_employment = filtered_df.groupby('degree').apply(
-            lambda x: (x['is_employed'] == 'Yes').sum() / len(x) * 100 if len(x) > 0 else 0
-        ).sort_values(ascending=False)
+        program_employment = dashboard.employment_rates(filtered_df, filters, ['degree']).set_index(
+            'degree'
+        )['employment_rate'].sort_values(ascending=False)
         
         if len(program_employment) > 0:
             top_program = program_employment.index[0]
@@ -776,7 +1293,84 @@ def create_actionable_insights(dashboard, filtered_df):
                 </div>
                 """, unsafe_allow_html=True)
 
-def create_data_explorer(dashboard, filtered_df):
+def explorer_table(df):
+    """Data Explorer rows with readable column names, for display and export"""
+    display_df_clean = df.copy()
+    
+    # Remove unwanted columns
+    columns_to_remove = ['google_id', 'region_of_origin', 'province', 'location_type']
+    for col in columns_to_remove:
+        if col in display_df_clean.columns:
+            display_df_clean = display_df_clean.drop(columns=[col])
+    
+    # Rename columns for better readability
+    column_mapping = {
+        'id': 'User ID',
+        'name': 'Full Name',
+        'email': 'Email Address',
+        'role': 'User Role',
+        'privacy_accepted': 'Privacy Accepted',
+        'created_at': 'Account Created',
+        'updated_at': 'Last Updated',
+        'permanent_address': 'Permanent Address',
+        'telephone': 'Telephone',
+        'mobile_number': 'Mobile Number',
+        'civil_status': 'Civil Status',
+        'sex': 'Gender',
+        'birthday': 'Birth Date',
+        'degree': 'Degree Program',
+        'specialization': 'Specialization',
+        'college_university': 'University',
+        'year_graduated': 'Graduation Year',
+        'honors_awards': 'Honors & Awards',
+        'is_employed': 'Employment Status',
+        'employment_status': 'Employment Type',
+        'present_occupation': 'Current Occupation',
+        'business_line': 'Industry',
+        'place_of_work': 'Work Location',
+        'is_first_job': 'First Job',
+        'job_level_first': 'First Job Level',
+        'job_level_current': 'Current Job Level',
+        'initial_gross_monthly_earning': 'Initial Salary',
+        'curriculum_relevant': 'Curriculum Relevant',
+        'is_completed': 'Survey Status',
+        'completed_at': 'Survey Completed At'
+    }
+    
+    # Apply column renaming
+    display_df_clean = display_df_clean.rename(columns=column_mapping)
+    
+    # Convert survey status from 1/0 to Completed/Not Completed
+    if 'Survey Status' in display_df_clean.columns:
+        display_df_clean['Survey Status'] = np.where(
+            display_df_clean['Survey Status'].eq(1).fillna(False), 'Completed', 'Not Completed'
+        )
+    
+    # FIXED: Ensure graduation year displays as integer without decimals
+    if 'Graduation Year' in display_df_clean.columns:
+        display_df_clean['Graduation Year'] = display_df_clean['Graduation Year'].fillna(0).astype(int)
+        display_df_clean['Graduation Year'] = display_df_clean['Graduation Year'].replace(0, '')
+    
+    # Keep only the most relevant columns for display
+    key_columns = [
+        'Full Name', 'Email Address', 'Degree Program', 'Graduation Year', 
+        'Gender', 'Employment Status', 'Current Occupation', 'Industry',
+        'Work Location', 'Survey Status'
+    ]
+    
+    # Filter to only include columns that exist in the dataframe
+    available_columns = [col for col in key_columns if col in display_df_clean.columns]
+    display_df_clean = display_df_clean[available_columns]
+    return display_df_clean
+
+def advance_explorer_page(state, step, cursor=None):
+    """Button callback: move the Data Explorer page, remembering the keyset cursor of the next one"""
+    if step > 0 and cursor is not None and len(state['cursors']) == state['page'] + 1:
+        state['cursors'].append(cursor)
+    state['page'] = max(state['page'] + step, 0)
+
+@traced
+def create_data_explorer(dashboard, filtered_df, filters):
     """Create enhanced Data Explorer with better field names and organization"""
     st.markdown('<div class="section-header">Data Explorer</div>', unsafe_allow_html=True)
     
@@ -786,38 +1380,49 @@ def create_data_explorer(dashboard, filtered_df):
         col1, col2 = st.columns(2)
         
         with col1:
-            # Record limit selector
-            record_limit = st.selectbox(
-                "Show Records:",
-                [10, 25, 50, 100, "All"],
+            # Page size selector; the browser only ever receives one page
+            page_size = st.selectbox(
+                "Records per Page:",
+                EXPLORER_PAGE_SIZES,
                 index=1,
-                help="Limit the number of records displayed"
+                help="Number of records displayed per page"
             )
         
         with col2:
             # Sort options
             sort_by = st.selectbox(
                 "Sort By:",
-                ["Name", "Graduation Year", "Employment Status"],
+                list(EXPLORER_SORTS),
                 help="Sort the data table"
             )
         
-        # Apply record limit
-        if record_limit != "All":
-            display_df = filtered_df.head(record_limit)
-        else:
-            display_df = filtered_df.copy()
+        # Paging restarts whenever the filters, sort or page size change
+        filters_key = filter_state_key(filters)
+        state_key = (filters_key, sort_by, page_size)
+        state = st.session_state.get('explorer_paging')
+        if state is None or state['key'] != state_key:
+            state = st.session_state.explorer_paging = {'key': state_key, 'page': 0, 'cursors': [None]}
+        page = state['page']
         
-        # Apply sorting
-        sort_mapping = {
-            "Name": "name",
-            "Graduation Year": "year_graduated",
-            "Employment Status": "is_employed"
-        }
-        if sort_by in sort_mapping:
-            sort_column = sort_mapping[sort_by]
-            if sort_column in display_df.columns:
-                display_df = display_df.sort_values(sort_column, ascending=(sort_by != "Graduation Year"))
+        # Sorted against the whole filtered set, then limited to the page: read from
+        # alumni_overview with keyset pagination, or sliced from the snapshot without the view
+        page_df = None
+        if EXPLORER_FROM_VIEW and page < len(state['cursors']):
+            page_df = load_explorer_page(
+                filters_key, sort_by, page_size, state['cursors'][page], dashboard.version, filters
+            )
+        if page_df is not None:
+            has_more = len(page_df) > page_size
+            display_df = page_df.iloc[:page_size]
+        else:
+            order = dashboard.explorer_order(filtered_df, filters, sort_by)
+            display_df = filtered_df.iloc[order[page * page_size:(page + 1) * page_size]]
+            has_more = (page + 1) * page_size < len(order)
+        next_cursor = None
+        if has_more and not display_df.empty:
+            sort_column = EXPLORER_SORTS[sort_by][0]
+            last = display_df.iloc[-1]
+            next_cursor = (sort_value(sort_column, last[sort_column]), int(last['id']))
         
         # Show key metrics first - FIXED: Exclude admin from all counts
         total_alumni_no_admin = len(dashboard.users_df)  # Already excludes admin
@@ -832,98 +1437,64 @@ def create_data_explorer(dashboard, filtered_df):
             completed_count = len(dashboard.survey_df[dashboard.survey_df['is_completed'] == 1])
             st.metric("Completed Surveys", completed_count)
         
-        # Create a cleaned dataframe with better field names
-        display_df_clean = display_df.copy()
-        
-        # Remove unwanted columns
-        columns_to_remove = ['google_id', 'region_of_origin', 'province', 'location_type']
-        for col in columns_to_remove:
-            if col in display_df_clean.columns:
-                display_df_clean = display_df_clean.drop(columns=[col])
-        
-        # Rename columns for better readability
-        column_mapping = {
-            'id': 'User ID',
-            'name': 'Full Name',
-            'email': 'Email Address',
-            'role': 'User Role',
-            'privacy_accepted': 'Privacy Accepted',
-            'created_at': 'Account Created',
-            'updated_at': 'Last Updated',
-            'permanent_address': 'Permanent Address',
-            'telephone': 'Telephone',
-            'mobile_number': 'Mobile Number',
-            'civil_status': 'Civil Status',
-            'sex': 'Gender',
-            'birthday': 'Birth Date',
-            'degree': 'Degree Program',
-            'specialization': 'Specialization',
-            'college_university': 'University',
-            'year_graduated': 'Graduation Year',
-            'honors_awards': 'Honors & Awards',
-            'is_employed': 'Employment Status',
-            'employment_status': 'Employment Type',
-            'present_occupation': 'Current Occupation',
-            'business_line': 'Industry',
-            'place_of_work': 'Work Location',
-            'is_first_job': 'First Job',
-            'job_level_first': 'First Job Level',
-            'job_level_current': 'Current Job Level',
-            'initial_gross_monthly_earning': 'Initial Salary',
-            'curriculum_relevant': 'Curriculum Relevant',
-            'is_completed': 'Survey Status',
-            'completed_at': 'Survey Completed At'
-        }
-        
-        # Apply column renaming
-        display_df_clean = display_df_clean.rename(columns=column_mapping)
-        
-        # Convert survey status from 1/0 to Completed/Not Completed
-        if 'Survey Status' in display_df_clean.columns:
-            display_df_clean['Survey Status'] = display_df_clean['Survey Status'].apply(
-                lambda x: 'Completed' if x == 1 else 'Not Completed'
-            )
-        
-        # FIXED: Ensure graduation year displays as integer without decimals
-        if 'Graduation Year' in display_df_clean.columns:
-            display_df_clean['Graduation Year'] = display_df_clean['Graduation Year'].fillna(0).astype(int)
-            display_df_clean['Graduation Year'] = display_df_clean['Graduation Year'].replace(0, '')
-        
-        # Keep only the most relevant columns for display
-        key_columns = [
-            'Full Name', 'Email Address', 'Degree Program', 'Graduation Year', 
-            'Gender', 'Employment Status', 'Current Occupation', 'Industry',
-            'Work Location', 'Survey Status'
-        ]
-        
-        # Filter to only include columns that exist in the dataframe
-        available_columns = [col for col in key_columns if col in display_df_clean.columns]
-        display_df_clean = display_df_clean[available_columns]
-        
         # Data preview with better organization
         st.markdown("### Alumni Records")
-        st.dataframe(display_df_clean, use_container_width=True)
+        st.dataframe(explorer_table(display_df), use_container_width=True)
         
+        # The snapshot's filtered count estimates the pages; the live view may have moved since
+        page_count = max(-(-len(filtered_df) // page_size), page + 1 + has_more)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("Previous", key="explorer_previous", disabled=page == 0, use_container_width=True,
+                      on_click=advance_explorer_page, args=(state, -1))
+        with col2:
+            st.caption(f"Page {page + 1} of ~{page_count}")
+        with col3:
+            st.button("Next", key="explorer_next", disabled=not has_more, use_container_width=True,
+                      on_click=advance_explorer_page, args=(state, 1, next_cursor))
+
+        # Wide fields (addresses, honors, activity descriptions) are only fetched when a record is opened
+        if not display_df.empty and {'id', 'name'}.issubset(display_df.columns):
+            with st.expander("Record Details"):
+                record_options = dict(zip(
+                    display_df['name'].astype(str) + " (#" + display_df['id'].astype(str) + ")",
+                    display_df['id']
+                ))
+                selected_record = st.selectbox("Open Record:", ["None"] + list(record_options))
+                if selected_record != "None":
+                    details = load_record_details(int(record_options[selected_record]), dashboard.version)
+                    for table, detail_df in details.items():
+                        st.markdown(f"**{table.replace('_', ' ').title()}**")
+                        if detail_df.empty:
+                            st.caption("No data recorded.")
+                        else:
+                            st.dataframe(detail_df, use_container_width=True)
+
         # Export options
         st.markdown("### Export Data")
         col1, col2 = st.columns(2)
+        # Every filtered record in the selected order, written to disk only when requested,
+        # then shared by every session viewing the same snapshot version, filters and sort
+        export_key = ("alumni_data", dashboard.version, filters_key, sort_by)
+        build_export = lambda: explorer_table(
+            filtered_df.iloc[dashboard.explorer_order(filtered_df, filters, sort_by)]
+        )
         with col1:
-            csv = display_df_clean.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name=f"alumni_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
+            lazy_download_button(
+                "Download CSV",
+                export_key,
+                build_export,
+                "csv",
+                f"alumni_data_{datetime.now().strftime('%Y%m%d')}.csv",
                 use_container_width=True
             )
         with col2:
-            excel_buffer = io.BytesIO()
-            display_df_clean.to_excel(excel_buffer, index=False, engine='openpyxl')
-            st.download_button(
-                label="Download Excel",
-                data=excel_buffer.getvalue(),
-                file_name=f"alumni_data_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            lazy_download_button(
+                "Download Excel",
+                export_key,
+                build_export,
+                "xlsx",
+                f"alumni_data_{datetime.now().strftime('%Y%m%d')}.xlsx",
                 use_container_width=True
             )
     else:
@@ -951,8 +1522,9 @@ def create_spa_navigation():
     return st.session_state.nav_section
 
 def main():
-    # Initialize dashboard
-    dashboard = AlumifyDashboard()
+    # Pin the shared snapshot for this run; all sessions read the same frames
+    with span("pin snapshot"):
+        dashboard = get_data_store().pin()
     
     # Sidebar with enhanced navigation
     st.sidebar.markdown("""
@@ -981,12 +1553,12 @@ def main():
     
     # Display selected section
     if selected_nav == "Executive Overview":
-        create_strategic_kpi_metrics(dashboard, filtered_df)
+        create_strategic_kpi_metrics(dashboard, filtered_df, filters)
         create_plotly_enhanced_visualizations(dashboard, filtered_df, filters)
-        create_actionable_insights(dashboard, filtered_df)
+        create_actionable_insights(dashboard, filtered_df, filters)
         
     elif selected_nav == "Data Explorer":
-        create_data_explorer(dashboard, filtered_df)
+        create_data_explorer(dashboard, filtered_df, filters)
     
     # Footer with data quality info - FIXED: Use correct counts (excluding admin)
     st.sidebar.markdown("---")
@@ -1004,4 +1576,7 @@ def main():
     ))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Stage timings per run; the panel is only shown with ?trace=<ALUMIFY_TRACE_KEY>
+    with traced_run("dashboard"):
+        main()
+        render_trace_panel()
\ No newline at end of file
@@ -13,11 +13,21 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
 from datetime import datetime, timedelta
-import re
+import os
+import time
+import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, Tuple
-import io
+from filter_index import UserIdIndex
+from streaming_export import lazy_download_button
+from snapshot_cache import SnapshotStore, watermark_token
+from salary_bands import salary_band, salary_band_column
+from token_index import TokenIndex
+from figure_cache import FigureCache
+from tracing import count_rows, render_trace_panel, span, traced, traced_run
 
 # ---------------------------
 # Config & Styling
@@ -27,6 +37,40 @@ COLOR_PALETTE = [
     '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
     '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
 ]
+# Tables fetched concurrently on a cache miss (keep <= the engine pool size)
+LOAD_CONCURRENCY = 5
+# Seconds to wait for the watermark query before serving the on-disk snapshots as they are
+WATERMARK_TIMEOUT = 0.5
+
+# ENUM columns from database/alumify_schema.sql, loaded as categoricals in declaration order
+YES_NO = ["Yes", "No"]
+JOB_LEVELS = ["Rank or Clerical", "Professional, Technical or Supervisory", "Managerial or Executive", "Self-employed"]
+ENUM_CATEGORIES: Dict[str, list] = {
+    "role": ["user", "admin"],
+    "civil_status": ["Single", "Married", "Separated", "Widow or Widower", "Single Parent"],
+    "sex": ["Male", "Female"],
+    "location_type": ["City", "Municipality"],
+    "is_employed": ["Yes", "No", "Never Employed"],
+    "employment_status": ["Regular or Permanent", "Contractual", "Temporary", "Self-employed", "Casual"],
+    "place_of_work": ["Local", "Abroad"],
+    "is_first_job": YES_NO,
+    "job_level_first": JOB_LEVELS,
+    "job_level_current": JOB_LEVELS,
+    "curriculum_relevant": YES_NO,
+    "level": ["Undergraduate", "Graduate"],
+    "activity_type": ["registration", "login", "survey_completed", "profile_updated",
+                      "survey_started", "survey_updated", "password_changed"],
+}
+# Low-cardinality free-text columns, categorised by their observed values
+CATEGORY_COLUMNS = ["degree", "business_line"]
+# Compact nullable integer types for keys, years and BOOLEAN flags
+NUMERIC_DTYPES: Dict[str, str] = {
+    "id": "Int32",
+    "user_id": "Int32",
+    "year_graduated": "Int16",
+    "is_completed": "Int8",
+    "privacy_accepted": "Int8",
+}
 
 st.markdown(
     """
@@ -64,40 +108,162 @@ st.markdown(
 @st.cache_resource
 def get_engine():
     # modify the connection string / credentials if needed
-    return create_engine("mysql+pymysql://root:@127.0.0.1:3306/alumify")
+    return create_engine("mysql+pymysql://root:@127.0.0.1:3306/alumify", pool_size=LOAD_CONCURRENCY)
 
 # ---------------------------
 # Load data (cached)
 # ---------------------------
+TABLES = [
+    "users",
+    "graduate_profiles",
+    "educational_background",
+    "employment_data",
+    "survey_responses",
+    "activity_logs",
+    "useful_competencies",
+    "course_reasons",
+    "unemployment_reasons",
+    "curriculum_suggestions"
+]
+
+# Filters resolved through the user-id index: filter key -> (table, column)
+FILTER_FIELDS: Dict[str, Tuple[str, str]] = {
+    "program": ("educational_background", "degree"),
+    "year": ("educational_background", "year_graduated"),
+    "gender": ("graduate_profiles", "sex"),
+    "employment": ("employment_data", "is_employed"),
+}
+
+def load_table(engine, table: str) -> Tuple[pd.DataFrame, float]:
+    """Read one table, returning the frame and the seconds it took."""
+    started = time.perf_counter()
+    try:
+        df = pd.read_sql(f"SELECT * FROM {table}", con=engine)
+    except Exception:
+        df = pd.DataFrame()
+    return apply_column_types(df), time.perf_counter() - started
+
+def apply_column_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the known columns of a loaded frame to compact dtypes in place."""
+    for col, categories in ENUM_CATEGORIES.items():
+        if col in df.columns:
+            # keep values outside the declared ENUM instead of turning them into NaN
+            extra = sorted(set(df[col].dropna()) - set(categories))
+            df[col] = pd.Categorical(df[col], categories=categories + extra)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+# ---------------------------
+# Table snapshots (see snapshot_cache.py)
+# ---------------------------
+SNAPSHOTS = SnapshotStore("analytics_pro")
+# Timestamp column per table, for the watermark fallback when table_versions is not installed
+VERSION_COLUMNS: Dict[str, str] = {
+    "users": "updated_at",
+    "graduate_profiles": "updated_at",
+    "educational_background": "updated_at",
+    "employment_data": "updated_at",
+    "survey_responses": "updated_at",
+    "activity_logs": "created_at",
+    "useful_competencies": "created_at",
+    "course_reasons": "created_at",
+    "unemployment_reasons": "created_at",
+    "curriculum_suggestions": "created_at",
+}
+# COUNT(*) catches deletes, which MAX() alone misses
+FALLBACK_WATERMARK_QUERY = " UNION ALL ".join(
+    f"SELECT '{table}', MAX({column}), COUNT(*) FROM {table}" for table, column in VERSION_COLUMNS.items()
+)
+
+def query_watermarks(engine) -> Dict[str, Any]:
+    """Watermark of every table in one query: its table_versions row plus the users one.
+
+    Deleting a user cascades to the child tables without firing their triggers,
+    so the users version is part of every table's watermark.
+    """
+    with engine.connect() as conn:
+        try:
+            rows = conn.execute(text("SELECT table_name, version FROM table_versions")).fetchall()
+            versions = {name: version for name, version in rows}
+        except ProgrammingError:
+            conn.rollback()
+            rows = conn.execute(text(FALLBACK_WATERMARK_QUERY)).fetchall()
+            versions = {name: (last, count) for name, last, count in rows}
+    return {t: [versions.get(t), versions.get("users")] for t in TABLES}
+
+def read_watermarks(engine, timeout: Optional[float] = WATERMARK_TIMEOUT) -> Optional[Dict[str, Any]]:
+    """query_watermarks() bounded by timeout seconds; None when the database is slow or unreachable."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(query_watermarks, engine)
+    executor.shutdown(wait=False)
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        return None
+
 @st.cache_data(ttl=60)
-def load_all() -> Dict[str, pd.DataFrame]:
+def load_all_timed(concurrency: int = LOAD_CONCURRENCY) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    """
+    Load every table; returns (tables, load metadata with per-table timings and sources).
+    Tables whose snapshot matches the database watermark are memory-mapped from disk,
+    the others are read over a thread pool and snapshotted. When the watermarks cannot
+    be read in time, complete snapshots are served as they are (marked stale).
+    """
     engine = get_engine()
-    tables = [
-        "users",
-        "graduate_profiles",
-        "educational_background",
-        "employment_data",
-        "survey_responses",
-        "activity_logs",
-        "useful_competencies",
-        "course_reasons",
-        "unemployment_reasons",
-        "curriculum_suggestions"
-    ]
-    dfs: Dict[str, pd.DataFrame] = {}
-    for t in tables:
-        try:
-            dfs[t] = pd.read_sql(f"SELECT * FROM {t}", con=engine)
-        except Exception:
-            dfs[t] = pd.DataFrame()
+    started = time.perf_counter()
+    snapshots, snapshot_times = {}, {}
+    for t in TABLES:
+        snapshot_started = time.perf_counter()
+        snapshots[t] = SNAPSHOTS.load(t)
+        snapshot_times[t] = time.perf_counter() - snapshot_started
+    complete = all(df is not None for df, _ in snapshots.values())
+    watermarks = read_watermarks(engine, WATERMARK_TIMEOUT if complete else None)
+
+    def current(t: str) -> bool:
+        df, token = snapshots[t]
+        return df is not None and (watermarks is None or token == watermark_token(watermarks[t]))
+
+    def load_fresh(t: str) -> Tuple[pd.DataFrame, float]:
+        df, seconds = load_table(engine, t)
+        if watermarks is not None and not df.empty:
+            SNAPSHOTS.save(t, df, watermarks[t])
+        return df, seconds
+
+    stale_tables = [t for t in TABLES if not current(t)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {t: executor.submit(load_fresh, t) for t in stale_tables}
+        results = {t: f.result() for t, f in futures.items()}
+    results.update({t: (snapshots[t][0], snapshot_times[t]) for t in TABLES if t not in results})
+    dfs: Dict[str, pd.DataFrame] = {t: results[t][0] for t in TABLES}
+    meta: Dict[str, Any] = {
+        "timings": {t: results[t][1] for t in TABLES},
+        "sources": {t: "database" if t in stale_tables else "snapshot" for t in TABLES},
+        "stale": watermarks is None and len(stale_tables) < len(TABLES),
+        "wall_time": time.perf_counter() - started,
+        "loaded_at": datetime.now(),
+    }
     # Minor normalization and derived fields
     if not dfs["graduate_profiles"].empty and "birthday" in dfs["graduate_profiles"].columns:
         dfs["graduate_profiles"]["birthday"] = pd.to_datetime(dfs["graduate_profiles"]["birthday"], errors="coerce")
         dfs["graduate_profiles"]["age"] = (pd.to_datetime("today") - dfs["graduate_profiles"]["birthday"]).dt.days // 365
-    # Normalize year_graduated to string for filters
-    if not dfs["educational_background"].empty and "year_graduated" in dfs["educational_background"].columns:
-        dfs["educational_background"]["year_graduated"] = dfs["educational_background"]["year_graduated"].astype(str).replace("nan", "")
-    return dfs
+    return dfs, meta
+
+def load_all() -> Dict[str, pd.DataFrame]:
+    return load_all_timed()[0]
+
+def build_user_index(dfs: Dict[str, pd.DataFrame]) -> UserIdIndex:
+    """Index the filter fields of the loaded tables as masks over user ids."""
+    return UserIdIndex(dfs, FILTER_FIELDS, id_columns={"users": "id"})
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_user_index(loaded_at: datetime, _dfs: Dict[str, pd.DataFrame]) -> UserIdIndex:
+    """One shared UserIdIndex per load_all_timed() result (keyed by its loaded_at)."""
+    return build_user_index(_dfs)
 
 # ---------------------------
 # Utility helpers
@@ -108,7 +274,10 @@ def safe_count_series(series: pd.Series) -> pd.Series:
     return series.dropna().astype(str).value_counts()
 
 def counts_and_percents(series: pd.Series) -> pd.DataFrame:
-    counts = safe_count_series(series)
+    return percent_table(safe_count_series(series))
+
+def percent_table(counts: pd.Series) -> pd.DataFrame:
+    """Count / Percent table of already counted values."""
     if counts.empty:
         return pd.DataFrame(columns=["Count", "Percent"])
     perc = (counts / counts.sum() * 100).round(1)
@@ -116,30 +285,16 @@ def counts_and_percents(series: pd.Series) -> pd.DataFrame:
     return df
 
 def parse_salary_lower_bound(s: str) -> Optional[float]:
-    # try to extract numerical lower bound from strings like "P5,000.00 to less than P10,000.00"
+    """Lower bound of a label like "P5,000.00 to less than P10,000.00" (parsed once per label, see salary_bands.py)."""
     if not isinstance(s, str):
         return None
-    # find first number (allow commas/decimals)
-    nums = re.findall(r'[\d,]+(?:\.d+)?', s.replace('P', '').strip())
-    if not nums:
-        return None
-    try:
-        return float(nums[0].replace(",", ""))
-    except Exception:
-        return None
+    lower = salary_band(s).lower
+    return None if np.isnan(lower) else lower
 
-def top_n_words(texts: pd.Series, n: int = 10) -> pd.Series:
-    if texts is None or texts.empty:
-        return pd.Series(dtype=int)
-    words = {}
-    for t in texts.dropna().astype(str):
-        tokens = re.findall(r'\b[a-zA-Z]{2,}\b', t.lower())
-        for tk in tokens:
-            words[tk] = words.get(tk, 0) + 1
-    if not words:
-        return pd.Series(dtype=int)
-    s = pd.Series(words).sort_values(ascending=False)
-    return s.head(n)
+@st.cache_resource
+def get_suggestion_index() -> TokenIndex:
+    """Word / phrase counts of curriculum suggestions shared by every session (see token_index.py)."""
+    return TokenIndex("suggestion")
 
 def fmt_count_percent(count: int, total: int) -> str:
     pct = (count / total * 100) if total > 0 else 0
@@ -165,9 +320,38 @@ def enforce_int_ticks(fig: go.Figure):
                 pass
     return fig
 
+def top_counts_bar(counts: pd.Series) -> Optional[go.Figure]:
+    """Horizontal bar of value counts labelled "value — count", or None when there are none"""
+    if counts.empty:
+        return None
+    labels = [f"{idx} — {counts[idx]:,}" for idx in counts.index]
+    return px.bar(x=counts.values, y=labels, orientation='h')
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    """Finished figures shared by every session (see figure_cache.py)."""
+    return FigureCache()
+
+def show_figure(chart_id: str, figure_key: Optional[Tuple], build) -> None:
+    """
+    Plot build() styled with enforce_int_ticks; build returns None when there is nothing to plot.
+    With a figure_key (data version and filter state) the finished go.Figure is cached until the
+    key changes, so a rerun with the same key skips whatever build does: aggregation done inside
+    it, plotly express and validation. Counts computed outside build (e.g. for insight text) are
+    still computed on every rerun, and plotly_chart serializes the cached figure every time.
+    """
+    def styled():
+        fig = build()
+        return None if fig is None else enforce_int_ticks(fig)
+
+    fig = styled() if figure_key is None else get_figure_cache().get_or_build((chart_id,) + tuple(figure_key), styled)
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+
 # ---------------------------
 # Top filter bar (horizontal)
 # ---------------------------
+@traced
 def top_filter_bar(dfs: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
     # Extract options from data
     edu = dfs.get("educational_background", pd.DataFrame())
@@ -212,127 +396,208 @@ def top_filter_bar(dfs: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
 # ---------------------------
 # Filter application
 # ---------------------------
-def apply_filters(dfs: Dict[str, pd.DataFrame], filters: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+@traced
+def apply_filters(dfs: Dict[str, pd.DataFrame], filters: Dict[str, Any], index: Optional[UserIdIndex] = None) -> Dict[str, pd.DataFrame]:
     """Filter each relevant table by selected filters (year, program, gender). Returns filtered tables dict."""
-    edu = dfs.get("educational_background", pd.DataFrame()).copy()
-    gp = dfs.get("graduate_profiles", pd.DataFrame()).copy()
-    emp = dfs.get("employment_data", pd.DataFrame()).copy()
-    users = dfs.get("users", pd.DataFrame()).copy()
-    activity = dfs.get("activity_logs", pd.DataFrame()).copy()
-    others = {k: v.copy() for k, v in dfs.items() if k not in ("educational_background", "graduate_profiles", "employment_data", "users", "activity_logs")}
-
-    # We'll derive user_ids that match selected program / year / gender
-    user_sets = []
-
-    # Program filter
-    if filters.get("program") and filters["program"] != "All" and not edu.empty:
-        deg_col = [c for c in edu.columns if "degree" in c.lower()][0]
-        matched = edu[edu[deg_col].astype(str) == filters["program"]]
-        if "user_id" in matched.columns:
-            user_sets.append(set(matched["user_id"].astype(int).unique()))
-
-    # Year filter
-    if filters.get("year") and filters["year"] != "All" and not edu.empty:
-        yr_col = [c for c in edu.columns if "year_graduated" in c.lower()][0]
-        matched = edu[edu[yr_col].astype(str) == filters["year"]]
-        if "user_id" in matched.columns:
-            user_sets.append(set(matched["user_id"].astype(int).unique()))
-
-    # Gender filter
-    if filters.get("gender") and filters["gender"] != "All" and not gp.empty:
-        sex_col = [c for c in gp.columns if c.lower().startswith("sex") or "gender" in c.lower()][0]
-        matched = gp[gp[sex_col].astype(str) == filters["gender"]]
-        if "user_id" in matched.columns:
-            user_sets.append(set(matched["user_id"].astype(int).unique()))
-
-    # Combine user id sets - intersection if multiple filters, else union or all
-    if user_sets:
-        user_ids = set.intersection(*user_sets) if len(user_sets) > 1 else user_sets[0]
-    else:
+    if index is None:
+        index = build_user_index(dfs)
+
+    # Mask of user ids matching the selected program / year / gender (AND across filters);
+    # a filter is skipped when its source table was not loaded
+    selections = {}
+    for key, (table, _) in FILTER_FIELDS.items():
+        value = filters.get(key)
+        if value and value != "All" and not dfs.get(table, pd.DataFrame()).empty:
+            selections[key] = [value]
+    mask = index.mask(selections)
+    if mask is None:
         # all users if users table present
-        user_ids = set(users["id"].astype(int).unique()) if not users.empty and "id" in users.columns else set()
-
-    def filter_by_userid(df):
-        if df.empty:
-            return df
-        if "user_id" in df.columns:
-            if user_ids:
-                return df[df["user_id"].astype(int).isin(user_ids)].copy()
-            else:
-                # if filters were active but no matched users -> return empty
-                any_filter_active = any([filters.get("program") != "All", filters.get("year") != "All", filters.get("gender") != "All"])
-                return df[df["user_id"].astype(int).isin([])].copy() if any_filter_active else df.copy()
-        return df.copy()
+        users = dfs.get("users", pd.DataFrame())
+        if not users.empty and "id" in users.columns:
+            mask = index.id_mask("users")
 
     filtered: Dict[str, pd.DataFrame] = {}
     for k, df in dfs.items():
-        if df.empty:
+        if df.empty or "user_id" not in df.columns or mask is None:
             filtered[k] = df.copy()
-            continue
-        filtered[k] = filter_by_userid(df)
+        else:
+            filtered[k] = index.take(k, df, mask)
 
     # activity_logs date filter/support isn't included in top-bar (kept as-is)
     return filtered
 
-def create_comparison_datasets(dfs: Dict[str, pd.DataFrame], compare_by: str) -> Dict[str, Dict[str, pd.DataFrame]]:
-    """Create separate filtered datasets for comparison based on the compare_by parameter."""
-    if compare_by == "None":
-        return {}
-    
-    comparison_datasets = {}
+# ---------------------------
+# Comparison cube
+# ---------------------------
+# compare_by option -> (table, column) assigning each alumnus to a group, and the group label prefix
+COMPARE_FIELDS: Dict[str, Tuple[str, str, str]] = {
+    "Program": ("educational_background", "degree", "Program"),
+    "Gender": ("graduate_profiles", "sex", "Gender"),
+    "Graduation Year": ("educational_background", "year_graduated", "Year"),
+    "Employment Status": ("employment_data", "is_employed", "Employment"),
+}
+CUBE_COLUMNS = ["group", "metric", "category", "value"]
+
+def employed_flags(series: pd.Series) -> pd.Series:
+    """1 where the value reads as employed ("yes"/"employed"), else 0; evaluated once per distinct value."""
+    text = series.astype(str).fillna("")
+    flags = {v: int("yes" in v.strip().lower() or "employed" in v.strip().lower()) for v in text.unique()}
+    return text.map(flags)
+
+# ---------------------------
+# KPI summary (alumni_kpi_summary in database/alumify_schema.sql)
+# ---------------------------
+# Top filter -> summary group column it matches
+KPI_SUMMARY_FILTERS: Dict[str, str] = {"year": "year_graduated", "program": "degree", "gender": "sex"}
+
+@st.cache_data(ttl=60)
+def load_kpi_summary() -> Optional[pd.DataFrame]:
+    """Per-group KPI counts maintained by the database, or None when the table is missing."""
+    try:
+        return apply_column_types(pd.read_sql("SELECT * FROM alumni_kpi_summary", con=get_engine()))
+    except Exception:
+        return None
+
+def summary_kpis(summary: pd.DataFrame, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Graduates, registered alumni and employment rate summed from the KPI summary rows."""
+    rows = summary
+    for key, col in KPI_SUMMARY_FILTERS.items():
+        value = filters.get(key)
+        if value and value != "All":
+            rows = rows[rows[col].astype(str) == str(value)]
+    answered = rows["is_employed"].notna()
+    employed = employed_flags(rows["is_employed"]).astype(bool) & answered
+    answered_alumni = rows.loc[answered, "alumni"].sum()
+    return {
+        "graduates": int(rows["graduates"].sum()),
+        "alumni": int(summary["alumni"].sum()),
+        "employment_rate": rows.loc[employed, "alumni"].sum() / answered_alumni * 100 if answered_alumni else None,
+    }
+
+# ---------------------------
+# Activity rollups (activity_rollup in database/alumify_schema.sql)
+# ---------------------------
+# Engagement period -> days back from now (None = all time)
+ENGAGEMENT_PERIODS: Dict[str, Optional[int]] = {"All Time": None, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365}
+# Top filter -> rollup column it is pushed down to
+ROLLUP_FILTERS: Dict[str, str] = {"program": "degree", "year": "year_graduated", "gender": "sex"}
+
+def rollup_filters_key(filters: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """The active top filters as a hashable key for load_daily_activity."""
+    return tuple((key, str(filters[key])) for key in ROLLUP_FILTERS if filters.get(key) and filters[key] != "All")
+
+@st.cache_data(ttl=60)
+def load_daily_activity(filters_key: Tuple[Tuple[str, str], ...], days: Optional[int]) -> Optional[pd.DataFrame]:
+    """
+    Activities per day and activity type, summed from the hourly rollup with the filters
+    and the period pushed into the WHERE clause. None when activity_rollup is missing.
+    """
+    clauses, params = [], {}
+    for key, value in filters_key:
+        clauses.append(f"{ROLLUP_FILTERS[key]} = :{key}")
+        params[key] = value
+    if days:
+        clauses.append("activity_hour >= :since")
+        params["since"] = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=days)
+    query = "SELECT DATE(activity_hour) AS day, activity_type, SUM(activities) AS activities FROM activity_rollup"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " GROUP BY day, activity_type ORDER BY day"
+    try:
+        return pd.read_sql(text(query), con=get_engine(), params=params)
+    except Exception:
+        return None
+
+def cube_rows(values: pd.Series, metric: str) -> pd.DataFrame:
+    """Flatten a grouped result indexed by group (or group, category) into cube rows."""
+    frame = values.rename("value").reset_index()
+    frame.columns = ["group", "category", "value"] if frame.shape[1] == 3 else ["group", "value"]
+    frame["metric"] = metric
+    return frame
+
+@traced
+def build_comparison_cube(dfs: Dict[str, pd.DataFrame], compare_by: str) -> pd.DataFrame:
+    """Compute every comparison group's metrics in one grouped pass per table.
+
+    Returns a tidy frame (group, metric, category, value) with group as a categorical
+    in display order. Metrics: graduates, employment_records, employment_rate,
+    gender (category = sex) and program (category = degree, top 5 per group).
+    """
+    empty = pd.DataFrame(columns=CUBE_COLUMNS)
+    if compare_by not in COMPARE_FIELDS:
+        return empty
+    table, column, label = COMPARE_FIELDS[compare_by]
+    source = dfs.get(table, pd.DataFrame())
+    if source.empty or column not in source.columns or "user_id" not in source.columns:
+        return empty
+
+    # Group of each alumnus (1:1 tables, so one group per user)
+    keys = source[["user_id", column]].dropna().drop_duplicates("user_id")
+    keys[column] = keys[column].astype(str)
+    values = list(keys[column].unique())
+    if compare_by == "Graduation Year":
+        values = sorted(values)[-5:]  # Last 5 years for comparison
+        keys = keys[keys[column].isin(values)]
+    groups = [f"{label}: {v}" for v in values]
+    group_of = pd.Series(
+        pd.Categorical(label + ": " + keys[column], categories=groups), index=keys["user_id"].to_numpy()
+    )
+
+    parts = []
     edu = dfs.get("educational_background", pd.DataFrame())
-    gp = dfs.get("graduate_profiles", pd.DataFrame())
+    if not edu.empty and "user_id" in edu.columns:
+        g = edu["user_id"].map(group_of)
+        parts.append(cube_rows(edu.groupby(g, observed=True).size(), "graduates"))
+        if "degree" in edu.columns:
+            programs = edu.groupby([g, edu["degree"].astype(str)], observed=True).size()
+            programs = programs[programs > 0].sort_values(ascending=False, kind="stable")
+            parts.append(cube_rows(programs.groupby(level=0, observed=True).head(5), "program"))
     emp = dfs.get("employment_data", pd.DataFrame())
-    
-    if compare_by == "Program" and not edu.empty:
-        deg_col = [c for c in edu.columns if "degree" in c.lower()][0]
-        programs = edu[deg_col].dropna().unique()
-        for program in programs:
-            filters = {"program": program, "year": "All", "gender": "All"}
-            comparison_datasets[f"Program: {program}"] = apply_filters(dfs, filters)
-    
-    elif compare_by == "Gender" and not gp.empty:
-        sex_col = [c for c in gp.columns if c.lower().startswith("sex") or "gender" in c.lower()][0]
-        genders = gp[sex_col].dropna().unique()
-        for gender in genders:
-            filters = {"program": "All", "year": "All", "gender": gender}
-            comparison_datasets[f"Gender: {gender}"] = apply_filters(dfs, filters)
-    
-    elif compare_by == "Graduation Year" and not edu.empty:
-        yr_col = [c for c in edu.columns if "year_graduated" in c.lower()][0]
-        years = edu[yr_col].dropna().astype(str).unique()
-        for year in sorted(years)[-5:]:  # Last 5 years for comparison
-            filters = {"program": "All", "year": year, "gender": "All"}
-            comparison_datasets[f"Year: {year}"] = apply_filters(dfs, filters)
-    
-    elif compare_by == "Employment Status" and not emp.empty:
-        emp_col = next((c for c in emp.columns if "is_employed" in c.lower() or "employment_status" in c.lower()), None)
-        if emp_col:
-            statuses = emp[emp_col].dropna().unique()
-            for status in statuses:
-                # Filter by employment status
-                emp_filtered = emp[emp[emp_col] == status]
-                user_ids = set(emp_filtered["user_id"].astype(int).unique()) if "user_id" in emp_filtered.columns else set()
-                
-                # Create filtered dataset for this employment status
-                filtered_dfs = {}
-                for k, df in dfs.items():
-                    if df.empty:
-                        filtered_dfs[k] = df.copy()
-                        continue
-                    if "user_id" in df.columns and user_ids:
-                        filtered_dfs[k] = df[df["user_id"].astype(int).isin(user_ids)].copy()
-                    else:
-                        filtered_dfs[k] = df.copy()
-                
-                comparison_datasets[f"Employment: {status}"] = filtered_dfs
-    
-    return comparison_datasets
+    if not emp.empty and "user_id" in emp.columns and "is_employed" in emp.columns:
+        g = emp["user_id"].map(group_of)
+        employed = employed_flags(emp["is_employed"]).groupby(g, observed=True).agg(["mean", "size"])
+        parts.append(cube_rows(employed["size"], "employment_records"))
+        parts.append(cube_rows(employed["mean"] * 100, "employment_rate"))
+    gp = dfs.get("graduate_profiles", pd.DataFrame())
+    if not gp.empty and "user_id" in gp.columns and "sex" in gp.columns:
+        g = gp["user_id"].map(group_of)
+        genders = gp.groupby([g, gp["sex"].astype(object)], observed=True).size()
+        parts.append(cube_rows(genders[genders > 0], "gender"))
+
+    if not parts:
+        return empty
+    cube = pd.concat(parts, ignore_index=True).reindex(columns=CUBE_COLUMNS)
+    cube["group"] = pd.Categorical(cube["group"].astype(str), categories=groups)
+    return cube
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_comparison_cube(loaded_at: datetime, compare_by: str, _dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Comparison cube for one load_all_timed() result (keyed by its loaded_at)."""
+    return build_comparison_cube(_dfs, compare_by)
+
+def cube_metric(cube: Optional[pd.DataFrame], metric: str) -> pd.DataFrame:
+    """Rows of one metric in group order, with group as plain text."""
+    if cube is None or cube.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    rows = cube[cube["metric"] == metric].sort_values("group", kind="stable")
+    return rows.assign(group=rows["group"].astype(str))
+
+def cube_wide(cube: Optional[pd.DataFrame], metrics: list) -> pd.DataFrame:
+    """Per-group scalar metrics as columns, one row per group in display order."""
+    if cube is None or cube.empty:
+        return pd.DataFrame(columns=metrics)
+    rows = cube[cube["metric"].isin(metrics)]
+    wide = rows.pivot(index="group", columns="metric", values="value").reindex(columns=metrics)
+    wide.index = wide.index.astype(str)
+    return wide
 
 # ---------------------------
 # KPI cards (responsive grid)
 # ---------------------------
-def show_kpis(filtered: Dict[str, pd.DataFrame], comparison_datasets: Dict[str, Dict[str, pd.DataFrame]] = None):
+@traced
+def show_kpis(filtered: Dict[str, pd.DataFrame], comparison: Optional[pd.DataFrame] = None,
+              kpis: Optional[Dict[str, Any]] = None):
+    """KPI cards; counts come from kpis (see summary_kpis) when given, else from the filtered frames."""
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">📊 Key Metrics</h3>', unsafe_allow_html=True)
 
@@ -341,17 +606,22 @@ def show_kpis(filtered: Dict[str, pd.DataFrame], comparison_datasets: Dict[str,
     emp = filtered.get("employment_data", pd.DataFrame())
     surveys = filtered.get("survey_responses", pd.DataFrame())
 
-    total_alumni = len(users) if not users.empty else 0
-    total_graduates = len(edu) if not edu.empty else 0
-
-    # Employment rate
-    emp_rate = None
-    if not emp.empty:
-        emp_col = next((c for c in emp.columns if "is_employed" in c.lower() or "employment_status" in c.lower()), None)
-        if emp_col:
-            s = emp[emp_col].astype(str).str.lower().map(lambda x: 1 if "yes" in x or "employed" in x else 0)
-            if not s.empty:
-                emp_rate = (s.mean() * 100)
+    if kpis is not None:
+        total_alumni = kpis["alumni"]
+        total_graduates = kpis["graduates"]
+        emp_rate = kpis["employment_rate"]
+    else:
+        total_alumni = len(users) if not users.empty else 0
+        total_graduates = len(edu) if not edu.empty else 0
+
+        # Employment rate
+        emp_rate = None
+        if not emp.empty:
+            emp_col = next((c for c in emp.columns if "is_employed" in c.lower() or "employment_status" in c.lower()), None)
+            if emp_col:
+                s = emp[emp_col].astype(str).str.lower().map(lambda x: 1 if "yes" in x or "employed" in x else 0)
+                if not s.empty:
+                    emp_rate = (s.mean() * 100)
 
     # Average parsed salary (if exists)
     avg_salary = None
@@ -362,7 +632,7 @@ def show_kpis(filtered: Dict[str, pd.DataFrame], comparison_datasets: Dict[str,
                 salary_col = c
                 break
     if salary_col:
-        emp["salary_lower"] = emp[salary_col].apply(parse_salary_lower_bound)
+        emp["salary_lower"] = salary_band_column(emp[salary_col], "lower")
         if not emp["salary_lower"].dropna().empty:
             avg_salary = emp["salary_lower"].median()
 
@@ -393,26 +663,16 @@ def show_kpis(filtered: Dict[str, pd.DataFrame], comparison_datasets: Dict[str,
         st.markdown(f'<div class="kpi-value">{(f"₱{int(avg_salary):,}" if avg_salary is not None else "N/A")}</div>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
-    if comparison_datasets:
+    if comparison is not None and not comparison.empty:
         st.markdown("### 📊 Comparison Metrics")
-        comparison_metrics = []
-        
-        for dataset_name, dataset in comparison_datasets.items():
-            emp_data = dataset.get("employment_data", pd.DataFrame())
-            if not emp_data.empty:
-                emp_col = next((c for c in emp_data.columns if "is_employed" in c.lower() or "employment_status" in c.lower()), None)
-                if emp_col:
-                    s = emp_data[emp_col].astype(str).str.lower().map(lambda x: 1 if "yes" in x or "employed" in x else 0)
-                    if not s.empty:
-                        emp_rate_comp = s.mean() * 100
-                        comparison_metrics.append({
-                            "Dataset": dataset_name,
-                            "Graduates": len(dataset.get("educational_background", pd.DataFrame())),
-                            "Employment Rate": f"{emp_rate_comp:.1f}%"
-                        })
+        wide = cube_wide(comparison, ["graduates", "employment_rate"]).dropna(subset=["employment_rate"])
         
-        if comparison_metrics:
-            comp_df = pd.DataFrame(comparison_metrics)
+        if not wide.empty:
+            comp_df = pd.DataFrame({
+                "Dataset": wide.index,
+                "Graduates": wide["graduates"].fillna(0).astype(int).values,
+                "Employment Rate": [f"{rate:.1f}%" for rate in wide["employment_rate"]],
+            })
             st.dataframe(comp_df, use_container_width=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
@@ -420,7 +680,9 @@ def show_kpis(filtered: Dict[str, pd.DataFrame], comparison_datasets: Dict[str,
 # ---------------------------
 # Visualizations & Insights
 # ---------------------------
-def visualize_demographics(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison_datasets: Dict[str, Dict[str, pd.DataFrame]] = None):
+@traced
+def visualize_demographics(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison: Optional[pd.DataFrame] = None,
+                           figure_key: Optional[Tuple] = None):
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">👥 Demographics</h3>', unsafe_allow_html=True)
 
@@ -442,10 +704,9 @@ def visualize_demographics(filtered: Dict[str, pd.DataFrame], compare_by: str, c
                 st.info("No gender data.")
             else:
                 labels = [f"{idx} — {dfp.loc[idx,'Count']:,} ({int(round(dfp.loc[idx,'Percent']))}%)" for idx in dfp.index]
-                fig = px.pie(values=dfp["Count"].values, names=labels, hole=0.35, color_discrete_sequence=COLOR_PALETTE)
-                fig.update_traces(textinfo="none")  # label already contains counts
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                # label already contains counts
+                show_figure("demographics.gender", figure_key, lambda: px.pie(values=dfp["Count"].values, names=labels, hole=0.35, color_discrete_sequence=COLOR_PALETTE)
+                            .update_traces(textinfo="none"))
                 st.markdown(f'<div class="insight">Most common gender: <b>{dfp["Count"].idxmax()}</b> — {dfp["Count"].max():,} ({dfp["Percent"].max():.0f}%).</div>', unsafe_allow_html=True)
         else:
             st.info("No gender field available")
@@ -459,40 +720,31 @@ def visualize_demographics(filtered: Dict[str, pd.DataFrame], compare_by: str, c
                 st.info("No civil status data.")
             else:
                 labels = [f"{idx} — {dfc.loc[idx,'Count']:,} ({int(round(dfc.loc[idx,'Percent']))}%)" for idx in dfc.index]
-                fig = px.pie(values=dfc["Count"].values, names=labels, hole=0.5, color_discrete_sequence=COLOR_PALETTE)
-                fig.update_traces(textinfo="none")
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                show_figure("demographics.civil_status", figure_key, lambda: px.pie(values=dfc["Count"].values, names=labels, hole=0.5, color_discrete_sequence=COLOR_PALETTE)
+                            .update_traces(textinfo="none"))
                 st.markdown(f'<div class="insight">Most common civil status: <b>{dfc["Count"].idxmax()}</b> — {dfc["Count"].max():,} ({dfc["Percent"].max():.0f}%).</div>', unsafe_allow_html=True)
         else:
             st.info("No civil status column")
 
-    if comparison_datasets and compare_by != "Gender":  # Don't compare gender by gender
+    if comparison is not None and not comparison.empty and compare_by != "Gender":  # Don't compare gender by gender
         st.markdown("### 📊 Gender Distribution Comparison")
         if sex_col:
-            comparison_data = []
-            for dataset_name, dataset in comparison_datasets.items():
-                gp_comp = dataset.get("graduate_profiles", pd.DataFrame())
-                if not gp_comp.empty and sex_col in gp_comp.columns:
-                    gender_counts = gp_comp[sex_col].value_counts()
-                    for gender, count in gender_counts.items():
-                        comparison_data.append({
-                            "Dataset": dataset_name,
-                            "Gender": gender,
-                            "Count": count
-                        })
-            
-            if comparison_data:
-                comp_df = pd.DataFrame(comparison_data)
-                fig = px.bar(comp_df, x="Dataset", y="Count", color="Gender", 
-                           title="Gender Distribution Across Datasets")
-                fig.update_layout(xaxis_tickangle=-45)
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+            def gender_comparison():
+                comp_df = cube_metric(comparison, "gender").rename(
+                    columns={"group": "Dataset", "category": "Gender", "value": "Count"}
+                )
+                if comp_df.empty:
+                    return None
+                return (px.bar(comp_df, x="Dataset", y="Count", color="Gender", title="Gender Distribution Across Datasets")
+                        .update_layout(xaxis_tickangle=-45))
+
+            show_figure("demographics.gender_comparison", figure_key, gender_comparison)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
-def visualize_education(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison_datasets: Dict[str, Dict[str, pd.DataFrame]] = None):
+@traced
+def visualize_education(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison: Optional[pd.DataFrame] = None,
+                        figure_key: Optional[Tuple] = None):
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">🎓 Education</h3>', unsafe_allow_html=True)
 
@@ -509,15 +761,13 @@ def visualize_education(filtered: Dict[str, pd.DataFrame], compare_by: str, comp
     c1, c2 = st.columns(2)
     with c1:
         if degree_col:
-            deg_counts = edu[degree_col].fillna("Unknown").astype(str).value_counts()
+            deg_counts = edu[degree_col].astype(object).fillna("Unknown").astype(str).value_counts()
             if deg_counts.empty:
                 st.info("No degree data.")
             else:
                 labels = [f"{idx} — {deg_counts[idx]:,} ({int(round(deg_counts[idx]/deg_counts.sum()*100))}%)" for idx in deg_counts.index]
-                fig = px.treemap(names=deg_counts.index, parents=[""]*len(deg_counts), values=deg_counts.values, hover_data=[deg_counts.values])
-                fig.update_traces(textinfo="label+value")
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                show_figure("education.degrees", figure_key, lambda: px.treemap(names=deg_counts.index, parents=[""]*len(deg_counts), values=deg_counts.values, hover_data=[deg_counts.values])
+                            .update_traces(textinfo="label+value"))
                 top = deg_counts.idxmax()
                 st.markdown(f'<div class="insight">Top program: <b>{top}</b> — {deg_counts.max():,} graduates ({int(round(deg_counts.max()/deg_counts.sum()*100))}%).</div>', unsafe_allow_html=True)
         else:
@@ -525,45 +775,37 @@ def visualize_education(filtered: Dict[str, pd.DataFrame], compare_by: str, comp
 
     with c2:
         if year_col:
-            yc = edu[year_col].replace("", np.nan).dropna().astype(str).value_counts().sort_index()
+            yc = edu[year_col].dropna().astype(str).value_counts().sort_index()
             if yc.empty:
                 st.info("No graduation year data.")
             else:
-                fig = px.line(x=yc.index, y=yc.values, markers=True)
-                fig.update_layout(xaxis_title="Graduation Year", yaxis_title="Count", font=dict(color="black"))
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                show_figure("education.years", figure_key, lambda: px.line(x=yc.index, y=yc.values, markers=True)
+                            .update_layout(xaxis_title="Graduation Year", yaxis_title="Count", font=dict(color="black")))
                 peak = yc.idxmax()
                 st.markdown(f'<div class="insight">Peak graduation year: <b>{peak}</b> — {yc.max():,} graduates.</div>', unsafe_allow_html=True)
         else:
             st.info("No graduation year column found.")
 
-    if comparison_datasets and compare_by not in ["Program", "Graduation Year"]:
+    if comparison is not None and not comparison.empty and compare_by not in ["Program", "Graduation Year"]:
         st.markdown("### 📊 Program Distribution Comparison")
         if degree_col:
-            comparison_data = []
-            for dataset_name, dataset in comparison_datasets.items():
-                edu_comp = dataset.get("educational_background", pd.DataFrame())
-                if not edu_comp.empty and degree_col in edu_comp.columns:
-                    program_counts = edu_comp[degree_col].value_counts().head(5)  # Top 5 programs
-                    for program, count in program_counts.items():
-                        comparison_data.append({
-                            "Dataset": dataset_name,
-                            "Program": program,
-                            "Count": count
-                        })
-            
-            if comparison_data:
-                comp_df = pd.DataFrame(comparison_data)
-                fig = px.bar(comp_df, x="Dataset", y="Count", color="Program", 
-                           title="Top Programs Across Datasets")
-                fig.update_layout(xaxis_tickangle=-45)
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+            def program_comparison():
+                # Top 5 programs per group
+                comp_df = cube_metric(comparison, "program").rename(
+                    columns={"group": "Dataset", "category": "Program", "value": "Count"}
+                )
+                if comp_df.empty:
+                    return None
+                return (px.bar(comp_df, x="Dataset", y="Count", color="Program", title="Top Programs Across Datasets")
+                        .update_layout(xaxis_tickangle=-45))
+
+            show_figure("education.program_comparison", figure_key, program_comparison)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
-def visualize_employment(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison_datasets: Dict[str, Dict[str, pd.DataFrame]] = None):
+@traced
+def visualize_employment(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison: Optional[pd.DataFrame] = None,
+                         figure_key: Optional[Tuple] = None):
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">💼 Employment & Careers</h3>', unsafe_allow_html=True)
 
@@ -586,9 +828,7 @@ def visualize_employment(filtered: Dict[str, pd.DataFrame], compare_by: str, com
                 st.info("No employment status values.")
             else:
                 labels = [f"{idx} — {s.loc[idx,'Count']:,} ({int(round(s.loc[idx,'Percent']))}%)" for idx in s.index]
-                fig = px.funnel(x=s["Count"].values, y=labels)
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                show_figure("employment.status", figure_key, lambda: px.funnel(x=s["Count"].values, y=labels))
                 top = s["Count"].idxmax()
                 st.markdown(f'<div class="insight">Most common employment status: <b>{top}</b> — {s["Count"].max():,} ({s["Percent"].max():.0f}%).</div>', unsafe_allow_html=True)
         else:
@@ -596,43 +836,32 @@ def visualize_employment(filtered: Dict[str, pd.DataFrame], compare_by: str, com
 
     with c2:
         if business_col:
-            b = emp[business_col].fillna("Unknown").astype(str).value_counts().head(12)
+            b = emp[business_col].astype(object).fillna("Unknown").astype(str).value_counts().head(12)
             if b.empty:
                 st.info("No industry data.")
             else:
                 labels = [f"{idx} — {b[idx]:,} ({int(round(b[idx]/b.sum()*100))}%)" for idx in b.index]
-                fig = px.bar(x=b.values, y=labels, orientation='h')
-                fig.update_traces(texttemplate="%{x:.0f}", textposition="outside")
-                enforce_int_ticks(fig)
-                st.plotly_chart(fig, use_container_width=True)
+                show_figure("employment.industries", figure_key, lambda: px.bar(x=b.values, y=labels, orientation='h')
+                            .update_traces(texttemplate="%{x:.0f}", textposition="outside"))
                 st.markdown(f'<div class="insight">Top industry: <b>{b.idxmax()}</b> — {b.max():,} alumni.</div>', unsafe_allow_html=True)
         else:
             st.info("No industry/business_line field present.")
 
-    if comparison_datasets:
+    if comparison is not None and not comparison.empty:
         st.markdown("### 📊 Employment Rate Comparison")
-        comparison_data = []
-        for dataset_name, dataset in comparison_datasets.items():
-            emp_comp = dataset.get("employment_data", pd.DataFrame())
-            if not emp_comp.empty and is_emp_col and is_emp_col in emp_comp.columns:
-                s = emp_comp[is_emp_col].astype(str).str.lower().map(lambda x: 1 if "yes" in x or "employed" in x else 0)
-                if not s.empty:
-                    emp_rate = s.mean() * 100
-                    comparison_data.append({
-                        "Dataset": dataset_name,
-                        "Employment Rate": emp_rate,
-                        "Total Graduates": len(emp_comp)
-                    })
+        wide = cube_wide(comparison, ["employment_rate", "employment_records"]).dropna(subset=["employment_rate"])
         
-        if comparison_data:
-            comp_df = pd.DataFrame(comparison_data)
-            fig = px.bar(comp_df, x="Dataset", y="Employment Rate", 
-                        title="Employment Rate Comparison",
-                        text="Employment Rate")
-            fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-            fig.update_layout(xaxis_tickangle=-45, yaxis_title="Employment Rate (%)")
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        if not wide.empty and is_emp_col:
+            comp_df = pd.DataFrame({
+                "Dataset": wide.index,
+                "Employment Rate": wide["employment_rate"].values,
+                "Total Graduates": wide["employment_records"].astype(int).values,
+            })
+            show_figure("employment.rate_comparison", figure_key, lambda: px.bar(comp_df, x="Dataset", y="Employment Rate", 
+                                    title="Employment Rate Comparison",
+                                    text="Employment Rate")
+                        .update_traces(texttemplate='%{text:.1f}%', textposition='outside')
+                        .update_layout(xaxis_tickangle=-45, yaxis_title="Employment Rate (%)"))
             
             # Highlight best and worst performing groups
             if len(comp_df) > 1:
@@ -646,58 +875,70 @@ def visualize_employment(filtered: Dict[str, pd.DataFrame], compare_by: str, com
     st.markdown("**Occupation & Salary (parsed)**")
     occ_col_local = occ_col
     if occ_col_local and occ_col_local in emp.columns:
-        top_occ = emp[occ_col_local].fillna("Unknown").astype(str).value_counts().head(10)
-        if not top_occ.empty:
+        def occupations():
+            top_occ = emp[occ_col_local].fillna("Unknown").astype(str).value_counts().head(10)
+            if top_occ.empty:
+                return None
             labels = [f"{idx} — {top_occ[idx]:,} ({int(round(top_occ[idx]/top_occ.sum()*100))}%)" for idx in top_occ.index]
-            fig = px.bar(x=top_occ.values, y=labels, orientation='h')
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            return px.bar(x=top_occ.values, y=labels, orientation='h')
+
+        show_figure("employment.occupations", figure_key, occupations)
     if salary_col and salary_col in emp.columns:
-        emp["salary_lower"] = emp[salary_col].apply(parse_salary_lower_bound)
+        emp["salary_lower"] = salary_band_column(emp[salary_col], "lower")
         if not emp["salary_lower"].dropna().empty:
             median_salary = emp["salary_lower"].median()
-            fig = px.histogram(emp, x="salary_lower", nbins=12)
-            fig.update_layout(xaxis_title="Parsed salary (lower bound)", yaxis_title="Count")
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("employment.salary", figure_key, lambda: px.histogram(emp, x="salary_lower", nbins=12)
+                        .update_layout(xaxis_title="Parsed salary (lower bound)", yaxis_title="Count"))
             st.markdown(f'<div class="insight">Estimated median lower-bound salary: <b>₱{median_salary:,.0f}</b> (parsed).</div>', unsafe_allow_html=True)
         else:
             st.info("Salary field present but not parseable into numeric values for summary.")
     st.markdown('</div>', unsafe_allow_html=True)
 
-def visualize_engagement(filtered: Dict[str, pd.DataFrame]):
+@traced
+def visualize_engagement(filtered: Dict[str, pd.DataFrame], filters: Dict[str, Any], figure_key: Optional[Tuple] = None):
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">📈 Engagement</h3>', unsafe_allow_html=True)
 
-    act = filtered.get("activity_logs", pd.DataFrame())
-    if act.empty or "created_at" not in act.columns:
-        st.info("No engagement/activity logs available.")
-        st.markdown('</div>', unsafe_allow_html=True)
-        return
+    period = st.selectbox("Period", options=list(ENGAGEMENT_PERIODS), index=0, key="engagement_period")
+    days = ENGAGEMENT_PERIODS[period]
+    rollup = load_daily_activity(rollup_filters_key(filters), days)
+    engagement_key = None
+    if rollup is not None:
+        # The rollup refreshes on its own schedule, so its figures are keyed by its contents
+        if figure_key is not None:
+            engagement_key = figure_key + (period, int(pd.util.hash_pandas_object(rollup, index=False).sum()))
+        daily = rollup.groupby("day")["activities"].sum().astype(int)
+        type_counts = rollup.groupby("activity_type")["activities"].sum().astype(int).sort_values(ascending=False)
+    else:
+        # activity_rollup not installed: count the filtered raw logs
+        act = filtered.get("activity_logs", pd.DataFrame())
+        if act.empty or "created_at" not in act.columns:
+            st.info("No engagement/activity logs available.")
+            st.markdown('</div>', unsafe_allow_html=True)
+            return
+        if figure_key is not None:
+            engagement_key = figure_key + (period, "logs")
+        created = pd.to_datetime(act["created_at"], errors="coerce")
+        in_period = created >= datetime.now() - timedelta(days=days) if days else created.notna()
+        daily = created[in_period].dt.date.value_counts().sort_index()
+        type_counts = safe_count_series(act.loc[in_period, "activity_type"]) if "activity_type" in act.columns else pd.Series(dtype=int)
 
-    act = act.copy()
-    act["created_at_dt"] = pd.to_datetime(act["created_at"], errors="coerce")
-    act["date"] = act["created_at_dt"].dt.date
-    daily = act["date"].value_counts().sort_index()
     if not daily.empty:
-        fig = px.area(x=daily.index, y=daily.values, title="Daily Engagement Activity")
-        fig.update_layout(xaxis_title="Date", yaxis_title="Activities")
-        enforce_int_ticks(fig)
-        st.plotly_chart(fig, use_container_width=True)
+        show_figure("engagement.daily", engagement_key, lambda: px.area(x=daily.index, y=daily.values, title="Daily Engagement Activity")
+                    .update_layout(xaxis_title="Date", yaxis_title="Activities"))
         st.markdown(f'<div class="insight">Total activity records in range: <b>{daily.sum():,}</b>. Highest day: <b>{daily.idxmax()}</b> — {daily.max():,} activities.</div>', unsafe_allow_html=True)
     else:
         st.info("No engagement within selected range")
 
-    if "activity_type" in act.columns:
-        types = counts_and_percents(act["activity_type"])
-        if not types.empty:
-            labels = [f"{idx} — {types.loc[idx,'Count']:,} ({int(round(types.loc[idx,'Percent']))}%)" for idx in types.index]
-            fig = px.pie(values=types["Count"].values, names=labels, hole=0.3)
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+    types = percent_table(type_counts[type_counts > 0])
+    if not types.empty:
+        labels = [f"{idx} — {types.loc[idx,'Count']:,} ({int(round(types.loc[idx,'Percent']))}%)" for idx in types.index]
+        show_figure("engagement.types", engagement_key, lambda: px.pie(values=types["Count"].values, names=labels, hole=0.3))
     st.markdown('</div>', unsafe_allow_html=True)
 
-def visualize_competencies_and_texts(filtered: Dict[str, pd.DataFrame]):
+@traced
+def visualize_competencies_and_texts(filtered: Dict[str, pd.DataFrame], suggestion_index: TokenIndex,
+                                     figure_key: Optional[Tuple] = None):
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">🛠 Competencies & Open Feedback</h3>', unsafe_allow_html=True)
 
@@ -710,43 +951,32 @@ def visualize_competencies_and_texts(filtered: Dict[str, pd.DataFrame]):
         top_comp = comps["competency"].value_counts().head(10)
         if not top_comp.empty:
             labels = [f"{idx} — {top_comp[idx]:,} ({int(round(top_comp[idx]/top_comp.sum()*100))}%)" for idx in top_comp.index]
-            fig = px.bar(x=top_comp.values, y=labels, orientation='h')
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("competencies.top", figure_key, lambda: px.bar(x=top_comp.values, y=labels, orientation='h'))
             st.markdown(f'<div class="insight">Top competency: <b>{top_comp.idxmax()}</b> — {top_comp.max():,} mentions.</div>', unsafe_allow_html=True)
     else:
         st.info("No competency entries.")
 
     st.markdown("**Reasons for choosing course (top)**")
     if not course_reasons.empty and "reason_type" in course_reasons.columns:
-        rr = course_reasons["reason_type"].value_counts().head(10)
-        if not rr.empty:
-            labels = [f"{idx} — {rr[idx]:,}" for idx in rr.index]
-            fig = px.bar(x=rr.values, y=labels, orientation='h')
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure("competencies.course_reasons", figure_key,
+                    lambda: top_counts_bar(course_reasons["reason_type"].value_counts().head(10)))
     else:
         st.info("No course reason data")
 
     st.markdown("**Unemployment Reasons (top)**")
     if not unem_reasons.empty and "reason" in unem_reasons.columns:
-        ur = unem_reasons["reason"].value_counts().head(10)
-        if not ur.empty:
-            labels = [f"{idx} — {ur[idx]:,}" for idx in ur.index]
-            fig = px.bar(x=ur.values, y=labels, orientation='h')
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure("competencies.unemployment_reasons", figure_key,
+                    lambda: top_counts_bar(unem_reasons["reason"].value_counts().head(10)))
     else:
         st.info("No unemployment reasons")
 
     st.markdown("**Curriculum Suggestions - Top words**")
     if not suggestions.empty and "suggestion" in suggestions.columns:
-        tw = top_n_words(suggestions["suggestion"].dropna().astype(str), n=15)
-        if not tw.empty:
-            labels = [f"{idx} — {tw[idx]:,}" for idx in tw.index]
-            fig = px.bar(x=tw.values, y=labels, orientation='h')
-            enforce_int_ticks(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        ngram = st.radio("Terms", options=[1, 2], format_func=lambda n: "Words" if n == 1 else "Two-word phrases",
+                         horizontal=True, key="suggestion_ngram")
+        # Counts come from the shared index: only the postings of the filtered users are summed
+        show_figure("competencies.suggestion_terms", None if figure_key is None else figure_key + (ngram,),
+                    lambda: top_counts_bar(suggestion_index.top(15, ngram=ngram, user_ids=suggestions["user_id"].dropna().unique())))
     else:
         st.info("No curriculum suggestions text")
 
@@ -755,7 +985,9 @@ def visualize_competencies_and_texts(filtered: Dict[str, pd.DataFrame]):
 # ---------------------------
 # Insights generator
 # ---------------------------
-def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison_datasets: Dict[str, Dict[str, pd.DataFrame]] = None) -> list:
+@traced
+def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, comparison: Optional[pd.DataFrame] = None,
+                      recent_activities: Optional[int] = None) -> list:
     insights = []
     edu = filtered.get("educational_background", pd.DataFrame())
     emp = filtered.get("employment_data", pd.DataFrame())
@@ -783,7 +1015,7 @@ def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, compar
     if not edu.empty:
         deg_col = next((c for c in edu.columns if "degree" in c.lower()), None)
         if deg_col:
-            top_deg_counts = edu[deg_col].value_counts()
+            top_deg_counts = safe_count_series(edu[deg_col])
             if not top_deg_counts.empty:
                 insights.append(f"Most common degree: {top_deg_counts.idxmax()} ({top_deg_counts.max():,} graduates).")
 
@@ -799,18 +1031,10 @@ def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, compar
         if not top_comp.empty:
             insights.append(f"Top competency reported: {top_comp.idxmax()} ({top_comp.max():,} mentions). Consider aligning curriculum.")
 
-    if comparison_datasets:
+    if comparison is not None and not comparison.empty:
         # Employment rate comparison insights
-        emp_rates = []
-        for dataset_name, dataset in comparison_datasets.items():
-            emp_comp = dataset.get("employment_data", pd.DataFrame())
-            if not emp_comp.empty:
-                is_emp_col = next((c for c in emp_comp.columns if "is_employed" in c.lower() or "employment_status" in c.lower()), None)
-                if is_emp_col:
-                    s = emp_comp[is_emp_col].astype(str).str.strip().str.lower().map(lambda x: 1 if "yes" in x or "employed" in x else 0)
-                    if not s.empty:
-                        emp_rate = s.mean() * 100
-                        emp_rates.append((dataset_name, emp_rate, len(emp_comp)))
+        wide = cube_wide(comparison, ["employment_rate", "employment_records"]).dropna(subset=["employment_rate"])
+        emp_rates = list(zip(wide.index, wide["employment_rate"], wide["employment_records"].astype(int)))
         
         if len(emp_rates) >= 2:
             emp_rates.sort(key=lambda x: x[1], reverse=True)
@@ -822,11 +1046,8 @@ def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, compar
                 insights.append(f"⚠️ Significant disparity detected: {best[0]} graduates are significantly more likely to be employed than {worst[0]} graduates.")
         
         # Graduate count comparison
-        grad_counts = []
-        for dataset_name, dataset in comparison_datasets.items():
-            edu_comp = dataset.get("educational_background", pd.DataFrame())
-            if not edu_comp.empty:
-                grad_counts.append((dataset_name, len(edu_comp)))
+        graduates = cube_metric(comparison, "graduates")
+        grad_counts = list(zip(graduates["group"], graduates["value"].astype(int)))
         
         if grad_counts:
             grad_counts.sort(key=lambda x: x[1], reverse=True)
@@ -834,9 +1055,11 @@ def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, compar
             largest = grad_counts[0]
             insights.append(f"📈 Dataset sizes: {largest[0]} has the most graduates ({largest[1]:,}, {largest[1]/total_grads*100:.1f}% of total).")
 
-    # recent engagement
+    # recent engagement (from the activity rollup when available)
     act = filtered.get("activity_logs", pd.DataFrame())
-    if not act.empty and "created_at" in act.columns:
+    if recent_activities is not None:
+        insights.append(f"Recent engagement: {recent_activities:,} activities in the last 30 days.")
+    elif not act.empty and "created_at" in act.columns:
         act["date"] = pd.to_datetime(act["created_at"], errors="coerce").dt.date
         recent = act[act["date"] >= (datetime.now().date() - timedelta(days=30))]
         insights.append(f"Recent engagement: {len(recent):,} activities in the last 30 days.")
@@ -846,6 +1069,7 @@ def generate_insights(filtered: Dict[str, pd.DataFrame], compare_by: str, compar
 # ---------------------------
 # Export flattened dataframe
 # ---------------------------
+@traced
 def get_filtered_dataframe_for_export(filtered: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     users = filtered.get("users", pd.DataFrame())
     edu = filtered.get("educational_background", pd.DataFrame())
@@ -879,6 +1103,60 @@ def get_filtered_dataframe_for_export(filtered: Dict[str, pd.DataFrame]) -> pd.D
     base = join_table(base, surv, "survey")
     return base.reset_index()
 
+# ---------------------------
+# Stored reports (generated_reports, written by generate_reports.py)
+# ---------------------------
+@st.cache_data(ttl=60)
+def load_stored_reports() -> Optional[pd.DataFrame]:
+    """Reports precomputed by the batch generator, or None when the table is missing."""
+    try:
+        return pd.read_sql(
+            "SELECT id, report_type, report_key, report_title, file_path, created_at "
+            "FROM generated_reports ORDER BY report_type, report_key", con=get_engine())
+    except Exception:
+        return None
+
+@st.cache_data(ttl=600)
+def load_report_data(report_id: int, created_at: datetime) -> Dict[str, Any]:
+    """Parsed report_data of one stored report (created_at keys the cache to the stored run)."""
+    with get_engine().connect() as conn:
+        payload = conn.execute(text("SELECT report_data FROM generated_reports WHERE id = :id"), {"id": report_id}).scalar()
+    if payload is None:
+        return {}
+    return payload if isinstance(payload, dict) else json.loads(payload)
+
+@traced
+def show_stored_reports():
+    """Pick a precomputed report and show its sections without recomputing them."""
+    reports = load_stored_reports()
+    if reports is None or reports.empty:
+        st.caption("No stored reports yet. Run `python generate_reports.py` to precompute them.")
+        return
+    labels = [f"{row.report_title} ({row.created_at:%Y-%m-%d %H:%M})" for row in reports.itertuples()]
+    choice = st.selectbox("Report", range(len(reports)), format_func=lambda i: labels[i], key="stored_report")
+    report = reports.iloc[choice]
+    data = load_report_data(int(report["id"]), report["created_at"])
+    scalars = {k: v for k, v in data.items() if not isinstance(v, (list, dict))}
+    if scalars:
+        st.dataframe(pd.DataFrame({"Field": list(scalars), "Value": [str(v) for v in scalars.values()]}),
+                     use_container_width=True, hide_index=True)
+    for name, value in data.items():
+        if isinstance(value, dict):
+            value = [value]
+        if not isinstance(value, list) or not value:
+            continue
+        st.markdown(f"**{name.replace('_', ' ').title()}**")
+        if all(isinstance(item, dict) for item in value):
+            st.dataframe(pd.DataFrame(value), use_container_width=True, hide_index=True)
+        else:
+            for item in value:
+                st.write(f"- {item}")
+    path = report["file_path"]
+    if isinstance(path, str) and os.path.exists(path):
+        with open(path, "rb") as f:
+            st.download_button("Download workbook", f.read(), os.path.basename(path),
+                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
 # ---------------------------
 # Main application
 # ---------------------------
@@ -886,36 +1164,50 @@ def main():
     st.markdown('<div class="main-header">Alumify Analytics PRO</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Data-driven dashboard with enhanced comparison capabilities</div>', unsafe_allow_html=True)
 
-    dfs = load_all()
+    with span("load_all_timed") as load_span:
+        dfs, load_meta = load_all_timed()
+        load_span.rows_out = count_rows(dfs)
+    # Tokenizes only the suggestions added since the previous load
+    suggestion_index = get_suggestion_index()
+    suggestion_index.sync(dfs.get("curriculum_suggestions"), version=load_meta["loaded_at"])
+    if load_meta["stale"]:
+        st.warning("The database did not answer in time; showing the last saved snapshot of the data.")
+    user_index = get_user_index(load_meta["loaded_at"], dfs)
     top_filters = top_filter_bar(dfs)
-    filtered = apply_filters(dfs, {"year": top_filters["year"], "program": top_filters["program"], "gender": top_filters["gender"]})
+    filtered = apply_filters(dfs, {"year": top_filters["year"], "program": top_filters["program"], "gender": top_filters["gender"]}, user_index)
     compare_by = top_filters.get("compare_by", "None")
     
-    comparison_datasets = create_comparison_datasets(dfs, compare_by) if compare_by != "None" else {}
+    with span("get_comparison_cube"):
+        comparison = get_comparison_cube(load_meta["loaded_at"], compare_by, dfs) if compare_by != "None" else None
 
-    # Show KPIs
-    show_kpis(filtered, comparison_datasets)
+    # Show KPIs (summed from the database-maintained summary when it is installed)
+    kpi_summary = load_kpi_summary()
+    show_kpis(filtered, comparison, summary_kpis(kpi_summary, top_filters) if kpi_summary is not None else None)
 
     st.markdown("---")
 
-    # Visual sections with comparison support
+    # Visual sections with comparison support. Finished go.Figure objects are cached per data load
+    # and filter state, so reruns that change neither (expanders, exports) skip building them;
+    # plotly_chart still serializes each figure on every rerun
+    figure_key = (load_meta["loaded_at"], top_filters["year"], top_filters["program"], top_filters["gender"], compare_by)
     with st.expander("Demographics & Education", expanded=True):
-        visualize_demographics(filtered, compare_by, comparison_datasets)
-        visualize_education(filtered, compare_by, comparison_datasets)
+        visualize_demographics(filtered, compare_by, comparison, figure_key)
+        visualize_education(filtered, compare_by, comparison, figure_key)
 
     with st.expander("Employment & Careers", expanded=True):
-        visualize_employment(filtered, compare_by, comparison_datasets)
+        visualize_employment(filtered, compare_by, comparison, figure_key)
 
     with st.expander("Engagement", expanded=False):
-        visualize_engagement(filtered)
+        visualize_engagement(filtered, top_filters, figure_key)
 
     with st.expander("Competencies & Text Feedback", expanded=False):
-        visualize_competencies_and_texts(filtered)
+        visualize_competencies_and_texts(filtered, suggestion_index, figure_key)
 
     # Enhanced Insights with comparison analysis
     st.markdown('<div class="story-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">💡 Key Insights & Comparisons</h3>', unsafe_allow_html=True)
-    insights = generate_insights(filtered, compare_by, comparison_datasets)
+    recent = load_daily_activity(rollup_filters_key(top_filters), 30)
+    insights = generate_insights(filtered, compare_by, comparison, int(recent["activities"].sum()) if recent is not None else None)
     if not insights:
         st.info("No insights available for the selected filters.")
     else:
@@ -929,26 +1221,44 @@ def main():
     # Exports
     st.markdown("---")
     st.header("Export Filtered Data")
-    export_df = get_filtered_dataframe_for_export(filtered)
-    if export_df.empty:
+    # The export frame is only joined and written when a download is prepared;
+    # the file is shared by every session on the same load and filters
+    export_base = filtered.get("users", pd.DataFrame())
+    if export_base.empty:
+        export_base = filtered.get("educational_background", pd.DataFrame())
+    if export_base.empty:
         st.info("No data available to export for the current filters.")
     else:
-        st.write(f"Filtered dataset contains {len(export_df):,} rows.")
+        st.write(f"Filtered dataset contains {len(export_base):,} rows.")
+        export_key = ("alumify_filtered", load_meta["loaded_at"], top_filters["year"], top_filters["program"], top_filters["gender"])
+        build_export = lambda: get_filtered_dataframe_for_export(filtered)
+        # Written to temp files in chunks (constant-memory xlsxwriter for Excel)
         c1, c2 = st.columns(2)
         with c1:
-            csv = export_df.to_csv(index=False).encode('utf-8')
-            st.download_button("Download CSV", data=csv, file_name="alumify_filtered.csv", mime="text/csv")
+            lazy_download_button("Download CSV", export_key, build_export, "csv", "alumify_filtered.csv")
         with c2:
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-                export_df.to_excel(writer, index=False, sheet_name='Filtered')
-            towrite.seek(0)
-            st.download_button("Download Excel", data=towrite, file_name="alumify_filtered.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            lazy_download_button("Download Excel", export_key, build_export, "xlsx", "alumify_filtered.xlsx", sheet_name="Filtered")
+
+    # Precomputed reports (generate_reports.py), read back instead of rebuilt
+    with st.expander("Stored Reports", expanded=False):
+        show_stored_reports()
 
     # Footer
     st.markdown("---")
+    with st.expander("Data load timings", expanded=False):
+        timings = pd.Series(load_meta["timings"]).sort_values(ascending=False)
+        sources = [load_meta["sources"][t] for t in timings.index]
+        st.dataframe(pd.DataFrame({"Table": timings.index, "Source": sources, "Seconds": timings.values.round(3)}), use_container_width=True)
+        st.caption(f"Loaded {len(timings)} tables in {load_meta['wall_time']:.2f}s with up to {LOAD_CONCURRENCY} concurrent queries "
+                   f"(sequential total {timings.sum():.2f}s) at {load_meta['loaded_at'].strftime('%H:%M:%S')}.")
+        figures = get_figure_cache().stats()
+        st.caption(f"Figure cache: {figures['figures']} figures, {figures['bytes'] / 1e6:.1f} of {figures['max_bytes'] / 1e6:.0f} MB, "
+                   f"{figures['hits']:,} hits / {figures['misses']:,} misses.")
     st.caption(f"Last refreshed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     st.caption("Enhanced with multi-dataset comparison capabilities - All analyses are based on available fields in your alumify database.")
 
 if __name__ == "__main__":
-    main()
+    # Stage timings per run; the panel is only shown with ?trace=<ALUMIFY_TRACE_KEY>
+    with traced_run("dashboardPINAKA"):
+        main()
+        render_trace_panel()
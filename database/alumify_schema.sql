@@ -146,3 +146,334 @@ CREATE INDEX IF NOT EXISTS idx_activity_logs_user_id ON activity_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_activity_logs_created_at ON activity_logs(created_at);
 CREATE INDEX IF NOT EXISTS idx_educational_background_year_graduated ON educational_background(year_graduated);
 CREATE INDEX IF NOT EXISTS idx_educational_background_degree ON educational_background(degree);
+-- Data Explorer sort keys; with the primary key they serve the (column, id) keyset pages
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+CREATE INDEX IF NOT EXISTS idx_employment_data_is_employed ON employment_data(is_employed);
+
+-- Denormalized alumni view read by the analytics dashboard instead of merging
+-- in pandas. Every joined table is 1:1 on user_id (UNIQUE KEY), so this is a
+-- single indexed join; only the columns the dashboard renders are exposed.
+CREATE OR REPLACE VIEW alumni_overview AS
+SELECT
+    u.id,
+    u.name,
+    u.email,
+    p.sex,
+    p.civil_status,
+    e.degree,
+    e.year_graduated,
+    emp.is_employed,
+    emp.employment_status,
+    emp.present_occupation,
+    emp.business_line,
+    emp.place_of_work,
+    s.is_completed,
+    s.completed_at
+FROM users u
+LEFT JOIN graduate_profiles p ON p.user_id = u.id
+LEFT JOIN educational_background e ON e.user_id = u.id
+LEFT JOIN employment_data emp ON emp.user_id = u.id
+LEFT JOIN survey_responses s ON s.user_id = u.id
+WHERE u.role != 'admin';
+
+
+-- Change feed for the dashboards: one counter per table, bumped by the
+-- triggers below on every INSERT, UPDATE and DELETE. A single
+-- SELECT on this table tells a watcher which tables changed since its last
+-- poll, instead of MAX(updated_at) aggregates over every table.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO table_versions (table_name) VALUES
+('users'),
+('graduate_profiles'),
+('educational_background'),
+('employment_data'),
+('course_reasons'),
+('unemployment_reasons'),
+('useful_competencies'),
+('curriculum_suggestions'),
+('survey_responses'),
+('activity_logs');
+
+
+DROP TRIGGER IF EXISTS users_ai_version;
+CREATE TRIGGER users_ai_version AFTER INSERT ON users FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+DROP TRIGGER IF EXISTS users_au_version;
+CREATE TRIGGER users_au_version AFTER UPDATE ON users FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+DROP TRIGGER IF EXISTS users_ad_version;
+CREATE TRIGGER users_ad_version AFTER DELETE ON users FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+
+DROP TRIGGER IF EXISTS graduate_profiles_ai_version;
+CREATE TRIGGER graduate_profiles_ai_version AFTER INSERT ON graduate_profiles FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'graduate_profiles';
+DROP TRIGGER IF EXISTS graduate_profiles_au_version;
+CREATE TRIGGER graduate_profiles_au_version AFTER UPDATE ON graduate_profiles FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'graduate_profiles';
+DROP TRIGGER IF EXISTS graduate_profiles_ad_version;
+CREATE TRIGGER graduate_profiles_ad_version AFTER DELETE ON graduate_profiles FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'graduate_profiles';
+
+DROP TRIGGER IF EXISTS educational_background_ai_version;
+CREATE TRIGGER educational_background_ai_version AFTER INSERT ON educational_background FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'educational_background';
+DROP TRIGGER IF EXISTS educational_background_au_version;
+CREATE TRIGGER educational_background_au_version AFTER UPDATE ON educational_background FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'educational_background';
+DROP TRIGGER IF EXISTS educational_background_ad_version;
+CREATE TRIGGER educational_background_ad_version AFTER DELETE ON educational_background FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'educational_background';
+
+DROP TRIGGER IF EXISTS employment_data_ai_version;
+CREATE TRIGGER employment_data_ai_version AFTER INSERT ON employment_data FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'employment_data';
+DROP TRIGGER IF EXISTS employment_data_au_version;
+CREATE TRIGGER employment_data_au_version AFTER UPDATE ON employment_data FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'employment_data';
+DROP TRIGGER IF EXISTS employment_data_ad_version;
+CREATE TRIGGER employment_data_ad_version AFTER DELETE ON employment_data FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'employment_data';
+
+DROP TRIGGER IF EXISTS course_reasons_ai_version;
+CREATE TRIGGER course_reasons_ai_version AFTER INSERT ON course_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'course_reasons';
+DROP TRIGGER IF EXISTS course_reasons_au_version;
+CREATE TRIGGER course_reasons_au_version AFTER UPDATE ON course_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'course_reasons';
+DROP TRIGGER IF EXISTS course_reasons_ad_version;
+CREATE TRIGGER course_reasons_ad_version AFTER DELETE ON course_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'course_reasons';
+
+DROP TRIGGER IF EXISTS unemployment_reasons_ai_version;
+CREATE TRIGGER unemployment_reasons_ai_version AFTER INSERT ON unemployment_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'unemployment_reasons';
+DROP TRIGGER IF EXISTS unemployment_reasons_au_version;
+CREATE TRIGGER unemployment_reasons_au_version AFTER UPDATE ON unemployment_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'unemployment_reasons';
+DROP TRIGGER IF EXISTS unemployment_reasons_ad_version;
+CREATE TRIGGER unemployment_reasons_ad_version AFTER DELETE ON unemployment_reasons FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'unemployment_reasons';
+
+DROP TRIGGER IF EXISTS useful_competencies_ai_version;
+CREATE TRIGGER useful_competencies_ai_version AFTER INSERT ON useful_competencies FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'useful_competencies';
+DROP TRIGGER IF EXISTS useful_competencies_au_version;
+CREATE TRIGGER useful_competencies_au_version AFTER UPDATE ON useful_competencies FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'useful_competencies';
+DROP TRIGGER IF EXISTS useful_competencies_ad_version;
+CREATE TRIGGER useful_competencies_ad_version AFTER DELETE ON useful_competencies FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'useful_competencies';
+
+DROP TRIGGER IF EXISTS curriculum_suggestions_ai_version;
+CREATE TRIGGER curriculum_suggestions_ai_version AFTER INSERT ON curriculum_suggestions FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'curriculum_suggestions';
+DROP TRIGGER IF EXISTS curriculum_suggestions_au_version;
+CREATE TRIGGER curriculum_suggestions_au_version AFTER UPDATE ON curriculum_suggestions FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'curriculum_suggestions';
+DROP TRIGGER IF EXISTS curriculum_suggestions_ad_version;
+CREATE TRIGGER curriculum_suggestions_ad_version AFTER DELETE ON curriculum_suggestions FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'curriculum_suggestions';
+
+DROP TRIGGER IF EXISTS survey_responses_ai_version;
+CREATE TRIGGER survey_responses_ai_version AFTER INSERT ON survey_responses FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'survey_responses';
+DROP TRIGGER IF EXISTS survey_responses_au_version;
+CREATE TRIGGER survey_responses_au_version AFTER UPDATE ON survey_responses FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'survey_responses';
+DROP TRIGGER IF EXISTS survey_responses_ad_version;
+CREATE TRIGGER survey_responses_ad_version AFTER DELETE ON survey_responses FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'survey_responses';
+
+DROP TRIGGER IF EXISTS activity_logs_ai_version;
+CREATE TRIGGER activity_logs_ai_version AFTER INSERT ON activity_logs FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'activity_logs';
+DROP TRIGGER IF EXISTS activity_logs_au_version;
+CREATE TRIGGER activity_logs_au_version AFTER UPDATE ON activity_logs FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'activity_logs';
+DROP TRIGGER IF EXISTS activity_logs_ad_version;
+CREATE TRIGGER activity_logs_ad_version AFTER DELETE ON activity_logs FOR EACH ROW
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'activity_logs';
+
+
+-- Precomputed KPI counts per (degree, year_graduated, sex, is_employed) group.
+-- The dashboards' KPI headers sum these few hundred rows instead of scanning
+-- the alumni tables. Rebuilt by refresh_alumni_kpi_summary(), which only
+-- regroups when table_versions shows a change in one of its source tables.
+CREATE TABLE IF NOT EXISTS alumni_kpi_summary (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    degree VARCHAR(255),
+    year_graduated YEAR,
+    sex ENUM('Male', 'Female'),
+    is_employed ENUM('Yes', 'No', 'Never Employed'),
+    alumni INT UNSIGNED NOT NULL DEFAULT 0,
+    graduates INT UNSIGNED NOT NULL DEFAULT 0,
+    surveys_completed INT UNSIGNED NOT NULL DEFAULT 0
+);
+
+-- Source version (sum of table_versions) each summary table was last built from
+CREATE TABLE IF NOT EXISTS summary_refreshes (
+    summary_name VARCHAR(64) PRIMARY KEY,
+    source_version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+DROP PROCEDURE IF EXISTS refresh_alumni_kpi_summary;
+DELIMITER $$
+CREATE PROCEDURE refresh_alumni_kpi_summary()
+BEGIN
+    DECLARE current_version BIGINT UNSIGNED;
+    -- Versions only grow, so their sum moves whenever any source table changed
+    SELECT COALESCE(SUM(version), 0) INTO current_version FROM table_versions
+    WHERE table_name IN ('users', 'graduate_profiles', 'educational_background',
+                         'employment_data', 'survey_responses');
+    IF current_version <> COALESCE(
+        (SELECT source_version FROM summary_refreshes WHERE summary_name = 'alumni_kpi_summary'), -1
+    ) THEN
+        START TRANSACTION;
+        DELETE FROM alumni_kpi_summary;
+        INSERT INTO alumni_kpi_summary
+            (degree, year_graduated, sex, is_employed, alumni, graduates, surveys_completed)
+        SELECT
+            e.degree,
+            e.year_graduated,
+            p.sex,
+            emp.is_employed,
+            COUNT(*),
+            COUNT(e.user_id),
+            COALESCE(SUM(s.is_completed = 1), 0)
+        FROM users u
+        LEFT JOIN graduate_profiles p ON p.user_id = u.id
+        LEFT JOIN educational_background e ON e.user_id = u.id
+        LEFT JOIN employment_data emp ON emp.user_id = u.id
+        LEFT JOIN survey_responses s ON s.user_id = u.id
+        WHERE u.role != 'admin'
+        GROUP BY e.degree, e.year_graduated, p.sex, emp.is_employed;
+        INSERT INTO summary_refreshes (summary_name, source_version)
+        VALUES ('alumni_kpi_summary', current_version)
+        ON DUPLICATE KEY UPDATE source_version = VALUES(source_version), refreshed_at = CURRENT_TIMESTAMP;
+        COMMIT;
+    END IF;
+END$$
+DELIMITER ;
+
+-- Keeps the summary current between dashboard syncs (requires event_scheduler=ON)
+CREATE EVENT IF NOT EXISTS alumni_kpi_summary_refresh
+    ON SCHEDULE EVERY 1 MINUTE
+    DO CALL refresh_alumni_kpi_summary();
+
+CALL refresh_alumni_kpi_summary();
+
+
+-- Hourly activity counts per activity type and alumni group, so engagement
+-- charts and period KPIs read a range of rollup rows instead of scanning
+-- activity_logs. Missing group values are stored as '' / 0 (key columns).
+CREATE TABLE IF NOT EXISTS activity_rollup (
+    activity_hour DATETIME NOT NULL,
+    activity_type ENUM('registration', 'login', 'survey_completed', 'profile_updated', 'survey_started', 'survey_updated', 'password_changed') NOT NULL,
+    degree VARCHAR(255) NOT NULL DEFAULT '',
+    year_graduated SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    sex VARCHAR(10) NOT NULL DEFAULT '',
+    activities INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (activity_hour, activity_type, degree, year_graduated, sex)
+);
+
+-- Every logged activity is added to its hour as it is written (admin activity is left out)
+DROP TRIGGER IF EXISTS activity_logs_ai_rollup;
+CREATE TRIGGER activity_logs_ai_rollup AFTER INSERT ON activity_logs FOR EACH ROW
+    INSERT INTO activity_rollup (activity_hour, activity_type, degree, year_graduated, sex, activities)
+    SELECT DATE_FORMAT(NEW.created_at, '%Y-%m-%d %H:00:00'), NEW.activity_type,
+           COALESCE(e.degree, ''), COALESCE(e.year_graduated, 0), COALESCE(p.sex, ''), 1
+    FROM users u
+    LEFT JOIN educational_background e ON e.user_id = u.id
+    LEFT JOIN graduate_profiles p ON p.user_id = u.id
+    WHERE u.id = NEW.user_id AND u.role != 'admin'
+    ON DUPLICATE KEY UPDATE activities = activities + 1;
+
+DROP TRIGGER IF EXISTS activity_logs_ad_rollup;
+CREATE TRIGGER activity_logs_ad_rollup AFTER DELETE ON activity_logs FOR EACH ROW
+    UPDATE activity_rollup r
+    JOIN users u ON u.id = OLD.user_id
+    LEFT JOIN educational_background e ON e.user_id = u.id
+    LEFT JOIN graduate_profiles p ON p.user_id = u.id
+    SET r.activities = GREATEST(r.activities, 1) - 1
+    WHERE r.activity_hour = DATE_FORMAT(OLD.created_at, '%Y-%m-%d %H:00:00')
+      AND r.activity_type = OLD.activity_type
+      AND r.degree = COALESCE(e.degree, '')
+      AND r.year_graduated = COALESCE(e.year_graduated, 0)
+      AND r.sex = COALESCE(p.sex, '');
+
+-- Regroups the rollup from activity_logs when the group attribution may have
+-- drifted: a degree / year / sex edit, or a user deletion (cascaded deletes do
+-- not fire activity_logs triggers). Skipped while those tables are unchanged.
+DROP PROCEDURE IF EXISTS rebuild_activity_rollup;
+DELIMITER $$
+CREATE PROCEDURE rebuild_activity_rollup()
+BEGIN
+    DECLARE current_version BIGINT UNSIGNED;
+    SELECT COALESCE(SUM(version), 0) INTO current_version FROM table_versions
+    WHERE table_name IN ('users', 'graduate_profiles', 'educational_background');
+    IF current_version <> COALESCE(
+        (SELECT source_version FROM summary_refreshes WHERE summary_name = 'activity_rollup'), -1
+    ) THEN
+        START TRANSACTION;
+        DELETE FROM activity_rollup;
+        INSERT INTO activity_rollup (activity_hour, activity_type, degree, year_graduated, sex, activities)
+        SELECT DATE_FORMAT(a.created_at, '%Y-%m-%d %H:00:00'), a.activity_type,
+               COALESCE(e.degree, ''), COALESCE(e.year_graduated, 0), COALESCE(p.sex, ''), COUNT(*)
+        FROM activity_logs a
+        JOIN users u ON u.id = a.user_id
+        LEFT JOIN educational_background e ON e.user_id = u.id
+        LEFT JOIN graduate_profiles p ON p.user_id = u.id
+        WHERE u.role != 'admin'
+        GROUP BY DATE_FORMAT(a.created_at, '%Y-%m-%d %H:00:00'), a.activity_type,
+                 COALESCE(e.degree, ''), COALESCE(e.year_graduated, 0), COALESCE(p.sex, '');
+        INSERT INTO summary_refreshes (summary_name, source_version)
+        VALUES ('activity_rollup', current_version)
+        ON DUPLICATE KEY UPDATE source_version = VALUES(source_version), refreshed_at = CURRENT_TIMESTAMP;
+        COMMIT;
+    END IF;
+END$$
+DELIMITER ;
+
+CREATE EVENT IF NOT EXISTS activity_rollup_rebuild
+    ON SCHEDULE EVERY 10 MINUTE
+    DO CALL rebuild_activity_rollup();
+
+CALL rebuild_activity_rollup();
+
+
+-- Reports precomputed by generate_reports.py and served by the dashboards.
+-- Same columns as in alumlink360_schema.sql, plus report_key (the program,
+-- batch or user a report covers, so a rerun replaces it) and source_version
+-- (the table_versions sum the report was built at).
+CREATE TABLE IF NOT EXISTS generated_reports (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    admin_user_id INT NOT NULL,
+    report_type ENUM('individual_profile', 'employment_summary', 'graduation_batch', 'program_analysis') NOT NULL,
+    report_key VARCHAR(255) NOT NULL,
+    report_title VARCHAR(255),
+    report_data JSON,
+    file_path VARCHAR(255),
+    source_version BIGINT UNSIGNED NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (admin_user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_generated_report (report_type, report_key)
+);
+
+-- Databases created from alumlink360_schema.sql already have generated_reports
+-- without these. Older rows get a placeholder key (unique, so the key can be
+-- added) that matches no current report; generate_reports.py prunes them
+-- when it next builds their report type.
+ALTER TABLE generated_reports
+    ADD COLUMN IF NOT EXISTS report_key VARCHAR(255) NULL AFTER report_type,
+    ADD COLUMN IF NOT EXISTS source_version BIGINT UNSIGNED NULL AFTER file_path;
+UPDATE generated_reports SET report_key = CONCAT('legacy-', id) WHERE report_key IS NULL;
+ALTER TABLE generated_reports
+    MODIFY report_key VARCHAR(255) NOT NULL,
+    ADD UNIQUE KEY IF NOT EXISTS unique_generated_report (report_type, report_key);
@@ -0,0 +1,86 @@
+"""
+Finished Plotly figures shared across reruns and sessions.
+
+Streamlit reruns the whole script on every interaction, so every chart is
+normally aggregated, built with plotly express and validated again even
+when its data and filters are unchanged. FigureCache keeps the finished
+go.Figure of each chart under a key the caller derives from the chart id,
+the filter state and the data version. A cached figure skips the build
+and plotly's validation; st.plotly_chart still copies it to a dict and
+serializes that on every rerun.
+
+Entries are budgeted by the size of their JSON (len(fig.to_json()), ASCII),
+measured once when the figure is built, and the least recently used are
+evicted once the total passes the budget.
+"""
+
+import threading
+from collections import OrderedDict
+
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def figure_size(fig):
+    """Bytes of a figure's JSON, the unit FigureCache budgets in"""
+    return len(fig.to_json())
+
+
+class FigureCache:
+    """LRU of finished figures bounded by the total size of their JSON in bytes.
+
+    Shared between sessions, so every method takes the lock. Cached figures
+    are handed to every session and must not be modified. A figure larger
+    than the whole budget is returned to the caller but not kept.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # key -> (figure, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """The cached figure of key (marked as recently used), or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, fig, size=None):
+        """Store a figure, evicting the least recently used ones over budget; returns the figure"""
+        size = figure_size(fig) if size is None else size
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                return fig
+            self.entries[key] = (fig, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+        return fig
+
+    def get_or_build(self, key, build):
+        """Cached figure of key, or build() -> go.Figure stored under key on a miss.
+
+        build() may return None when there is nothing to plot; that is returned
+        as is and not cached.
+        """
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            if fig is not None:
+                self.put(key, fig)
+        return fig
+
+    def stats(self):
+        with self.lock:
+            return {"figures": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
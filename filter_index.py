@@ -0,0 +1,101 @@
+"""
+Boolean-mask index over user ids, shared by the Streamlit dashboards.
+
+Alumni ids are AUTO_INCREMENT integers, so the id itself is used as the
+position in a dense id space. Every filter value (degree, year, sex,
+employment status, ...) maps to one boolean mask over that space:
+combining filters is a bitwise AND, and selecting a table's rows is a
+gather through the table's precomputed user_id positions.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class UserIdIndex:
+    """Filter masks and per-table row positions built once per data load.
+
+    frames: table name -> DataFrame the index is built from (and later applied to)
+    fields: filter name -> (table name, column) whose values get a mask each
+    id_columns: table name -> user id column, for tables not using "user_id"
+    """
+
+    def __init__(self, frames, fields, id_columns=None):
+        id_columns = id_columns or {}
+        self.id_columns = {name: id_columns.get(name, "user_id") for name in frames}
+        self.row_positions = {
+            name: self._positions(df, self.id_columns[name]) for name, df in frames.items()
+        }
+        known = [pos.max() for pos in self.row_positions.values() if pos is not None and pos.size]
+        self.size = int(max(known, default=-1)) + 1
+        self.masks = {
+            field: self._value_masks(frames.get(table), self.row_positions.get(table), column)
+            for field, (table, column) in fields.items()
+        }
+
+    @staticmethod
+    def _positions(df, column):
+        """Each row's position in the id space (-1 when the row has no user id)"""
+        if df is None or column not in df.columns:
+            return None
+        return pd.to_numeric(df[column], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+
+    def _value_masks(self, df, positions, column):
+        """One mask per distinct value of a column, keyed by the value as str"""
+        if df is None or positions is None or column not in df.columns:
+            return {}
+        valid = (positions >= 0) & df[column].notna().to_numpy()
+        codes, uniques = pd.factorize(df[column][valid].astype(str))
+        positions = positions[valid]
+        masks = {}
+        for code, value in enumerate(uniques):
+            mask = np.zeros(self.size, dtype=bool)
+            mask[positions[codes == code]] = True
+            masks[value] = mask
+        return masks
+
+    def values(self, field):
+        """Indexed values of a filter field"""
+        return list(self.masks.get(field, {}))
+
+    def mask(self, selections):
+        """Combine selections (field -> selected values) into one mask.
+
+        Values of one field are OR-ed, fields are AND-ed. Returns None when
+        nothing is selected; fields that were not indexed match nobody.
+        """
+        result = None
+        for field, values in selections.items():
+            if not values:
+                continue
+            field_masks = self.masks.get(field, {})
+            selected = np.zeros(self.size, dtype=bool)
+            for value in values:
+                value_mask = field_masks.get(str(value))
+                if value_mask is not None:
+                    selected |= value_mask
+            result = selected if result is None else result & selected
+        return result
+
+    def id_mask(self, name):
+        """Mask of the user ids present in a table"""
+        mask = np.zeros(self.size, dtype=bool)
+        positions = self.row_positions.get(name)
+        if positions is not None:
+            mask[positions[positions >= 0]] = True
+        return mask
+
+    def take(self, name, df, mask):
+        """Rows of a table whose user id is set in mask (the frame itself when mask is None)"""
+        if mask is None or df is None:
+            return df
+        positions = self.row_positions.get(name)
+        if positions is None:
+            return df
+        if len(positions) != len(df):
+            # Not the frame the index was built from: fall back to a lookup by id
+            return df[df[self.id_columns[name]].isin(np.flatnonzero(mask))]
+        if not self.size:
+            return df.iloc[0:0]
+        hit = (positions >= 0) & mask[np.clip(positions, 0, None)]
+        return df.iloc[np.flatnonzero(hit)]
@@ -0,0 +1,357 @@
+"""
+Headless batch generator for the generated_reports table.
+
+Loads the Alumify tables once (through the Analytics PRO loader, so its
+on-disk snapshots are reused) and builds every report with the same
+aggregation helpers the dashboard uses:
+
+- employment_summary: all alumni, with employment rates per program
+- program_analysis: one report per degree program
+- graduation_batch: one report per graduation year
+- individual_profile: one report per alumnus (only when asked for with --types)
+
+Reports are built in parallel over a process pool. Each one is stored as
+JSON in generated_reports under (report_type, report_key), with an Excel
+workbook of its tables written to REPORTS_DIR, so the dashboards can serve
+stored reports instead of recomputing them live.
+
+    python generate_reports.py [--types TYPE ...] [--workers N] [--force]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Streamlit calls in the dashboard module run without a server here; keep its warnings quiet
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+import dashboardPINAKA as pro  # noqa: E402
+from salary_bands import salary_band_column  # noqa: E402
+
+REPORTS_DIR = os.environ.get(
+    "ALUMIFY_REPORTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+)
+REPORT_TYPES = ["employment_summary", "program_analysis", "graduation_batch", "individual_profile"]
+DEFAULT_TYPES = ["employment_summary", "program_analysis", "graduation_batch"]
+TOP_ROWS = 10
+LOAD_ATTEMPTS = 3   # loads tried while writes keep moving table_versions during the load
+
+SOURCE_VERSION_QUERY = "SELECT COALESCE(SUM(version), 0) FROM table_versions"
+STORED_VERSIONS_QUERY = (
+    "SELECT report_type, MIN(COALESCE(source_version, -1)) FROM generated_reports GROUP BY report_type"
+)
+ADMIN_QUERY = "SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1"
+UPSERT_QUERY = """
+    INSERT INTO generated_reports
+        (admin_user_id, report_type, report_key, report_title, report_data, file_path, source_version)
+    VALUES (:admin_user_id, :report_type, :report_key, :report_title, :report_data, :file_path, :source_version)
+    ON DUPLICATE KEY UPDATE
+        admin_user_id = VALUES(admin_user_id), report_title = VALUES(report_title),
+        report_data = VALUES(report_data), file_path = VALUES(file_path),
+        source_version = VALUES(source_version), created_at = CURRENT_TIMESTAMP
+"""
+PRUNE_QUERY = text(
+    "DELETE FROM generated_reports WHERE report_type = :report_type AND report_key NOT IN :keys"
+).bindparams(bindparam("keys", expanding=True))
+PRUNE_ALL_QUERY = text("DELETE FROM generated_reports WHERE report_type = :report_type")
+
+# Worker state, set once per process by init_worker
+_frames = None
+_index = None
+_profiles = None
+
+
+def init_worker(frames):
+    global _frames, _index, _profiles
+    _frames = frames
+    _index = pro.build_user_index(frames)
+    _profiles = None
+
+
+# ---------------------------
+# Report contents
+# ---------------------------
+def number(value, digits=1):
+    """A float rounded for the report, or None for NaN / missing"""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def count_rows(counts, label, top=None):
+    """Counted values as Count / Percent records (see percent_table)"""
+    table = pro.percent_table(counts.head(top) if top else counts)
+    return [{label: str(value), "count": int(row["Count"]), "percent": float(row["Percent"])}
+            for value, row in table.iterrows()]
+
+
+def column_counts(df, column):
+    return pro.safe_count_series(df[column]) if column in df.columns else pd.Series(dtype=int)
+
+
+def summarize(filtered):
+    """Headline figures and distributions of one filtered slice, as JSON-ready values"""
+    edu = filtered.get("educational_background", pd.DataFrame())
+    emp = filtered.get("employment_data", pd.DataFrame())
+    gp = filtered.get("graduate_profiles", pd.DataFrame())
+    surveys = filtered.get("survey_responses", pd.DataFrame())
+
+    employed = pro.employed_flags(emp["is_employed"]) if "is_employed" in emp.columns else pd.Series(dtype=int)
+    salaries = (salary_band_column(emp["initial_gross_monthly_earning"], "lower")
+                if "initial_gross_monthly_earning" in emp.columns else pd.Series(dtype=float))
+    completed = surveys["is_completed"].astype(float) if "is_completed" in surveys.columns else pd.Series(dtype=float)
+    return {
+        "graduates": int(len(edu)),
+        "employment_records": int(len(emp)),
+        "employment_rate": number(employed.mean() * 100) if len(employed) else None,
+        "survey_completion_rate": number(completed.mean() * 100) if completed.notna().any() else None,
+        "median_salary_lower_bound": number(salaries.median(), 0),
+        "employment_status": count_rows(column_counts(emp, "is_employed"), "status"),
+        "gender": count_rows(column_counts(gp, "sex"), "gender"),
+        "industries": count_rows(column_counts(emp, "business_line"), "industry", TOP_ROWS),
+        "occupations": count_rows(column_counts(emp, "present_occupation"), "occupation", TOP_ROWS),
+        "insights": pro.generate_insights(filtered, "None"),
+    }
+
+
+def employment_summary(_key):
+    data = summarize(pro.apply_filters(_frames, {}, _index))
+    wide = pro.cube_wide(pro.build_comparison_cube(_frames, "Program"),
+                         ["graduates", "employment_records", "employment_rate"])
+    data["programs"] = [
+        {"program": group.split(": ", 1)[-1],   # cube groups are labelled "Program: <degree>"
+         "graduates": int(row["graduates"]) if pd.notna(row["graduates"]) else 0,
+         "employment_records": int(row["employment_records"]) if pd.notna(row["employment_records"]) else 0,
+         "employment_rate": number(row["employment_rate"])}
+        for group, row in wide.iterrows()
+    ]
+    return "Employment Summary", data
+
+
+def program_analysis(degree):
+    filtered = pro.apply_filters(_frames, {"program": degree}, _index)
+    data = summarize(filtered)
+    years = column_counts(filtered["educational_background"], "year_graduated").sort_index()
+    data["batches"] = count_rows(years, "year")
+    return f"Program Analysis: {degree}", data
+
+
+def graduation_batch(year):
+    filtered = pro.apply_filters(_frames, {"year": year}, _index)
+    data = summarize(filtered)
+    data["programs"] = count_rows(column_counts(filtered["educational_background"], "degree"), "program")
+    return f"Graduation Batch {year}", data
+
+
+def individual_profile(user_id):
+    global _profiles
+    if _profiles is None:
+        # One flattened row per alumnus, joined once per worker
+        _profiles = pro.get_filtered_dataframe_for_export(_frames).set_index("user_id")
+    row = _profiles.loc[int(user_id)]
+    if isinstance(row, pd.DataFrame):
+        row = row.iloc[0]
+    profile = {column: (None if pd.isna(value) else value)
+               for column, value in row.items() if column not in ("password", "google_id")}
+    return f"Alumni Profile: {profile.get('name') or user_id}", {"profile": profile}
+
+
+BUILDERS = {
+    "employment_summary": employment_summary,
+    "program_analysis": program_analysis,
+    "graduation_batch": graduation_batch,
+    "individual_profile": individual_profile,
+}
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+def json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    return str(value)
+
+
+def render_workbook(path, title, data):
+    """Write a report's figures and tables to an Excel workbook; returns False without an Excel engine"""
+    scalars = {"report": title, **{k: v for k, v in data.items() if not isinstance(v, (list, dict))}}
+    sheets = {"Summary": pd.DataFrame({"Field": list(scalars), "Value": list(scalars.values())})}
+    for name, value in data.items():
+        sheet_name = name.replace("_", " ").title()[:31]
+        if isinstance(value, dict):
+            sheets[sheet_name] = pd.DataFrame({"Field": list(value), "Value": list(value.values())})
+        elif isinstance(value, list) and value:
+            sheets[sheet_name] = pd.DataFrame(value if isinstance(value[0], dict) else {name: value})
+    # Written beside the target and renamed, so the dashboards never serve half a file
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with pd.ExcelWriter(tmp_path) as writer:
+            for sheet_name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=sheet_name, index=False)
+        os.replace(tmp_path, path)
+        return True
+    except ImportError:
+        os.remove(tmp_path)
+        return False
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def build_report(report_type, key, output_dir):
+    """Build, serialize and render one report in a worker process"""
+    title, data = BUILDERS[report_type](key)
+    path = os.path.join(output_dir, f"{report_type}_{re.sub(r'[^A-Za-z0-9]+', '_', str(key)).strip('_')}.xlsx")
+    rendered = render_workbook(path, title, data)
+    return report_type, str(key), title, json.dumps(data, default=json_default), path if rendered else None
+
+
+# ---------------------------
+# Batch run
+# ---------------------------
+def report_keys(frames, report_type):
+    """Every subject of a report type in the loaded data"""
+    index = pro.build_user_index(frames)
+    if report_type == "employment_summary":
+        return ["all"]
+    if report_type == "program_analysis":
+        return sorted(index.values("program"))
+    if report_type == "graduation_batch":
+        return sorted(index.values("year"))
+    users = frames.get("users", pd.DataFrame())
+    if users.empty:
+        return []
+    if "role" in users.columns:
+        users = users[users["role"] != "admin"]
+    return [int(user_id) for user_id in users["id"].dropna()]
+
+
+def read_source_version(conn):
+    """Current table_versions sum, or None when the change feed is not installed"""
+    try:
+        return int(conn.execute(text(SOURCE_VERSION_QUERY)).scalar())
+    except SQLAlchemyError:
+        conn.rollback()
+        return None
+
+
+def read_versions(engine):
+    """(current table_versions sum or None, stored minimum source_version per report type)"""
+    with engine.connect() as conn:
+        current = read_source_version(conn)
+        try:
+            stored = dict(conn.execute(text(STORED_VERSIONS_QUERY)).fetchall())
+        except SQLAlchemyError:
+            conn.rollback()
+            stored = {}
+    return current, stored
+
+
+def load_versioned(engine, version):
+    """
+    Load the tables with the table_versions sum they reflect. The sum is read again after
+    the load: if writes moved it during the load, the frames may hold only some of them, so
+    the load is repeated from the new sum. When it still moves after LOAD_ATTEMPTS loads,
+    the sum read before the last load is returned, so the next run rebuilds.
+    """
+    for _ in range(LOAD_ATTEMPTS):
+        frames, meta = pro.load_all_timed()
+        with engine.connect() as conn:
+            loaded = read_source_version(conn)
+        if loaded == version:
+            break
+        print(f"Tables changed during the load (version {version} -> {loaded}).")
+        previous, version = version, loaded
+    else:
+        version = previous
+    return frames, meta, version
+
+
+def store_reports(engine, reports, admin_id, source_version, keys_by_type):
+    """Upsert the built reports and drop stored ones whose program / batch / alumnus is gone (all of a type with none left)"""
+    rows = [
+        {"admin_user_id": admin_id, "report_type": report_type, "report_key": key, "report_title": title,
+         "report_data": payload, "file_path": path, "source_version": source_version}
+        for report_type, key, title, payload, path in reports
+    ]
+    with engine.begin() as conn:
+        if rows:
+            conn.execute(text(UPSERT_QUERY), rows)
+        for report_type, keys in keys_by_type.items():
+            if keys:
+                conn.execute(PRUNE_QUERY, {"report_type": report_type, "keys": [str(k) for k in keys]})
+            else:
+                conn.execute(PRUNE_ALL_QUERY, {"report_type": report_type})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute Alumify reports into generated_reports.")
+    parser.add_argument("--types", nargs="+", choices=REPORT_TYPES, default=DEFAULT_TYPES,
+                        help="report types to build (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--output", default=REPORTS_DIR, help="directory for the rendered workbooks")
+    parser.add_argument("--admin-id", type=int, help="generated_reports.admin_user_id (default: first admin)")
+    parser.add_argument("--force", action="store_true", help="rebuild even when no table changed")
+    args = parser.parse_args(argv)
+
+    engine = pro.get_engine()
+    try:
+        current_version, stored_versions = read_versions(engine)
+        if not args.force and current_version is not None and all(
+            stored_versions.get(t) == current_version for t in args.types
+        ):
+            print(f"Reports are up to date (table version {current_version}); use --force to rebuild.")
+            return 0
+        admin_id = args.admin_id
+        if admin_id is None:
+            with engine.connect() as conn:
+                admin_id = conn.execute(text(ADMIN_QUERY)).scalar()
+        if admin_id is None:
+            print("No admin user to own the reports; pass --admin-id.", file=sys.stderr)
+            return 1
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    try:
+        frames, meta, current_version = load_versioned(engine, current_version)
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return 1
+    print(f"Loaded {len(frames)} tables in {meta['wall_time']:.2f}s.")
+    os.makedirs(args.output, exist_ok=True)
+    keys_by_type = {t: report_keys(frames, t) for t in args.types}
+    tasks = [(t, key) for t, keys in keys_by_type.items() for key in keys]
+
+    # Each worker receives the frames once and builds its own user index
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=init_worker, initargs=(frames,)) as pool:
+        futures = [pool.submit(build_report, t, key, args.output) for t, key in tasks]
+        reports = [f.result() for f in futures]
+
+    try:
+        store_reports(engine, reports, admin_id, current_version, keys_by_type)
+    except SQLAlchemyError as e:
+        print(f"Could not store reports: {e}", file=sys.stderr)
+        return 1
+    counts = pd.Series([r[0] for r in reports], dtype=object).value_counts()
+    print(", ".join(f"{count} {t}" for t, count in counts.items()) or "No reports to build",
+          f"in {time.perf_counter() - started:.2f}s with {args.workers} workers.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
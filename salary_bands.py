@@ -0,0 +1,71 @@
+"""
+Salary band parsing shared by the Streamlit dashboards.
+
+initial_gross_monthly_earning holds a handful of bracket labels such as
+"P5,000.00 to less than P10,000.00" repeated for every alumnus. Each
+distinct label is parsed once into a SalaryBand; a column is mapped to a
+band field through its factorized codes, so the work grows with the number
+of distinct labels instead of the number of rows.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+AMOUNT = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+UNDER_WORDS = ("below", "less than")
+OVER_WORDS = ("and above", "above", "and over")
+
+SalaryBand = namedtuple("SalaryBand", ["lower", "upper", "midpoint", "estimate"])
+SalaryBand.__doc__ = """Parsed salary label (NaN where a field is unknown).
+
+lower: first amount in the label (the lower bound of a range)
+upper: last amount of a range, or the amount of a "below ..." label
+midpoint: middle of lower and upper, or the single amount
+estimate: one representative amount: the midpoint of a range, the single
+    amount scaled by 0.8 / 1.2 for open-ended "below" / "above" labels
+"""
+
+
+@lru_cache(maxsize=1024)
+def salary_band(label):
+    """SalaryBand of one label; parsed once per distinct label for the process"""
+    amounts = [float(a.replace(",", "")) for a in AMOUNT.findall(label)]
+    if not amounts:
+        return SalaryBand(np.nan, np.nan, np.nan, np.nan)
+    text = label.lower()
+    lower = amounts[0]
+    if len(amounts) > 1:
+        upper = amounts[-1]
+    elif any(word in text for word in OVER_WORDS) and not any(word in text for word in UNDER_WORDS):
+        upper = np.nan
+    else:
+        upper = lower
+    midpoint = (lower + upper) / 2 if len(amounts) > 1 else lower
+    if len(amounts) > 1:
+        estimate = midpoint
+    elif any(word in text for word in UNDER_WORDS):
+        estimate = lower * 0.8
+    elif any(word in text for word in OVER_WORDS):
+        estimate = lower * 1.2
+    else:
+        estimate = lower
+    return SalaryBand(lower, upper, midpoint, estimate)
+
+
+def salary_bands(values):
+    """Lookup table of the distinct labels in values: one row per label, SalaryBand fields as columns"""
+    labels = pd.Index(pd.Series(values, dtype=object).dropna().astype(str).unique())
+    return pd.DataFrame([salary_band(label) for label in labels], index=labels, columns=SalaryBand._fields)
+
+
+def salary_band_column(values, field="estimate"):
+    """One SalaryBand field per row of values (NaN for missing or unparsable labels)"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    codes, labels = pd.factorize(series.astype(object))
+    parsed = np.array([getattr(salary_band(str(label)), field) for label in labels] + [np.nan], dtype=float)
+    # code -1 (missing) picks the trailing NaN
+    return pd.Series(parsed[codes], index=series.index, name=field)
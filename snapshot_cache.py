@@ -0,0 +1,85 @@
+"""
+On-disk Arrow snapshots of loaded tables for warm starts.
+
+Each table is written as an uncompressed Arrow IPC file together with the
+watermark (table version) it was loaded at. A new process memory-maps the
+files instead of re-reading MySQL, and only reloads the tables whose
+watermark in the database moved. When the database cannot be reached the
+snapshots are served as they are.
+
+pyarrow is optional: without it every load goes to the database.
+"""
+
+import json
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+except ImportError:  # snapshots disabled
+    pa = None
+
+SNAPSHOT_DIR = os.environ.get(
+    "ALUMIFY_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots")
+)
+WATERMARK_KEY = b"alumify.watermark"
+
+
+def watermark_token(watermark):
+    """Stable string form of a watermark (versions, timestamps, counts)"""
+    return json.dumps(watermark, default=str, sort_keys=True)
+
+
+class SnapshotStore:
+    """Arrow IPC snapshots of one dashboard's tables, one file per table.
+
+    namespace: subdirectory, so dashboards loading different columns of the
+    same table keep separate snapshots
+    """
+
+    def __init__(self, namespace, directory=SNAPSHOT_DIR):
+        self.directory = os.path.join(directory, namespace)
+
+    @property
+    def enabled(self):
+        return pa is not None
+
+    def _path(self, table):
+        return os.path.join(self.directory, f"{table}.arrow")
+
+    def load(self, table):
+        """Return (DataFrame, watermark token) of a table's snapshot, or (None, None)"""
+        if pa is None:
+            return None, None
+        try:
+            with pa.memory_map(self._path(table), "r") as source:
+                arrow_table = pa.ipc.open_file(source).read_all()
+            metadata = arrow_table.schema.metadata or {}
+            return arrow_table.to_pandas(), metadata.get(WATERMARK_KEY, b"").decode() or None
+        except (OSError, pa.ArrowException):
+            return None, None
+
+    def save(self, table, df, watermark):
+        """Write a table's snapshot at watermark; returns False when it cannot be stored"""
+        if pa is None or df is None:
+            return False
+        try:
+            arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(arrow_table.schema.metadata or {})
+            metadata[WATERMARK_KEY] = watermark_token(watermark).encode()
+            arrow_table = arrow_table.replace_schema_metadata(metadata)
+            os.makedirs(self.directory, exist_ok=True)
+            # Written beside the target and renamed, so readers never see half a file
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            os.close(fd)
+            try:
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                        writer.write_table(arrow_table)
+                os.replace(tmp_path, self._path(table))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            return True
+        except (OSError, pa.ArrowException):
+            return False
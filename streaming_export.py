@@ -0,0 +1,246 @@
+"""
+Chunked CSV / Excel export for the Streamlit dashboards.
+
+Rows are written to a temporary file one chunk at a time: CSV chunks are
+appended with to_csv, Excel rows go through xlsxwriter's constant_memory
+mode, so building an export never holds it as one big string or BytesIO.
+
+Serving it does: st.download_button reads the finished file into Streamlit's
+in-memory media storage, which keeps the whole export for as long as the
+button is on the page, one copy per session showing it. Streamlit has no
+chunked download, so an export's size still bounds what a session holds.
+
+lazy_download_button only writes an export once it is asked for, and keeps
+the file in a process-wide ExportCache so every session requesting the same
+slice (data version, filters, format) downloads the same file.
+"""
+
+import datetime
+import decimal
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from tracing import span
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "alumify_exports")
+EXPORT_MAX_AGE = 3600          # seconds before leftover export files are removed
+EXPORT_CACHE_FILES = 32        # prepared exports kept for reuse across sessions
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Cell values xlsxwriter writes natively; anything else is written as text
+CELL_TYPES = (str, bool, int, float, decimal.Decimal, datetime.date, datetime.time, datetime.timedelta)
+
+
+def frame_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield consecutive row slices of a DataFrame."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def cleanup_exports(max_age=EXPORT_MAX_AGE):
+    """Remove export files older than max_age seconds."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def write_export(chunks, fmt, total_rows=None, progress=None, sheet_name="Data"):
+    """
+    Write DataFrame chunks to a new temp file ("csv" or "xlsx") and return its path.
+    progress(rows_written, total_rows) is called after every chunk.
+    """
+    cleanup_exports()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", dir=EXPORT_DIR)
+    os.close(fd)
+    writer = _write_csv if fmt == "csv" else _write_xlsx
+    try:
+        writer(chunks, path, total_rows, progress, sheet_name)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def _write_csv(chunks, path, total_rows, progress, sheet_name):
+    written, header = 0, True
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        for chunk in chunks:
+            chunk.to_csv(fh, index=False, header=header)
+            header = False
+            written += len(chunk)
+            if progress:
+                progress(written, total_rows)
+
+
+def _excel_columns(chunk):
+    """Column values of a chunk as cells: missing -> None, unsupported objects -> str."""
+    columns = []
+    for _, col in chunk.items():
+        values = col.astype(object)
+        if not (pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col)):
+            values = values.map(lambda v: v if isinstance(v, CELL_TYPES) else str(v), na_action="ignore")
+        columns.append(values.where(col.notna().to_numpy(), None).tolist())
+    return columns
+
+
+def _write_xlsx(chunks, path, total_rows, progress, sheet_name):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "remove_timezone": True,
+        "nan_inf_to_errors": True,
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        row = 0
+        for chunk in chunks:
+            if row == 0:
+                worksheet.write_row(0, 0, [str(c) for c in chunk.columns])
+                row = 1
+            for record in zip(*_excel_columns(chunk)):
+                worksheet.write_row(row, 0, record)
+                row += 1
+            if progress:
+                progress(row - 1, total_rows)
+    finally:
+        workbook.close()
+
+
+class ExportCache:
+    """Prepared export files shared by every session, keyed by what they contain.
+
+    A key names one slice of data in one format; entries expire after their
+    max_age and the least recently used are removed beyond max_files.
+    """
+
+    def __init__(self, max_files=EXPORT_CACHE_FILES):
+        self.lock = threading.Lock()
+        self.max_files = max_files
+        self.entries = OrderedDict()    # key -> (path, expires_at)
+
+    def get(self, key):
+        """Path of a prepared export, or None when missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            path, expires_at = entry
+            if time.time() >= expires_at or not os.path.exists(path):
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return path
+
+    def put(self, key, path, max_age=EXPORT_MAX_AGE):
+        """Register a written export; returns the path to serve for key.
+
+        When another session prepared the same key meanwhile, its file is kept
+        and the new one removed.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and os.path.exists(entry[0]):
+                _remove(path)
+                return entry[0]
+            self.entries[key] = (path, time.time() + max_age)
+            while len(self.entries) > self.max_files:
+                self._drop(next(iter(self.entries)))
+            return path
+
+    def discard(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+
+    def _drop(self, key):
+        path, _ = self.entries.pop(key)
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@st.cache_resource
+def get_export_cache():
+    """Return the export cache shared by every session in this process"""
+    return ExportCache()
+
+
+def _write_with_progress(df, fmt, file_name, sheet_name):
+    """write_export for a DataFrame, reporting progress in a bar removed afterwards"""
+    bar = st.progress(0.0, text=f"Preparing {file_name}...")
+
+    def report(done, total):
+        fraction = min(done / total, 1.0) if total else 1.0
+        bar.progress(fraction, text=f"Preparing {file_name}: {done:,} of {total:,} rows")
+
+    with span(f"export {file_name}", len(df)):
+        path = write_export(frame_chunks(df), fmt, total_rows=len(df), progress=report, sheet_name=sheet_name)
+    bar.empty()
+    return path
+
+
+def streamed_download_button(label, df, fmt, file_name, sheet_name="Data", **button_kwargs):
+    """
+    Stream df to a temp file with a progress bar, then serve that file
+    with st.download_button. The file is removed once the button holds it;
+    the button keeps the whole export in memory (see the module docstring).
+    """
+    path = _write_with_progress(df, fmt, file_name, sheet_name)
+    try:
+        with open(path, "rb") as fh:
+            st.download_button(label, data=fh, file_name=file_name, mime=MIME_TYPES[fmt], **button_kwargs)
+    finally:
+        os.remove(path)
+
+
+def lazy_download_button(label, key, build, fmt, file_name, sheet_name="Data",
+                         max_age=EXPORT_MAX_AGE, **button_kwargs):
+    """
+    Download button whose file is only written when it is asked for.
+
+    key names the exported slice (data version, filter state, ...) and is
+    combined with fmt to look up a file any session prepared before. Without
+    one, a "Prepare" button is shown and build() -> DataFrame is only called
+    once it is clicked; the written file is then cached for max_age seconds.
+    Sessions share the file, but each button reads all of it into memory.
+    """
+    cache = get_export_cache()
+    cache_key = (key, fmt)
+    widget_key = button_kwargs.pop("key", None) or f"export_{file_name}"
+    path = cache.get(cache_key)
+    if path is None:
+        if not st.button(f"Prepare {label}", key=f"prepare_{widget_key}", **button_kwargs):
+            return
+        path = cache.put(cache_key, _write_with_progress(build(), fmt, file_name, sheet_name), max_age)
+    try:
+        with open(path, "rb") as fh:
+            st.download_button(label, data=fh, file_name=file_name, mime=MIME_TYPES[fmt],
+                               key=widget_key, **button_kwargs)
+    except OSError:
+        # Expired or evicted between lookup and open: prepare it again next time
+        cache.discard(cache_key)
+        st.caption(f"{file_name} expired, prepare it again.")
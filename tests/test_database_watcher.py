@@ -0,0 +1,77 @@
+"""DatabaseWatcher of the GTS dashboard: polls must leave versions() callable and current."""
+
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("plotly")
+pytest.importorskip("mysql.connector")
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard ito na talaga 2025.py")
+
+
+def load_dashboard():
+    spec = importlib.util.spec_from_file_location("dashboard_gts", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query):
+        pass
+
+    def fetchall(self):
+        return list(self.rows.items())
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, buffered=False):
+        return FakeCursor(self.rows)
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def poll(watcher):
+    """One iteration of the watch loop"""
+    changed = watcher._diff(watcher._read_versions())
+    if changed:
+        watcher._publish(changed)
+    return changed
+
+
+def test_versions_callable_after_poll(monkeypatch):
+    dashboard = load_dashboard()
+    monkeypatch.setattr(dashboard, "get_db_connection", lambda: None)
+    watcher = dashboard.DatabaseWatcher()
+    watcher.stop()
+
+    rows = {table: 1 for table in dashboard.WATCHED_TABLES}
+    watcher.conn = FakeConnection(rows)
+    assert poll(watcher) == set()           # first poll is the baseline
+    assert watcher.versions() == {table: 0 for table in dashboard.WATCHED_TABLES}
+
+    rows["users"] = 2
+    assert poll(watcher) == {"users"}
+    versions = watcher.versions()
+    assert versions["users"] == watcher.sequence == 1
+    assert versions["employment_data"] == 0
+    assert watcher.changes_since(0) == (1, {"users"})
+
+    watcher.mark_changed()
+    assert set(watcher.versions().values()) == {2}
@@ -0,0 +1,117 @@
+"""
+Incremental word counts for free-text survey answers.
+
+Curriculum suggestions only ever grow, so every text is tokenized once,
+when it first shows up. Each row's n-gram counts are kept as postings of
+its user and added to (or subtracted from) running totals; the top terms of
+a filtered slice only sum the postings of the users in that slice.
+"""
+
+import heapq
+import re
+import threading
+from collections import Counter
+
+import pandas as pd
+
+TOKEN = re.compile(r"\b[a-zA-Z]{2,}\b")
+# English function words plus common Filipino particles seen in the answers
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+him his how if in into is it its just let me more most my no nor not of off on once only or other our ours out
+over own same she should so some such than that the their theirs them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with would you your yours
+etc please maybe much many really lot lots
+ang ng sa mga na at para po ay ko ako mo ka si ni kung lang din rin pa pag naman yung yun may mas
+""".split())
+
+
+def tokenize(text, stopwords=STOPWORDS):
+    """Lower-cased words of two or more letters, without stopwords"""
+    return [t for t in TOKEN.findall(text.lower()) if t not in stopwords]
+
+
+def ngrams(tokens, n):
+    """Consecutive n-word phrases of a token list"""
+    if n == 1:
+        return tokens
+    return [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+
+class TokenIndex:
+    """Term counts of one text column, per user and in total, for 1..max_ngram word phrases.
+
+    Rows are identified by id_column: sync() only tokenizes rows that are new
+    (or whose text changed) and drops the counts of rows that disappeared.
+    Shared between sessions, so every method takes the lock.
+    """
+
+    def __init__(self, text_column, id_column="id", user_column="user_id", max_ngram=2, stopwords=STOPWORDS):
+        self.text_column = text_column
+        self.id_column = id_column
+        self.user_column = user_column
+        self.max_ngram = max_ngram
+        self.stopwords = stopwords
+        self.lock = threading.Lock()
+        self.rows = {}          # row id -> (user id, text, Counter of (n, term))
+        self.postings = {}      # user id -> Counter of (n, term)
+        self.totals = Counter()
+        self.version = None
+
+    def sync(self, df, version=None):
+        """Bring the index in line with df; a no-op when this version was synced already"""
+        with self.lock:
+            if version is not None and version == self.version:
+                return
+            columns = {self.id_column, self.user_column, self.text_column}
+            if df is None or not columns.issubset(df.columns):
+                current = {}
+            else:
+                current = dict(zip(df[self.id_column], zip(df[self.user_column], df[self.text_column])))
+            for row_id in self.rows.keys() - current.keys():
+                self._remove(row_id)
+            for row_id, (user_id, text) in current.items():
+                known = self.rows.get(row_id)
+                if known is not None:
+                    if known[0] == user_id and known[1] == text:
+                        continue
+                    self._remove(row_id)
+                self._add(row_id, user_id, text)
+            self.version = version
+
+    def _add(self, row_id, user_id, text):
+        tokens = tokenize(text, self.stopwords) if isinstance(text, str) else []
+        counts = Counter()
+        for n in range(1, self.max_ngram + 1):
+            counts.update((n, term) for term in ngrams(tokens, n))
+        self.rows[row_id] = (user_id, text, counts)
+        self.postings.setdefault(user_id, Counter()).update(counts)
+        self.totals.update(counts)
+
+    def _remove(self, row_id):
+        user_id, _, counts = self.rows.pop(row_id)
+        posting = self.postings[user_id]
+        for key, count in counts.items():
+            for target in (posting, self.totals):
+                target[key] -= count
+                if target[key] <= 0:
+                    del target[key]
+        if not posting:
+            del self.postings[user_id]
+
+    def top(self, n=10, ngram=1, user_ids=None):
+        """Most frequent ngram-word terms of the given users (all users when None), as a Series"""
+        with self.lock:
+            counts = self.totals
+            if user_ids is not None:
+                users = self.postings.keys() & set(user_ids)
+                if len(users) < len(self.postings):
+                    counts = Counter()
+                    for user_id in users:
+                        counts.update(self.postings[user_id])
+            ranked = heapq.nlargest(
+                n, ((term, count) for (size, term), count in counts.items() if size == ngram),
+                key=lambda item: item[1],
+            )
+        return pd.Series(dict(ranked), dtype=int)
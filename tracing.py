@@ -0,0 +1,321 @@
+"""
+Per-run stage timings for the Streamlit dashboards.
+
+Every script run of a session is one trace, opened by traced_run() around
+the dashboard's entry point. Inside it, stages are recorded as spans with
+the span() context manager or the @traced decorator. A span keeps its
+offset from the start of the run, its wall time, the rows it took in and
+handed out, and the change in process memory (RSS) while it ran.
+
+Finished traces go to a TraceLog shared by every session. The admin panel
+(render_trace_panel) shows them as a waterfall in the sidebar and exports
+them as JSON lines; with ALUMIFY_TRACE_FILE set, every trace is also
+appended to that file for offline analysis.
+
+Tracing is off unless ALUMIFY_TRACE_KEY is set, and the panel is only shown
+to a session that opened the page with ?trace=<that key>. Outside a traced
+run (tracing off, worker threads) spans cost a function call and record
+nothing. psutil is optional: without it memory is read from /proc, and
+left out where that does not exist.
+"""
+
+import functools
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+try:
+    import psutil
+except ImportError:  # memory read from /proc, or not recorded
+    psutil = None
+
+TRACE_KEY = os.environ.get("ALUMIFY_TRACE_KEY") or None
+TRACE_FILE = os.environ.get("ALUMIFY_TRACE_FILE") or None
+TRACE_HISTORY = 200         # finished runs kept in memory for the panel
+
+_local = threading.local()  # .trace: the Trace of the run on this thread
+_process = psutil.Process() if psutil is not None else None
+
+
+def rss_bytes():
+    """Resident memory of this process in bytes, or None when it cannot be read"""
+    if _process is not None:
+        return _process.memory_info().rss
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def count_rows(value):
+    """Rows of a frame or series, summed over a dict of frames, or of the first frame in a tuple"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        sizes = [len(v) for v in value.values() if isinstance(v, (pd.DataFrame, pd.Series))]
+        return sum(sizes) if sizes else None
+    if isinstance(value, tuple):
+        for item in value:
+            rows = count_rows(item)
+            if rows is not None:
+                return rows
+    return None
+
+
+class Span:
+    """One stage of a run; times are in seconds from the start of the run"""
+
+    __slots__ = ("name", "depth", "start", "duration", "rows_in", "rows_out", "memory_delta")
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.depth = 0
+        self.start = 0.0
+        self.duration = None
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.memory_delta = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Trace:
+    """Spans of one script run, in the order they started"""
+
+    def __init__(self, dashboard, session):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.dashboard = dashboard
+        self.session = session
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.depth = 0
+        self.status = "running"
+        self.wall_time = None
+
+    def as_dict(self):
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self.origin
+        return {
+            "run_id": self.run_id, "dashboard": self.dashboard, "session": self.session,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "wall_time": wall_time, "status": self.status,
+            "spans": [s.as_dict() for s in self.spans],
+        }
+
+
+class TraceLog:
+    """The last finished traces of every session, appended to path as JSON lines when given.
+
+    Shared between sessions, so every method takes the lock.
+    """
+
+    def __init__(self, history=TRACE_HISTORY, path=TRACE_FILE):
+        self.lock = threading.Lock()
+        self.traces = deque(maxlen=history)
+        self.path = path
+
+    def add(self, trace):
+        record = trace.as_dict()
+        with self.lock:
+            self.traces.append(record)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as fh:
+                        fh.write(json.dumps(record) + "\n")
+                except OSError:
+                    pass
+
+    def recent(self, dashboard=None):
+        """Finished traces, oldest first, optionally of one dashboard only"""
+        with self.lock:
+            return [t for t in self.traces if dashboard is None or t["dashboard"] == dashboard]
+
+
+@st.cache_resource
+def get_trace_log():
+    """Return the trace log shared by every session in this process"""
+    return TraceLog()
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name, rows_in=None):
+    """
+    Record the enclosed block as a stage of the current run. Yields the Span,
+    so the block can set rows_out; outside a traced run nothing is recorded.
+    """
+    trace = current_trace()
+    record = Span(name, rows_in)
+    if trace is None:
+        yield record
+        return
+    record.depth = trace.depth
+    trace.spans.append(record)
+    trace.depth += 1
+    memory = rss_bytes()
+    started = time.perf_counter()
+    record.start = started - trace.origin
+    try:
+        yield record
+    finally:
+        record.duration = time.perf_counter() - started
+        trace.depth -= 1
+        after = rss_bytes()
+        if memory is not None and after is not None:
+            record.memory_delta = after - memory
+
+
+def traced(name=None):
+    """
+    Decorator recording each call as a span (named after the function by
+    default), with the rows of its first frame argument and of its result.
+
+    Use it on plain functions; Streamlit-cached ones are timed with span()
+    where they are called.
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_trace() is None:
+                return func(*args, **kwargs)
+            rows_in = next((rows for rows in map(count_rows, args) if rows is not None), None)
+            with span(label, rows_in) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = count_rows(result)
+            return result
+        return wrapper
+
+    if callable(name):  # used bare, as @traced
+        func, name = name, None
+        return decorate(func)
+    return decorate
+
+
+@contextmanager
+def traced_run(dashboard):
+    """Trace the enclosed script run of a dashboard; a no-op unless ALUMIFY_TRACE_KEY is set"""
+    if not TRACE_KEY:
+        yield None
+        return
+    session = st.session_state.setdefault("trace_session", uuid.uuid4().hex[:8])
+    trace = Trace(dashboard, session)
+    _local.trace = trace
+    try:
+        yield trace
+        trace.status = "ok"
+    except Exception:
+        trace.status = "error"
+        raise
+    except BaseException:
+        # Streamlit stops a run for a rerun (or st.stop) by raising through it
+        trace.status = "interrupted"
+        raise
+    finally:
+        _local.trace = None
+        trace.wall_time = time.perf_counter() - trace.origin
+        get_trace_log().add(trace)
+
+
+# ---------------------------
+# Admin panel
+# ---------------------------
+def panel_visible():
+    """Whether this session opened the page with ?trace=<ALUMIFY_TRACE_KEY>"""
+    if not TRACE_KEY:
+        return False
+    return hmac.compare_digest(str(st.query_params.get("trace", "")), TRACE_KEY)
+
+
+def span_table(spans):
+    """Spans of one run as a display table, nested stages indented"""
+    if spans.empty:
+        return spans
+    return pd.DataFrame({
+        "Stage": ["· " * d + n for d, n in zip(spans["depth"], spans["name"])],
+        "Start (ms)": (spans["start"].astype(float) * 1000).round(1),
+        "Time (ms)": (spans["duration"].astype(float) * 1000).round(1),
+        "Rows in": spans["rows_in"].astype("Int64"),
+        "Rows out": spans["rows_out"].astype("Int64"),
+        "Memory (MB)": (spans["memory_delta"].astype(float) / 1e6).round(2),
+    })
+
+
+def waterfall_figure(spans):
+    """Horizontal bars from each stage's start to its end, one row per span"""
+    table = span_table(spans)
+    rows = list(range(len(table)))
+    fig = go.Figure(go.Bar(
+        y=rows, x=table["Time (ms)"], base=table["Start (ms)"], orientation="h",
+        customdata=table[["Stage", "Rows in", "Rows out", "Memory (MB)"]].astype(str).to_numpy(),
+        hovertemplate="%{customdata[0]}<br>%{base:.1f} ms + %{x:.1f} ms<br>rows %{customdata[1]} → %{customdata[2]}"
+                      "<br>memory %{customdata[3]} MB<extra></extra>",
+    ))
+    fig.update_yaxes(tickvals=rows, ticktext=table["Stage"], autorange="reversed")
+    fig.update_layout(height=80 + 22 * len(rows), margin=dict(l=0, r=0, t=10, b=0),
+                      xaxis_title="ms since the run started", showlegend=False)
+    return fig
+
+
+def stage_summary(traces):
+    """Median, 95th percentile and worst time per stage over the given runs"""
+    spans = pd.DataFrame([s for t in traces for s in t["spans"]])
+    if spans.empty:
+        return spans
+    ms = spans.assign(ms=spans["duration"].astype(float) * 1000).groupby("name")["ms"]
+    summary = pd.DataFrame({
+        "Calls": ms.count(), "Median (ms)": ms.median(), "p95 (ms)": ms.quantile(0.95), "Max (ms)": ms.max(),
+    }).round(1)
+    return summary.sort_values("Median (ms)", ascending=False)
+
+
+def to_jsonl(traces):
+    return "".join(json.dumps(t) + "\n" for t in traces)
+
+
+def render_trace_panel():
+    """
+    Sidebar panel for admins: a waterfall of this run's stages so far or of a
+    recent run of the same dashboard, the slowest stages over recent runs, and
+    the recent runs as a JSONL download. Call it last inside traced_run().
+    """
+    trace = current_trace()
+    if trace is None or not panel_visible():
+        return
+    runs = get_trace_log().recent(trace.dashboard)[::-1]
+    options = [trace.as_dict()] + runs
+    labels = ["This run (so far)"] + [
+        f"{r['started_at'][11:19]} · {r['wall_time']:.2f}s · {r['status']} · {r['session']}" for r in runs
+    ]
+    with st.sidebar.expander("⏱️ Performance trace", expanded=False):
+        choice = st.selectbox("Run", range(len(options)), format_func=lambda i: labels[i], key="trace_run")
+        run = options[choice]
+        spans = pd.DataFrame(run["spans"], columns=list(Span.__slots__))
+        st.caption(f"{run['wall_time']:.2f}s wall time, {len(spans)} stages, memory from "
+                   f"{'psutil' if _process is not None else '/proc'}.")
+        if spans.empty:
+            st.caption("No stages recorded.")
+        else:
+            st.plotly_chart(waterfall_figure(spans), use_container_width=True)
+            st.dataframe(span_table(spans), use_container_width=True, hide_index=True)
+        if runs:
+            st.markdown(f"**Stages over the last {len(runs)} runs**")
+            st.dataframe(stage_summary(runs), use_container_width=True)
+            st.download_button("Download trace (JSONL)", to_jsonl(runs[::-1]),
+                               f"{trace.dashboard}_trace.jsonl", "application/x-ndjson", key="trace_download")